@@ -365,8 +365,7 @@ class DashboardStatsView(APIView):
         from datetime import datetime, timedelta
         from django.db.models import Sum, Count, Q, Avg
         from membresias.models import SuscripcionMembresia, Membresia
-        from control_acceso.models import RegistroAcceso
-        from ventas.models import VentaProducto, DetalleVentaProducto
+        from ventas.models import VentaProducto, ResumenVentaProductoDiario, ResumenVentaSedeDiario
         from inventario.models import Producto
         from instalaciones.models import Sede
         from clientes.models import Cliente
@@ -425,16 +424,15 @@ class DashboardStatsView(APIView):
             fecha_fin__gte=fecha_fin
         ).count()
 
-        # 3. Ingresos del Mes
-        ingresos_query = VentaProducto.objects.filter(
-            fecha_venta__date__gte=fecha_inicio,
-            fecha_venta__date__lte=fecha_fin,
-            estado='completada'
+        # 3. Ingresos del Mes (ventas de productos desde el resumen diario por sede)
+        ingresos_query = ResumenVentaSedeDiario.objects.filter(
+            fecha__gte=fecha_inicio,
+            fecha__lte=fecha_fin,
         )
         if sede_id:
             ingresos_query = ingresos_query.filter(sede_id=sede_id)
 
-        ingresos_mes = ingresos_query.aggregate(total=Sum('total'))['total'] or 0
+        ingresos_mes = ingresos_query.aggregate(total=Sum('ingresos'))['total'] or 0
 
         # Ingresos por membresías (nuevas suscripciones)
         suscripciones_query = SuscripcionMembresia.objects.filter(
@@ -449,15 +447,14 @@ class DashboardStatsView(APIView):
 
         # Comparar con mes anterior
         fecha_fin_mes_anterior = fecha_inicio - timedelta(days=1)
-        ingresos_mes_anterior_productos = VentaProducto.objects.filter(
-            fecha_venta__date__gte=fecha_mes_anterior,
-            fecha_venta__date__lte=fecha_fin_mes_anterior,
-            estado='completada'
+        ingresos_mes_anterior_productos = ResumenVentaSedeDiario.objects.filter(
+            fecha__gte=fecha_mes_anterior,
+            fecha__lte=fecha_fin_mes_anterior,
         )
         if sede_id:
             ingresos_mes_anterior_productos = ingresos_mes_anterior_productos.filter(sede_id=sede_id)
 
-        ingresos_mes_anterior = ingresos_mes_anterior_productos.aggregate(total=Sum('total'))['total'] or 0
+        ingresos_mes_anterior = ingresos_mes_anterior_productos.aggregate(total=Sum('ingresos'))['total'] or 0
 
         suscripciones_mes_anterior = SuscripcionMembresia.objects.filter(
             fecha_suscripcion__date__gte=fecha_mes_anterior,
@@ -475,33 +472,35 @@ class DashboardStatsView(APIView):
             tendencia_ingresos = 100 if ingresos_totales > 0 else 0
 
         # 4. Accesos Hoy
-        hoy = timezone.now().date()
-        accesos_query = RegistroAcceso.objects.filter(fecha_hora_entrada__date=hoy)
-        if sede_id:
-            accesos_query = accesos_query.filter(sede_id=sede_id)
-
-        accesos_hoy = accesos_query.count()
-        accesos_autorizados = accesos_query.filter(autorizado=True).count()
-        accesos_denegados = accesos_query.filter(autorizado=False).count()
+        # (del resumen por hora; la misma lectura alimenta la gráfica de 30 días)
+        from control_acceso.services import accesos_por_dia
+        hoy = timezone.localdate()
+        accesos_dias = accesos_por_dia(
+            desde=hoy - timedelta(days=29), hasta=hoy, sede_id=int(sede_id) if sede_id else None
+        )
+        accesos_hoy = accesos_dias[-1]['total']
+        accesos_autorizados = accesos_dias[-1]['autorizados']
+        accesos_denegados = accesos_dias[-1]['denegados']
+
+        # Personas dentro ahora mismo (contador incremental, ver control_acceso.services)
+        from control_acceso.services import ocupacion_actual
+        personas_dentro = sum(
+            fila['personas_dentro'] for fila in ocupacion_actual(sede_id=int(sede_id) if sede_id else None)
+        )
 
         # =====================================================
         # DATOS PARA GRÁFICAS
         # =====================================================
 
         # 1. Tendencia de Accesos (últimos 30 días)
-        accesos_30_dias = []
-        for i in range(30):
-            fecha = hoy - timedelta(days=29-i)
-            accesos_dia_query = RegistroAcceso.objects.filter(fecha_hora_entrada__date=fecha)
-            if sede_id:
-                accesos_dia_query = accesos_dia_query.filter(sede_id=sede_id)
-
-            total_dia = accesos_dia_query.count()
-            accesos_30_dias.append({
-                'fecha': fecha.strftime('%Y-%m-%d'),
-                'dia': fecha.strftime('%d/%m'),
-                'total': total_dia
-            })
+        accesos_30_dias = [
+            {
+                'fecha': dia['fecha'].strftime('%Y-%m-%d'),
+                'dia': dia['fecha'].strftime('%d/%m'),
+                'total': dia['total']
+            }
+            for dia in accesos_dias
+        ]
 
         # 2. Ingresos por Concepto
         ingresos_por_concepto = [
@@ -529,20 +528,19 @@ class DashboardStatsView(APIView):
                 'total': tipo['total']
             })
 
-        # 4. Top 10 Productos Más Vendidos
+        # 4. Top 10 Productos Más Vendidos (desde el resumen diario por sede y producto)
         productos_mas_vendidos = []
-        detalles = DetalleVentaProducto.objects.filter(
-            venta__fecha_venta__date__gte=fecha_inicio,
-            venta__fecha_venta__date__lte=fecha_fin,
-            venta__estado='completada'
+        resumenes = ResumenVentaProductoDiario.objects.filter(
+            fecha__gte=fecha_inicio,
+            fecha__lte=fecha_fin,
         )
         if sede_id:
-            detalles = detalles.filter(venta__sede_id=sede_id)
+            resumenes = resumenes.filter(sede_id=sede_id)
 
-        productos_stats = detalles.values('producto__nombre').annotate(
-            cantidad_total=Sum('cantidad'),
-            ingresos_total=Sum('total')
-        ).order_by('-cantidad_total')[:10]
+        productos_stats = resumenes.values('producto__nombre').annotate(
+            cantidad_total=Sum('unidades'),
+            ingresos_total=Sum('ingresos')
+        ).filter(cantidad_total__gt=0).order_by('-cantidad_total')[:10]
 
         for producto in productos_stats:
             productos_mas_vendidos.append({
@@ -551,16 +549,12 @@ class DashboardStatsView(APIView):
                 'ingresos': float(producto['ingresos_total'])
             })
 
-        # 5. Productos con Stock Bajo
-        from inventario.models import Inventario
+        # 5. Productos con Stock Bajo (mínimo o punto de reorden, ver inventarios_por_reabastecer)
+        from inventario.services import inventarios_por_reabastecer
         productos_stock_bajo = []
-        inventarios_query = Inventario.objects.filter(
-            cantidad_actual__lt=10,
-            cantidad_actual__gt=0
-        ).select_related('producto', 'sede', 'producto__categoria')
-
-        if sede_id:
-            inventarios_query = inventarios_query.filter(sede_id=sede_id)
+        inventarios_query = inventarios_por_reabastecer(
+            sede_id=sede_id or None
+        ).filter(cantidad_actual__gt=0).order_by('cantidad_actual')
 
         for inventario in inventarios_query[:5]:
             productos_stock_bajo.append({
@@ -622,15 +616,14 @@ class DashboardStatsView(APIView):
                 ultimo_dia_mes = siguiente_mes - timedelta(days=1)
 
             # Ingresos por productos
-            ingresos_productos_mes = VentaProducto.objects.filter(
-                fecha_venta__date__gte=primer_dia_mes,
-                fecha_venta__date__lte=ultimo_dia_mes,
-                estado='completada'
+            ingresos_productos_mes = ResumenVentaSedeDiario.objects.filter(
+                fecha__gte=primer_dia_mes,
+                fecha__lte=ultimo_dia_mes,
             )
             if sede_id:
                 ingresos_productos_mes = ingresos_productos_mes.filter(sede_id=sede_id)
 
-            total_productos = ingresos_productos_mes.aggregate(total=Sum('total'))['total'] or 0
+            total_productos = ingresos_productos_mes.aggregate(total=Sum('ingresos'))['total'] or 0
 
             # Ingresos por membresías
             ingresos_membresias_mes = SuscripcionMembresia.objects.filter(
@@ -654,15 +647,16 @@ class DashboardStatsView(APIView):
         comparativas_sedes = []
         if not sede_id:  # Solo mostrar si no hay filtro de sede
             sedes_list = Sede.objects.all()
+            from control_acceso.services import accesos_por_sede
+            accesos_hoy_por_sede = accesos_por_sede(desde=hoy, hasta=hoy)
 
             for sede in sedes_list:
                 # Ingresos de la sede
-                ingresos_sede_productos = VentaProducto.objects.filter(
-                    fecha_venta__date__gte=fecha_inicio,
-                    fecha_venta__date__lte=fecha_fin,
-                    estado='completada',
+                ingresos_sede_productos = ResumenVentaSedeDiario.objects.filter(
+                    fecha__gte=fecha_inicio,
+                    fecha__lte=fecha_fin,
                     sede_id=sede.id
-                ).aggregate(total=Sum('total'))['total'] or 0
+                ).aggregate(total=Sum('ingresos'))['total'] or 0
 
                 ingresos_sede_membresias = SuscripcionMembresia.objects.filter(
                     fecha_suscripcion__date__gte=fecha_inicio,
@@ -685,10 +679,7 @@ class DashboardStatsView(APIView):
                 ).count()
 
                 # Accesos hoy en la sede
-                accesos_sede = RegistroAcceso.objects.filter(
-                    sede_id=sede.id,
-                    fecha_hora_entrada__date=hoy
-                ).count()
+                accesos_sede = accesos_hoy_por_sede.get(sede.id, 0)
 
                 comparativas_sedes.append({
                     'sede': sede.nombre,
@@ -723,7 +714,8 @@ class DashboardStatsView(APIView):
                 'tendencia_ingresos': round(tendencia_ingresos, 1),
                 'accesos_hoy': accesos_hoy,
                 'accesos_autorizados': accesos_autorizados,
-                'accesos_denegados': accesos_denegados
+                'accesos_denegados': accesos_denegados,
+                'personas_dentro': personas_dentro
             },
             'graficas': {
                 'accesos_30_dias': accesos_30_dias,
@@ -60,7 +60,7 @@ class Command(BaseCommand):
 
         from authentication.models import Persona, User
         from clientes.models import Cliente
-        from control_acceso.models import Credencial, RegistroAcceso
+        from control_acceso.models import AccesoHora, Credencial, EstadisticaAccesoCliente, OcupacionSede, RegistroAcceso
         from empleados.models import (
             AsignacionTarea,
             Cajero,
@@ -86,22 +86,33 @@ class Command(BaseCommand):
             TipoActividad,
         )
         from instalaciones.models import Espacio, Sede
-        from inventario.models import CategoriaProducto, Inventario, Producto
+        from inventario.models import (
+            CategoriaProducto,
+            Inventario,
+            MovimientoInventario,
+            Producto,
+            SnapshotInventario,
+        )
         from membresias.models import Membresia, SuscripcionMembresia
         from roles.models import PersonaRol, Permiso, Rol, RolPermiso
-        from ventas.models import DetalleVentaProducto, VentaProducto
+        from ventas.models import (
+            DetalleVentaProducto,
+            ResumenVentaProductoDiario,
+            ResumenVentaSedeDiario,
+            VentaProducto,
+        )
 
         # Orden inverso de dependencias
         for model in [
             ChecklistLimpieza, AsignacionTarea, HorarioLimpieza, TareaLimpieza,
             ReservaClase, ReservaEntrenador, ReservaEquipo,
             ClienteMembresia, BloqueoHorario, EquipoActividad, SesionClase, Horario, TipoActividad,
-            DetalleVentaProducto, VentaProducto,
+            ResumenVentaProductoDiario, ResumenVentaSedeDiario, DetalleVentaProducto, VentaProducto,
             Pago, DetalleFactura, Factura,
-            RegistroAcceso, Credencial,
+            AccesoHora, EstadisticaAccesoCliente, OcupacionSede, RegistroAcceso, Credencial,
             SuscripcionMembresia,
             OrdenMantenimiento, Mantenimiento, Activo, CategoriaActivo, ProveedorServicio,
-            Inventario,
+            MovimientoInventario, SnapshotInventario, Inventario,
         ]:
             count = model.objects.all().delete()[0]
             if count:
@@ -778,6 +789,10 @@ class Command(BaseCommand):
                 if created:
                     inv_count += 1
 
+        # Stock inicial del libro de movimientos: las consultas históricas parten de aquí.
+        from inventario.services import snapshot_inventario_crear
+        snapshot_inventario_crear(sede_ids=[sede.pk for sede in sedes])
+
         self._log(f"Productos: {len(productos)} | Inventarios: {inv_count}")
         return productos
 
@@ -846,6 +861,10 @@ class Command(BaseCommand):
 
             ventas_creadas += 1
 
+        # Las ventas demo se insertan directo (sin el servicio): recalcular resúmenes diarios
+        from ventas.services import resumen_ventas_reconstruir
+        resumen_ventas_reconstruir()
+
         self._log(f"Ventas: {ventas_creadas}")
 
     # ------------------------------------------------------------------
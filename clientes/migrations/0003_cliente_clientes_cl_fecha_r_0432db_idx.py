@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_user_options_user_first_name_user_last_name_and_more'),
+        ('clientes', '0002_cliente_sede'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['fecha_registro', 'persona'], name='clientes_cl_fecha_r_0432db_idx'),
+        ),
+    ]
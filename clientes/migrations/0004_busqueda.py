@@ -0,0 +1,47 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def _normalizado(columnas):
+    return (
+        f"regexp_replace(translate(lower(concat_ws(' ', {columnas})), "
+        "'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ', "
+        "'aaaaaeeeeiiiiooooouuuuncaaaaaeeeeiiiiooooouuuunc'), '[^a-z0-9]+', ' ', 'g')"
+    )
+
+
+# Carga inicial de la columna; después la mantienen clientes.signals.
+BUSQUEDA_INICIAL = f"""
+    UPDATE clientes_cliente AS c
+    SET busqueda =
+        setweight(to_tsvector('simple', {_normalizado("p.nombre, p.apellido_paterno, p.apellido_materno")}), 'A')
+        || setweight(to_tsvector('simple', {_normalizado("p.telefono, u.email")}), 'B')
+    FROM authentication_persona AS p
+    LEFT JOIN authentication_user AS u ON u.persona_id = p.id
+    WHERE p.id = c.persona_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_user_options_user_first_name_user_last_name_and_more'),
+        ('clientes', '0003_cliente_clientes_cl_fecha_r_0432db_idx'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='cliente_busqueda_gin'),
+        ),
+        migrations.RunSQL(BUSQUEDA_INICIAL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def _normalizado(columnas):
+    return (
+        f"regexp_replace(translate(lower(concat_ws(' ', {columnas})), "
+        "'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ', "
+        "'aaaaaeeeeiiiiooooouuuuncaaaaaeeeeiiiiooooouuuunc'), '[^a-z0-9]+', ' ', 'g')"
+    )
+
+
+# Recalcula la columna añadiendo el teléfono solo con dígitos (ver clientes.services).
+BUSQUEDA_CON_TELEFONO = f"""
+    UPDATE clientes_cliente AS c
+    SET busqueda =
+        setweight(to_tsvector('simple', {_normalizado("p.nombre, p.apellido_paterno, p.apellido_materno")}), 'A')
+        || setweight(to_tsvector('simple', {_normalizado("p.telefono, u.email")}), 'B')
+        || setweight(to_tsvector('simple', regexp_replace(coalesce(p.telefono, ''), '\\D', '', 'g')), 'B')
+    FROM authentication_persona AS p
+    LEFT JOIN authentication_user AS u ON u.persona_id = p.id
+    WHERE p.id = c.persona_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BUSQUEDA_CON_TELEFONO, migrations.RunSQL.noop),
+    ]
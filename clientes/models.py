@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from authentication.models import Persona
 from instalaciones.models import Sede
@@ -46,6 +48,8 @@ class Cliente(models.Model):
         default='activo'
     )
     fecha_registro = models.DateField(auto_now_add=True)
+    # Nombre, teléfono y email normalizados para la búsqueda (ver clientes.services)
+    busqueda = SearchVectorField(null=True, editable=False)
 
     # Nota: ContactoEmergencia ya está relacionado con Persona mediante OneToOne
     # No necesitamos duplicar los campos de contacto de emergencia aquí
@@ -54,6 +58,10 @@ class Cliente(models.Model):
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['fecha_registro', 'persona']),
+            GinIndex(fields=['busqueda'], name='cliente_busqueda_gin'),
+        ]
 
     def __str__(self):
         return f"{self.persona.nombre} {self.persona.apellido_paterno} - {self.estado}"
@@ -9,7 +9,7 @@ class ClienteSerializer(serializers.ModelSerializer):
     """Serializer básico para el modelo Cliente"""
     class Meta:
         model = Cliente
-        fields = '__all__'
+        exclude = ['busqueda']
 
 
 class ClienteListSerializer(serializers.Serializer):
@@ -0,0 +1,109 @@
+"""
+Capa de servicios de clientes.
+
+- clientes_actualizar_busqueda: recalcula la columna de búsqueda de los clientes
+- clientes_buscar: búsqueda de clientes por nombre, teléfono o email, ordenada por relevancia
+
+Cliente.busqueda es un tsvector (configuración 'simple', sin stemming) con los nombres
+(peso A) y el teléfono y email (peso B) en minúsculas, sin acentos y partidos en palabras
+alfanuméricas, más el teléfono solo con sus dígitos (así "555-123-4567" también es la
+palabra "5551234567"). Un índice GIN lo cubre, así que cada palabra buscada se resuelve como
+prefijo sobre el índice: "ana lop" encuentra a "Ana López", "5512" a los teléfonos que
+empiezan así y "ana.lopez@gm" el email. Las señales de clientes.signals lo mantienen al
+guardar Cliente, Persona o User; quien escriba esas tablas en bloque (QuerySet.update,
+bulk_create) debe llamar a clientes_actualizar_busqueda.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, QuerySet, Value, When
+from django.db.models.functions import Cast
+
+from .models import Cliente
+
+# Los mismos pares se usan con translate() en SQL y con str.translate en Python.
+# Incluye las mayúsculas: con collation C, lower() de Postgres solo cambia ASCII.
+_CON_ACENTO = "áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ"
+_SIN_ACENTO = "aaaaaeeeeiiiiooooouuuunc" * 2
+_PLEGAR_ACENTOS = str.maketrans(_CON_ACENTO, _SIN_ACENTO)
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+_TELEFONO = re.compile(r"^[\d\s()+.-]+$")
+
+
+def _sql_normalizado(columnas: str) -> str:
+    return (
+        f"regexp_replace(translate(lower(concat_ws(' ', {columnas})), %s, %s), "
+        f"'[^a-z0-9]+', ' ', 'g')"
+    )
+
+
+_ACTUALIZAR_BUSQUEDA_SQL = f"""
+    UPDATE clientes_cliente AS c
+    SET busqueda =
+        setweight(to_tsvector('simple', {_sql_normalizado("p.nombre, p.apellido_paterno, p.apellido_materno")}), 'A')
+        || setweight(to_tsvector('simple', {_sql_normalizado("p.telefono, u.email")}), 'B')
+        || setweight(to_tsvector('simple', regexp_replace(coalesce(p.telefono, ''), '\\D', '', 'g')), 'B')
+    FROM authentication_persona AS p
+    LEFT JOIN authentication_user AS u ON u.persona_id = p.id
+    WHERE p.id = c.persona_id
+"""
+
+
+def normalizar_busqueda(texto: str) -> list[str]:
+    """Palabras de `texto` en minúsculas, sin acentos y sin signos, como en el índice."""
+    return _NO_ALFANUMERICO.sub(" ", texto.lower().translate(_PLEGAR_ACENTOS)).split()
+
+
+def clientes_actualizar_busqueda(*, persona_ids: Iterable[int] | None = None) -> int:
+    """Recalcula Cliente.busqueda (todos los clientes o solo los indicados).
+
+    Es un único UPDATE con JOIN a Persona y User; devuelve las filas actualizadas.
+    """
+    sql = _ACTUALIZAR_BUSQUEDA_SQL
+    params: list = [_CON_ACENTO, _SIN_ACENTO] * 2
+    if persona_ids is not None:
+        persona_ids = list(persona_ids)
+        if not persona_ids:
+            return 0
+        sql += " AND c.persona_id = ANY(%s)"
+        params.append(persona_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def clientes_buscar(termino: str, *, queryset: QuerySet | None = None) -> QuerySet:
+    """Clientes que coinciden con `termino`, anotados con `rango` y ordenados por él.
+
+    Cada palabra del término debe ser prefijo de alguna palabra del nombre, apellidos,
+    teléfono o email del cliente (en cualquier orden). Un término numérico también
+    encuentra al cliente con ese ID (con el rango más alto). Un término con forma de
+    teléfono se busca como prefijo de sus dígitos, sin importar los espacios, guiones o
+    paréntesis del término ni los del teléfono guardado.
+    """
+    queryset = Cliente.objects.all() if queryset is None else queryset
+    termino = termino.strip()
+    palabras = normalizar_busqueda(termino)
+    if palabras and _TELEFONO.match(termino):
+        palabras = ["".join(palabras)]
+    if not palabras:
+        return queryset.none()
+
+    consulta = SearchQuery(
+        " & ".join(f"{palabra}:*" for palabra in palabras),
+        search_type="raw",
+        config="simple",
+    )
+    filtro = Q(busqueda=consulta)
+    # ts_rank devuelve real; en double precision el valor que guarda el cursor de
+    # paginación vuelve idéntico al compararlo
+    rango = Cast(SearchRank(F("busqueda"), consulta), FloatField())
+    if termino.isdigit() and len(termino) < 19:
+        filtro |= Q(pk=int(termino))
+        rango = Case(When(pk=int(termino), then=Value(1.0)), default=rango, output_field=FloatField())
+    return queryset.filter(filtro).annotate(rango=rango).order_by("-rango", "pk")
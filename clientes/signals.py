@@ -0,0 +1,39 @@
+"""
+Señales que mantienen Cliente.busqueda al día (ver clientes.services).
+
+Cubren los cambios hechos con save(); las escrituras en bloque deben llamar a
+clientes_actualizar_busqueda explícitamente.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from authentication.models import Persona, User
+
+from .models import Cliente
+from .services import clientes_actualizar_busqueda
+
+
+@receiver(post_save, sender=Cliente)
+def cliente_guardado(sender, instance, update_fields=None, **kwargs):
+    # save() escribe también el valor de busqueda que tenía la instancia en memoria
+    # (None al darlo de alta o si se cargó antes del último cambio), así que se recalcula.
+    if update_fields is not None and "busqueda" not in update_fields:
+        return
+    clientes_actualizar_busqueda(persona_ids=[instance.persona_id])
+
+
+@receiver(post_save, sender=Persona)
+def persona_guardada(sender, instance, created, **kwargs):
+    # Una persona recién creada aún no puede ser cliente.
+    if not created:
+        clientes_actualizar_busqueda(persona_ids=[instance.pk])
+
+
+@receiver(post_save, sender=User)
+def usuario_guardado(sender, instance, update_fields=None, **kwargs):
+    if instance.persona_id is None:
+        return
+    # El login solo actualiza last_login: no cambia nada buscable.
+    if update_fields is not None and "email" not in update_fields and "persona" not in update_fields:
+        return
+    clientes_actualizar_busqueda(persona_ids=[instance.persona_id])
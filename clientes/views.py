@@ -2,8 +2,9 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from gym.paginacion import KeysetPagination
 from .models import Cliente
+from .services import clientes_buscar
 from .serializers import (
     ClienteSerializer,
     ClienteListSerializer,
@@ -12,6 +13,16 @@ from .serializers import (
 )
 
 
+class ClientePagination(KeysetPagination):
+    ordering = ('-fecha_registro',)
+
+    def get_ordering(self, queryset):
+        # Con ?search= clientes_buscar anota 'rango': se pagina por relevancia, como sin paginar
+        if 'rango' in queryset.query.annotations:
+            return ('-rango', 'pk')
+        return self.ordering
+
+
 class ClienteViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar los clientes del gimnasio.
@@ -19,6 +30,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
     """
     queryset = Cliente.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = ClientePagination
 
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción"""
@@ -73,16 +85,10 @@ class ClienteViewSet(viewsets.ModelViewSet):
         if nivel:
             queryset = queryset.filter(nivel_experiencia=nivel)
 
-        # Búsqueda general
+        # Búsqueda general (índice de búsqueda, ordenada por relevancia también al paginar)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(persona__nombre__icontains=search) |
-                Q(persona__apellido_paterno__icontains=search) |
-                Q(persona__apellido_materno__icontains=search) |
-                Q(persona__telefono__icontains=search) |
-                Q(persona__usuario__email__icontains=search)
-            )
+            queryset = clientes_buscar(search, queryset=queryset)
 
         return queryset
 
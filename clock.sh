@@ -0,0 +1,15 @@
+#!/bin/sh
+# Proceso reloj: tareas periódicas de la app. Debe correr en UNA sola instancia
+# (proceso 'clock' del Procfile, servicio 'clock' de docker-compose), nunca en los
+# workers web.
+#
+# vencer_suscripciones es idempotente: correrlo cada hora marca como vencidas las
+# suscripciones a más tardar una hora después de la medianoche en que terminan.
+
+INTERVALO="${RELOJ_INTERVALO_SEGUNDOS:-3600}"
+
+while true; do
+  echo "==> Venciendo suscripciones atrasadas..."
+  python manage.py vencer_suscripciones || echo "==> vencer_suscripciones falló; se reintenta en ${INTERVALO}s"
+  sleep "$INTERVALO"
+done
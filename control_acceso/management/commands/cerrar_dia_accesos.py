@@ -0,0 +1,41 @@
+"""
+Barrido de fin de día del control de acceso (pensado para correr cada noche, después
+de la medianoche).
+
+Uso:
+    python manage.py cerrar_dia_accesos
+    python manage.py cerrar_dia_accesos --dias 7     # tras una semana sin barrido
+
+Cierra las entradas autorizadas de ayer (o de los --dias anteriores) que quedaron sin
+salida (se les pone salida a la medianoche de su día) y recalcula la ocupación de todas las sedes a
+partir de las entradas de hoy aún abiertas. Aunque no corra, el contador se reinicia
+solo con el primer movimiento del día; el barrido además corrige cualquier desvío.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from control_acceso.services import accesos_cerrar_dia
+
+
+class Command(BaseCommand):
+    help = "Cierra las entradas olvidadas de días anteriores y recalcula la ocupación por sede."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=1,
+            help="Días anteriores a hoy que se revisan (default: 1).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["dias"] < 1:
+            raise CommandError("--dias debe ser al menos 1")
+        cerradas = accesos_cerrar_dia(dias=options["dias"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Entradas cerradas: {cerradas}. Ocupación recalculada.")
+        )
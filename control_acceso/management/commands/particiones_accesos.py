@@ -0,0 +1,101 @@
+"""
+Mantenimiento de las particiones mensuales de RegistroAcceso (pensado para correr una
+vez al mes o cada noche; es idempotente).
+
+Uso:
+    python manage.py particiones_accesos
+    python manage.py particiones_accesos --meses 6
+    python manage.py particiones_accesos --separar-antes 2025-01
+    python manage.py particiones_accesos --archivar-antes 2025-01 --directorio /respaldos/accesos
+
+Siempre crea las particiones que falten del mes en curso y los --meses siguientes
+(3 por defecto), y las de meses pasados que tengan registros en la partición DEFAULT;
+al final lista las particiones.
+
+--separar-antes AAAA-MM saca de la tabla los meses anteriores a ese (quedan como
+tablas independientes). --archivar-antes AAAA-MM además exporta cada uno a
+<directorio>/<particion>.csv.gz y lo borra; también archiva los meses que ya se
+habían separado. Ver control_acceso.particiones.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from control_acceso.particiones import (
+    particion_archivar,
+    particion_separar,
+    particiones_crear,
+    particiones_listar,
+)
+
+
+def _mes(valor: str) -> date:
+    try:
+        return datetime.strptime(valor, "%Y-%m").date()
+    except ValueError:
+        raise CommandError(f"Mes inválido '{valor}' (formato AAAA-MM)")
+
+
+class Command(BaseCommand):
+    help = "Crea las particiones mensuales de accesos y separa o archiva las antiguas."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--meses",
+            type=int,
+            default=3,
+            help="Meses por adelantado a crear además del actual (default: 3).",
+        )
+        grupo = parser.add_mutually_exclusive_group()
+        grupo.add_argument(
+            "--separar-antes",
+            type=str,
+            default=None,
+            help="Separa las particiones de meses anteriores a AAAA-MM.",
+        )
+        grupo.add_argument(
+            "--archivar-antes",
+            type=str,
+            default=None,
+            help="Exporta a CSV comprimido y borra las particiones anteriores a AAAA-MM.",
+        )
+        parser.add_argument(
+            "--directorio",
+            type=str,
+            default=None,
+            help="Directorio de los archivos (requerido con --archivar-antes).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["meses"] < 0:
+            raise CommandError("--meses no puede ser negativo")
+        if options["archivar_antes"] and not options["directorio"]:
+            raise CommandError("--archivar-antes requiere --directorio")
+
+        for nombre in particiones_crear(meses=options["meses"]):
+            self.stdout.write(f"  Creada {nombre}")
+
+        limite = options["separar_antes"] or options["archivar_antes"]
+        if limite:
+            limite = _mes(limite)
+            if limite > timezone.localdate().replace(day=1):
+                raise CommandError("Solo se pueden separar o archivar meses ya cerrados")
+            meses = [p["mes"] for p in particiones_listar() if p["mes"] < limite]
+            if options["archivar_antes"]:
+                meses += [p["mes"] for p in particiones_listar(separadas=True) if p["mes"] < limite]
+                for mes in sorted(set(meses)):
+                    ruta = particion_archivar(mes, options["directorio"])
+                    self.stdout.write(f"  Archivado {mes:%Y-%m} en {ruta}")
+            else:
+                for mes in meses:
+                    self.stdout.write(f"  Separada {particion_separar(mes)}")
+
+        particiones = particiones_listar()
+        self.stdout.write(self.style.SUCCESS(f"Particiones de accesos: {len(particiones)}"))
+        for particion in particiones:
+            self.stdout.write(f"  {particion['mes']:%Y-%m}  ~{particion['filas_estimadas']} filas")
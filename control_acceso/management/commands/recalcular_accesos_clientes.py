@@ -0,0 +1,46 @@
+"""
+Recalcula las estadísticas de acceso de los clientes (total de accesos, último acceso
+y su sede) contando el historial de RegistroAcceso.
+
+Uso:
+    python manage.py recalcular_accesos_clientes
+    python manage.py recalcular_accesos_clientes --cliente 12 --cliente 40
+
+Las estadísticas se mantienen solas al registrar cada acceso; este comando repara
+desvíos (registros borrados o editados a mano, cargas directas en la base). Solo
+cuenta los meses que siguen en la tabla, así que tras archivar particiones conviene
+limitarlo a los clientes afectados.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.models import Cliente
+from control_acceso.services import accesos_cliente_recalcular
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde el historial el total y el último acceso de cada cliente."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--cliente",
+            type=int,
+            action="append",
+            default=None,
+            help="ID del cliente a recalcular (se puede repetir). Sin él, todos.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        cliente_ids = options["cliente"]
+        if cliente_ids:
+            existentes = set(Cliente.objects.filter(pk__in=cliente_ids).values_list("pk", flat=True))
+            faltantes = sorted(set(cliente_ids) - existentes)
+            if faltantes:
+                raise CommandError(f"Clientes no encontrados: {faltantes}")
+
+        total = accesos_cliente_recalcular(cliente_ids=cliente_ids)
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas de acceso recalculadas: {total} clientes."))
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_user_options_user_first_name_user_last_name_and_more'),
+        ('clientes', '0003_cliente_clientes_cl_fecha_r_0432db_idx'),
+        ('control_acceso', '0002_alter_credencial_options_and_more'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroacceso',
+            index=models.Index(fields=['fecha_hora_entrada', 'id'], name='control_acc_fecha_h_4f001d_idx'),
+        ),
+    ]
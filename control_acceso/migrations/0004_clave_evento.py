@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_user_options_user_first_name_user_last_name_and_more'),
+        ('clientes', '0004_busqueda'),
+        ('control_acceso', '0003_registroacceso_control_acc_fecha_h_4f001d_idx'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroacceso',
+            name='clave_evento',
+            field=models.CharField(blank=True, max_length=150, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='registroacceso',
+            constraint=models.UniqueConstraint(condition=models.Q(('clave_evento__isnull', False)), fields=('sede', 'clave_evento'), name='registroacceso_evento_unico'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0004_clave_evento'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionSede',
+            fields=[
+                ('sede', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ocupacion', serialize=False, to='instalaciones.sede')),
+                ('personas_dentro', models.PositiveIntegerField(default=0)),
+                ('fecha', models.DateField()),
+                ('actualizado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Ocupación de Sede',
+                'verbose_name_plural': 'Ocupación de Sedes',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Carga inicial con el historial existente; después lo mantiene control_acceso.services.
+ACCESOS_HORA_INICIAL = """
+    INSERT INTO control_acceso_accesohora (sede_id, hora, autorizados, denegados, clientes_unicos)
+    SELECT sede_id, date_trunc('hour', fecha_hora_entrada),
+           count(*) FILTER (WHERE autorizado), count(*) FILTER (WHERE NOT autorizado),
+           count(DISTINCT cliente_id)
+    FROM control_acceso_registroacceso
+    WHERE sede_id IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0005_ocupacion_sede'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccesoHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(help_text='Inicio de la hora (truncada)')),
+                ('autorizados', models.PositiveIntegerField(default=0)),
+                ('denegados', models.PositiveIntegerField(default=0)),
+                ('clientes_unicos', models.PositiveIntegerField(default=0)),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accesos_hora', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Accesos por Hora',
+                'verbose_name_plural': 'Accesos por Hora',
+                'indexes': [models.Index(fields=['hora'], name='control_acc_hora_8398ee_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sede', 'hora'), name='accesohora_sede_hora_unica')],
+            },
+        ),
+        migrations.RunSQL(ACCESOS_HORA_INICIAL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,151 @@
+"""
+Convierte control_acceso_registroacceso en una tabla particionada por mes (rango de
+fecha_hora_entrada), con una partición DEFAULT para los meses que aún no tienen la
+suya. Ver control_acceso.particiones.
+
+Postgres exige que la clave primaria y los índices únicos de una tabla particionada
+incluyan la columna de partición: la PK pasa a (id, fecha_hora_entrada) —id sigue
+saliendo de su secuencia, así que para Django sigue siendo única— y la unicidad de
+clave_evento pasa a (sede, clave_evento, fecha_hora_entrada).
+
+Al revertir se reconstruye una tabla normal con los mismos datos, la PK (id) y la
+unicidad (sede, clave_evento) de 0004. Falla si dos meses distintos repiten la misma
+clave_evento en una sede, algo que la tabla particionada sí admite.
+"""
+from datetime import date, datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+TABLA = 'control_acceso_registroacceso'
+ANTERIOR = f'{TABLA}_anterior'
+
+INDICES = [
+    ('control_acc_cliente_cbe1f9_idx', '(cliente_id, fecha_hora_entrada)'),
+    ('control_acc_sede_id_0551a1_idx', '(sede_id, fecha_hora_entrada)'),
+    ('control_acc_autoriz_2507da_idx', '(autorizado, fecha_hora_entrada)'),
+    ('control_acc_fecha_h_4f001d_idx', '(fecha_hora_entrada, id)'),
+    ('control_acceso_registroacceso_cliente_id_4e8990b5', '(cliente_id)'),
+    ('control_acceso_registroacceso_registrado_por_id_81f13895', '(registrado_por_id)'),
+    ('control_acceso_registroacceso_sede_id_35cde305', '(sede_id)'),
+]
+
+CLAVES_FORANEAS = [
+    ('control_acceso_regis_cliente_id_4e8990b5_fk_clientes_', 'cliente_id', 'clientes_cliente(persona_id)'),
+    ('control_acceso_regis_registrado_por_id_81f13895_fk_authentic', 'registrado_por_id', 'authentication_persona(id)'),
+    ('control_acceso_regis_sede_id_35cde305_fk_instalaci', 'sede_id', 'instalaciones_sede(id)'),
+]
+
+# Meses creados por adelantado; después los crea el comando particiones_accesos.
+MESES_ADELANTE = 3
+
+
+def _siguiente_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _inicio_mes(mes):
+    return timezone.make_aware(datetime.combine(mes, time.min))
+
+
+def particionar(apps, schema_editor):
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {TABLA} RENAME TO {ANTERIOR}')
+    execute(
+        f'CREATE TABLE {TABLA} (LIKE {ANTERIOR} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+        'PARTITION BY RANGE (fecha_hora_entrada)'
+    )
+
+    # Un mes por cada uno con registros, más el actual y los siguientes
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(fecha_hora_entrada) FROM {ANTERIOR}')
+        minimo = cursor.fetchone()[0]
+    hoy = timezone.localdate()
+    mes = min(timezone.localdate(minimo), hoy).replace(day=1) if minimo else hoy.replace(day=1)
+    ultimo = hoy.replace(day=1)
+    for _ in range(MESES_ADELANTE):
+        ultimo = _siguiente_mes(ultimo)
+    while mes <= ultimo:
+        siguiente = _siguiente_mes(mes)
+        execute(
+            f'CREATE TABLE {TABLA}_p{mes:%Y_%m} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)',
+            [_inicio_mes(mes), _inicio_mes(siguiente)],
+        )
+        mes = siguiente
+    execute(f'CREATE TABLE {TABLA}_default PARTITION OF {TABLA} DEFAULT')
+
+    execute(f'INSERT INTO {TABLA} SELECT * FROM {ANTERIOR}')
+    execute(f'DROP TABLE {ANTERIOR}')
+    # La identidad nueva se creó con otro nombre mientras existía la anterior
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT pg_get_serial_sequence('{TABLA}', 'id')")
+        secuencia = cursor.fetchone()[0]
+    execute(f'ALTER SEQUENCE {secuencia} RENAME TO {TABLA}_id_seq')
+    execute(
+        f"SELECT setval('{TABLA}_id_seq', coalesce((SELECT max(id) FROM {TABLA}), 0) + 1, false)"
+    )
+
+    execute(f'ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_pkey PRIMARY KEY (id, fecha_hora_entrada)')
+    for nombre, columna, referencia in CLAVES_FORANEAS:
+        execute(
+            f'ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} FOREIGN KEY ({columna}) '
+            f'REFERENCES {referencia} DEFERRABLE INITIALLY DEFERRED'
+        )
+    for nombre, columnas in INDICES:
+        execute(f'CREATE INDEX {nombre} ON {TABLA} {columnas}')
+    execute(
+        f'CREATE UNIQUE INDEX registroacceso_evento_unico ON {TABLA} '
+        '(sede_id, clave_evento, fecha_hora_entrada) WHERE clave_evento IS NOT NULL'
+    )
+
+
+def desparticionar(apps, schema_editor):
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {TABLA} RENAME TO {ANTERIOR}')
+    execute(f'CREATE TABLE {TABLA} (LIKE {ANTERIOR} INCLUDING DEFAULTS INCLUDING IDENTITY)')
+    execute(f'INSERT INTO {TABLA} SELECT * FROM {ANTERIOR}')
+    # Borra también todas las particiones
+    execute(f'DROP TABLE {ANTERIOR}')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT pg_get_serial_sequence('{TABLA}', 'id')")
+        secuencia = cursor.fetchone()[0]
+    execute(f'ALTER SEQUENCE {secuencia} RENAME TO {TABLA}_id_seq')
+    execute(
+        f"SELECT setval('{TABLA}_id_seq', coalesce((SELECT max(id) FROM {TABLA}), 0) + 1, false)"
+    )
+
+    execute(f'ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_pkey PRIMARY KEY (id)')
+    for nombre, columna, referencia in CLAVES_FORANEAS:
+        execute(
+            f'ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} FOREIGN KEY ({columna}) '
+            f'REFERENCES {referencia} DEFERRABLE INITIALLY DEFERRED'
+        )
+    for nombre, columnas in INDICES:
+        execute(f'CREATE INDEX {nombre} ON {TABLA} {columnas}')
+    execute(
+        f'CREATE UNIQUE INDEX registroacceso_evento_unico ON {TABLA} '
+        '(sede_id, clave_evento) WHERE clave_evento IS NOT NULL'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0006_accesos_hora'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(particionar, desparticionar)],
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='registroacceso',
+                    name='registroacceso_evento_unico',
+                ),
+                migrations.AddConstraint(
+                    model_name='registroacceso',
+                    constraint=models.UniqueConstraint(condition=models.Q(('clave_evento__isnull', False)), fields=('sede', 'clave_evento', 'fecha_hora_entrada'), name='registroacceso_evento_unico'),
+                ),
+            ],
+        ),
+    ]
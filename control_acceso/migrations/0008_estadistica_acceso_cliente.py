@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Carga inicial desde el historial; después lo mantiene control_acceso.services.
+ESTADISTICAS_INICIALES = """
+    INSERT INTO control_acceso_estadisticaaccesocliente
+        (cliente_id, total_accesos, ultimo_acceso, ultima_sede_id)
+    SELECT cliente_id, count(*), max(fecha_hora_entrada),
+           (array_agg(sede_id ORDER BY fecha_hora_entrada DESC, id DESC))[1]
+    FROM control_acceso_registroacceso
+    WHERE cliente_id IS NOT NULL
+    GROUP BY cliente_id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_busqueda'),
+        ('control_acceso', '0007_particionar_registroacceso'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaAccesoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadistica_acceso', serialize=False, to='clientes.cliente')),
+                ('total_accesos', models.PositiveIntegerField(default=0)),
+                ('ultimo_acceso', models.DateTimeField(blank=True, null=True)),
+                ('ultima_sede', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Estadística de Acceso de Cliente',
+                'verbose_name_plural': 'Estadísticas de Acceso de Clientes',
+            },
+        ),
+        migrations.RunSQL(ESTADISTICAS_INICIALES, migrations.RunSQL.noop),
+    ]
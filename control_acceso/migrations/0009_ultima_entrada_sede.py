@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_busqueda'),
+        ('control_acceso', '0008_estadistica_acceso_cliente'),
+        ('instalaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UltimaEntradaSede',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_hora', models.DateTimeField()),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente')),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Última Entrada por Sede',
+                'verbose_name_plural': 'Últimas Entradas por Sede',
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'sede'), name='ultimaentrada_cliente_sede_unica')],
+            },
+        ),
+    ]
@@ -64,6 +64,8 @@ class RegistroAcceso(models.Model):
         blank=True,
         related_name='accesos_registrados'
     )
+    # Identificador del evento de torniquete que creó el registro (descarta reenvíos)
+    clave_evento = models.CharField(max_length=150, blank=True, null=True)
 
     class Meta:
         verbose_name = 'Registro de Acceso'
@@ -73,6 +75,16 @@ class RegistroAcceso(models.Model):
             models.Index(fields=['cliente', 'fecha_hora_entrada']),
             models.Index(fields=['sede', 'fecha_hora_entrada']),
             models.Index(fields=['autorizado', 'fecha_hora_entrada']),
+            models.Index(fields=['fecha_hora_entrada', 'id']),
+        ]
+        # La tabla está particionada por mes (ver control_acceso.particiones): sus índices
+        # únicos deben incluir fecha_hora_entrada.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sede', 'clave_evento', 'fecha_hora_entrada'],
+                condition=models.Q(clave_evento__isnull=False),
+                name='registroacceso_evento_unico',
+            ),
         ]
 
     def __str__(self):
@@ -86,3 +98,94 @@ class RegistroAcceso(models.Model):
             delta = self.fecha_hora_salida - self.fecha_hora_entrada
             return int(delta.total_seconds() / 60)
         return None
+
+
+class OcupacionSede(models.Model):
+    """
+    Personas dentro de cada sede, mantenido de forma incremental por los servicios de
+    acceso (ver control_acceso.services). El contador es del día `fecha`: el primer
+    movimiento de un día nuevo lo reinicia y, si no ha habido ninguno, se lee como 0.
+    """
+    sede = models.OneToOneField(Sede, on_delete=models.CASCADE, primary_key=True, related_name='ocupacion')
+    personas_dentro = models.PositiveIntegerField(default=0)
+    fecha = models.DateField()
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Ocupación de Sede'
+        verbose_name_plural = 'Ocupación de Sedes'
+
+    def __str__(self):
+        return f"{self.sede} - {self.personas_dentro} dentro ({self.fecha})"
+
+
+class AccesoHora(models.Model):
+    """
+    Resumen de accesos por sede y hora, mantenido al insertar cada RegistroAcceso (ver
+    control_acceso.services). Las estadísticas y el mapa de calor leen de aquí en lugar
+    de contar el historial completo.
+    """
+    sede = models.ForeignKey(Sede, on_delete=models.CASCADE, related_name='accesos_hora')
+    hora = models.DateTimeField(help_text="Inicio de la hora (truncada)")
+    autorizados = models.PositiveIntegerField(default=0)
+    denegados = models.PositiveIntegerField(default=0)
+    clientes_unicos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Accesos por Hora'
+        verbose_name_plural = 'Accesos por Hora'
+        constraints = [
+            models.UniqueConstraint(fields=['sede', 'hora'], name='accesohora_sede_hora_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['hora']),
+        ]
+
+    def __str__(self):
+        return f"{self.sede} - {self.hora:%d/%m/%Y %H:00} - {self.autorizados + self.denegados} accesos"
+
+
+class EstadisticaAccesoCliente(models.Model):
+    """
+    Accesos acumulados de cada cliente (intentos autorizados y denegados), su último
+    acceso y la sede de ese acceso. Se actualiza en la misma transacción que inserta
+    cada RegistroAcceso (ver control_acceso.services) y el comando
+    recalcular_accesos_clientes lo rehace desde el historial.
+    """
+    cliente = models.OneToOneField(
+        Cliente, on_delete=models.CASCADE, primary_key=True, related_name='estadistica_acceso'
+    )
+    total_accesos = models.PositiveIntegerField(default=0)
+    ultimo_acceso = models.DateTimeField(null=True, blank=True)
+    ultima_sede = models.ForeignKey(
+        Sede, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        verbose_name = 'Estadística de Acceso de Cliente'
+        verbose_name_plural = 'Estadísticas de Acceso de Clientes'
+
+    def __str__(self):
+        return f"{self.cliente} - {self.total_accesos} accesos"
+
+
+class UltimaEntradaSede(models.Model):
+    """
+    Última entrada aceptada de cada cliente en cada sede. La restricción única sobre
+    (cliente, sede) es la barrera en base de datos contra check-ins repetidos: quien
+    registra una entrada reclama esta fila y, si cae dentro de la ventana de la
+    anterior, no inserta (ver control_acceso.services).
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='+')
+    sede = models.ForeignKey(Sede, on_delete=models.CASCADE, related_name='+')
+    fecha_hora = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Última Entrada por Sede'
+        verbose_name_plural = 'Últimas Entradas por Sede'
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'sede'], name='ultimaentrada_cliente_sede_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente} - {self.sede} - {self.fecha_hora:%d/%m/%Y %H:%M:%S}"
@@ -0,0 +1,184 @@
+"""
+Particiones mensuales de RegistroAcceso (Postgres, por rango de fecha_hora_entrada).
+
+- particiones_listar: particiones mensuales que tiene la tabla
+- particiones_crear: crea las de este mes y los siguientes
+- particion_separar: saca un mes de la tabla (queda como tabla independiente)
+- particion_archivar: exporta un mes a un CSV comprimido y lo borra
+
+Cada mes vive en su propia tabla (control_acceso_registroacceso_pAAAA_MM); las
+consultas que filtran por un rango de fecha_hora_entrada solo leen los meses que
+tocan, y purgar historial es quitar una partición en lugar de un DELETE masivo.
+Una partición DEFAULT recibe los registros de meses sin partición; al crear uno de
+esos meses, sus filas se mueven de la DEFAULT a la nueva partición.
+
+Los meses son del calendario local (TIME_ZONE). Las estadísticas de AccesoHora no
+dependen del historial, así que siguen disponibles después de archivar.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import RegistroAcceso
+
+TABLA = RegistroAcceso._meta.db_table
+PARTICION_DEFAULT = f"{TABLA}_default"
+_NOMBRE_MES = re.compile(rf"^{TABLA}_p(\d{{4}})_(\d{{2}})$")
+
+
+def _siguiente_mes(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _inicio_mes(mes: date) -> datetime:
+    return timezone.make_aware(datetime.combine(mes.replace(day=1), time.min))
+
+
+def particion_nombre(mes: date) -> str:
+    return f"{TABLA}_p{mes:%Y_%m}"
+
+
+def particiones_listar(*, separadas: bool = False) -> list[dict[str, Any]]:
+    """Particiones mensuales ordenadas por mes: [{"nombre", "mes", "filas_estimadas"}].
+
+    Con separadas=True devuelve en cambio las tablas de meses ya separadas con
+    particion_separar (pendientes de archivar).
+    """
+    with connection.cursor() as cursor:
+        if separadas:
+            cursor.execute(
+                """
+                SELECT c.relname, c.reltuples FROM pg_class c
+                WHERE c.relkind = 'r' AND NOT c.relispartition AND c.relname LIKE %s
+                  AND pg_table_is_visible(c.oid)
+                """,
+                [f"{TABLA}_p%"],
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT c.relname, c.reltuples FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                """,
+                [TABLA],
+            )
+        filas = cursor.fetchall()
+    particiones = []
+    for nombre, tuplas in filas:
+        coincide = _NOMBRE_MES.match(nombre)
+        if coincide:
+            particiones.append({
+                "nombre": nombre,
+                "mes": date(int(coincide[1]), int(coincide[2]), 1),
+                "filas_estimadas": max(int(tuplas), 0),
+            })
+    return sorted(particiones, key=lambda p: p["mes"])
+
+
+def particiones_crear(*, meses: int = 3, desde: date | None = None) -> list[str]:
+    """Crea las particiones que falten del mes de `desde` (hoy por defecto) y los `meses`
+    siguientes, y las de los meses que tengan filas en la partición DEFAULT.
+    Devuelve los nombres creados.
+
+    Las filas de cada mes nuevo que estuvieran en la DEFAULT se mueven a su partición
+    en la misma transacción, con la DEFAULT bloqueada contra inserciones mientras tanto.
+    """
+    mes = (desde or timezone.localdate()).replace(day=1)
+    pendientes = set()
+    for _ in range(meses + 1):
+        pendientes.add(mes)
+        mes = _siguiente_mes(mes)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT date_trunc('month', fecha_hora_entrada AT TIME ZONE %s)::date
+            FROM "{PARTICION_DEFAULT}"
+            """,
+            [timezone.get_current_timezone_name()],
+        )
+        pendientes.update(fila[0] for fila in cursor.fetchall())
+
+    existentes = {p["mes"] for p in particiones_listar()}
+    creadas = []
+    for mes in sorted(pendientes - existentes):
+        _crear_particion(mes)
+        creadas.append(particion_nombre(mes))
+    return creadas
+
+
+def _crear_particion(mes: date) -> None:
+    nombre = particion_nombre(mes)
+    inicio, fin = _inicio_mes(mes), _inicio_mes(_siguiente_mes(mes))
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Hasta el ATTACH nadie puede insertar en la DEFAULT: una fila del mes que
+        # llegara entre el DELETE y el ATTACH haría fallar este último
+        cursor.execute(f'LOCK TABLE "{PARTICION_DEFAULT}" IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(f'CREATE TABLE "{nombre}" (LIKE "{TABLA}")')
+        cursor.execute(
+            f"""
+            WITH movidos AS (
+                DELETE FROM "{PARTICION_DEFAULT}"
+                WHERE fecha_hora_entrada >= %s AND fecha_hora_entrada < %s
+                RETURNING *
+            )
+            INSERT INTO "{nombre}" SELECT * FROM movidos
+            """,
+            [inicio, fin],
+        )
+        # Al adjuntarla hereda los índices y restricciones de la tabla
+        cursor.execute(
+            f'ALTER TABLE "{TABLA}" ATTACH PARTITION "{nombre}" FOR VALUES FROM (%s) TO (%s)',
+            [inicio, fin],
+        )
+
+
+def particion_separar(mes: date) -> str:
+    """Saca de RegistroAcceso la partición del mes; queda como tabla independiente
+    (consultable a mano, fuera de las consultas de la app). Devuelve su nombre.
+
+    Raises:
+        ValueError: Si el mes no tiene partición o es el mes en curso o posterior.
+    """
+    mes = mes.replace(day=1)
+    if mes >= timezone.localdate().replace(day=1):
+        raise ValueError("No se puede separar el mes en curso ni uno futuro")
+    nombre = particion_nombre(mes)
+    if mes not in {p["mes"] for p in particiones_listar()}:
+        raise ValueError(f"No existe la partición {nombre}")
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLA}" DETACH PARTITION "{nombre}"')
+    return nombre
+
+
+def particion_archivar(mes: date, directorio: str | os.PathLike) -> Path:
+    """Separa (si hace falta) la partición del mes, la exporta a
+    `directorio`/<nombre>.csv.gz (COPY en CSV con encabezado) y borra la tabla.
+
+    La tabla solo se borra después de escribir y sincronizar el archivo.
+    """
+    mes = mes.replace(day=1)
+    nombre = particion_nombre(mes)
+    if nombre not in {p["nombre"] for p in particiones_listar(separadas=True)}:
+        particion_separar(mes)
+
+    destino = Path(directorio) / f"{nombre}.csv.gz"
+    temporal = destino.with_name(destino.name + ".parcial")
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with connection.cursor() as cursor:
+        with open(temporal, "wb") as crudo:
+            with gzip.GzipFile(fileobj=crudo, mode="wb") as archivo:
+                cursor.copy_expert(f'COPY "{nombre}" TO STDOUT WITH (FORMAT csv, HEADER)', archivo)
+            crudo.flush()
+            os.fsync(crudo.fileno())
+        os.replace(temporal, destino)
+        cursor.execute(f'DROP TABLE "{nombre}"')
+    return destino
@@ -46,6 +46,41 @@ class RegistrarAccesoSerializer(serializers.Serializer):
     notas = serializers.CharField(required=False, allow_blank=True)
 
 
+class EscanearCredencialSerializer(serializers.Serializer):
+    """Serializer para el check-in por credencial (QR/RFID) desde un torniquete"""
+    identificador = serializers.CharField(required=True, max_length=100)
+    sede_id = serializers.IntegerField(required=True)
+
+
+class EventoAccesoSerializer(serializers.Serializer):
+    """Un evento de torniquete: entrada o salida de un titular en una sede"""
+    identificador = serializers.CharField(required=False, max_length=100)
+    cliente_id = serializers.IntegerField(required=False)
+    sede_id = serializers.IntegerField()
+    fecha_hora = serializers.DateTimeField()
+    direccion = serializers.ChoiceField(choices=['entrada', 'salida'], default='entrada')
+    evento_id = serializers.CharField(
+        required=False,
+        max_length=150,
+        help_text="ID único del evento en el controlador; si falta se deriva del titular y la hora"
+    )
+
+    def validate(self, data):
+        if bool(data.get('identificador')) == bool(data.get('cliente_id')):
+            raise serializers.ValidationError("Indica identificador o cliente_id (solo uno)")
+        return data
+
+
+class IngestarEventosSerializer(serializers.Serializer):
+    """Lote de eventos de torniquete"""
+    eventos = EventoAccesoSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class RegistrarSalidaSerializer(serializers.Serializer):
+    """Serializer para el check-out manual de un registro de acceso"""
+    fecha_hora = serializers.DateTimeField(required=False)
+
+
 class ClienteAccesoInfoSerializer(serializers.Serializer):
     """Serializer para devolver información del cliente para validación de acceso"""
     cliente_id = serializers.IntegerField()
@@ -75,6 +110,7 @@ class ClienteAccesoInfoSerializer(serializers.Serializer):
     # Estadísticas de acceso
     total_accesos = serializers.IntegerField()
     ultimo_acceso = serializers.DateTimeField(allow_null=True)
+    ultima_sede_nombre = serializers.CharField(allow_null=True)
 
 
 class CredencialSerializer(serializers.ModelSerializer):
@@ -0,0 +1,23 @@
+"""
+Señales de control de acceso: por cada registro nuevo suman su hora al resumen
+AccesoHora y el acceso a la estadística de su cliente (ver control_acceso.services),
+en la misma transacción que el INSERT, y avisan a los flujos SSE (ver
+control_acceso.stream). El NOTIFY viaja en la misma transacción, así que solo se
+entrega si se confirma.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import RegistroAcceso
+from .services import accesos_cliente_sumar, accesos_hora_sumar
+from .stream import notificar_registros
+
+
+@receiver(post_save, sender=RegistroAcceso)
+def registro_creado(sender, instance, created, **kwargs):
+    if not created:
+        return
+    accesos_hora_sumar([instance])
+    accesos_cliente_sumar([instance])
+    if instance.sede_id:
+        notificar_registros([instance.sede_id])
@@ -0,0 +1,256 @@
+"""
+Flujo de eventos (SSE) con los nuevos registros de acceso de una sede, para las
+pantallas de recepción.
+
+Cada INSERT de RegistroAcceso emite un NOTIFY en CANAL_REGISTROS con la sede como
+payload (señal post_save y acceso_ingestar_eventos); Postgres lo entrega al confirmar
+la transacción. Cada proceso escucha el canal con una sola conexión psycopg2 (Escucha),
+atendida desde el event loop sin ocupar hilos, y reparte los avisos entre los flujos
+suscritos; cada flujo, al despertar, lee los registros nuevos de su sede por id.
+
+Solo funciona servido por ASGI (gym.asgi): bajo WSGI la respuesta de un iterador
+asíncrono se consume entera antes de enviarse, así que la vista lo rechaza.
+
+Reanudación sin huecos: los id se asignan al hacer el INSERT pero se vuelven visibles
+al confirmar, así que un id menor puede aparecer después de uno mayor. Por eso el
+token (campo id: de cada evento, que EventSource reenvía como Last-Event-ID al
+reconectar) es un id "firme": solo avanza ASENTAMIENTO segundos después de haber visto
+ese registro, y cada lectura parte de él descartando lo ya enviado. Al reanudar se
+pueden repetir los eventos de esos últimos segundos; el cliente los reconoce por data.id.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import Any, AsyncIterator
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from .models import RegistroAcceso
+
+CANAL_REGISTROS = "control_acceso_registros"
+# Segundos que se espera a que aparezcan ids menores antes de dar el cursor por firme.
+ASENTAMIENTO = 10
+# Cada cuánto se manda un comentario para que proxies y balanceadores no corten la conexión.
+LATIDO = 15
+LIMITE_LOTE = 200
+
+logger = logging.getLogger(__name__)
+
+
+def notificar_registros(sede_ids) -> None:
+    """Avisa a los flujos SSE de que hay registros nuevos en esas sedes."""
+    with connection.cursor() as cursor:
+        for sede_id in sorted(set(sede_ids)):
+            cursor.execute("SELECT pg_notify(%s, %s)", [CANAL_REGISTROS, str(sede_id)])
+
+
+class CursorRegistros:
+    """Posición de un flujo: `base` (todo id <= base ya se envió) y los id enviados por
+    encima de ella, con el momento en que se vieron."""
+
+    def __init__(self, base: int):
+        self.base = base
+        self.recientes: dict[int, float] = {}
+
+    @classmethod
+    def desde_token(cls, token: str) -> "CursorRegistros":
+        """ValueError si el token no es válido."""
+        base = int(token)
+        if base < 0:
+            raise ValueError("token negativo")
+        return cls(base)
+
+    @property
+    def token(self) -> str:
+        return str(self.base)
+
+    def nuevos(self, filas: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Filtra las filas ya enviadas, anota las nuevas y avanza la base que ya es firme."""
+        ahora = time.monotonic()
+        nuevas = [fila for fila in filas if fila["id"] not in self.recientes]
+        for fila in nuevas:
+            self.recientes[fila["id"]] = ahora
+        firmes = [i for i, visto in self.recientes.items() if ahora - visto >= ASENTAMIENTO]
+        if firmes:
+            self.base = max(self.base, max(firmes))
+            self.recientes = {i: visto for i, visto in self.recientes.items() if i > self.base}
+        return nuevas
+
+
+def ultimo_registro_id(sede_id: int) -> int:
+    return RegistroAcceso.objects.filter(sede_id=sede_id).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def registros_despues_de(sede_id: int, desde_id: int) -> list[dict[str, Any]]:
+    return list(
+        RegistroAcceso.objects.filter(sede_id=sede_id, id__gt=desde_id)
+        .order_by("id")
+        .values(
+            "id",
+            "cliente_id",
+            "cliente__persona__nombre",
+            "cliente__persona__apellido_paterno",
+            "sede_id",
+            "fecha_hora_entrada",
+            "fecha_hora_salida",
+            "autorizado",
+            "motivo_denegado",
+            "membresia_nombre",
+        )[:LIMITE_LOTE]
+    )
+
+
+def _evento(fila: dict[str, Any], token: str) -> str:
+    datos = {
+        "id": fila["id"],
+        "cliente_id": fila["cliente_id"],
+        "cliente_nombre": " ".join(
+            filter(None, [fila["cliente__persona__nombre"], fila["cliente__persona__apellido_paterno"]])
+        ),
+        "sede_id": fila["sede_id"],
+        "fecha_hora_entrada": fila["fecha_hora_entrada"],
+        "fecha_hora_salida": fila["fecha_hora_salida"],
+        "autorizado": fila["autorizado"],
+        "motivo_denegado": fila["motivo_denegado"],
+        "membresia_nombre": fila["membresia_nombre"],
+    }
+    return f"id: {token}\nevent: acceso\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _conectar() -> Any:
+    """Conexión propia (fuera del pool de Django) suscrita al canal."""
+    conexion = psycopg2.connect(**connection.get_connection_params())
+    conexion.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conexion.cursor() as cursor:
+        cursor.execute(f"LISTEN {CANAL_REGISTROS}")
+    return conexion
+
+
+class Escucha:
+    """La conexión LISTEN de un event loop, compartida por todos sus flujos.
+
+    Se abre con el primer suscriptor y se cierra con el último. Cada suscriptor recibe
+    un asyncio.Event que se activa cuando llega un aviso de su sede (o se pierde la
+    conexión, para que vuelva a leer).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._conexion: Any = None
+        self._fd: int | None = None
+        self._abriendo = asyncio.Lock()
+        self._suscriptores: dict[str, set[asyncio.Event]] = {}
+
+    @property
+    def conectada(self) -> bool:
+        return self._conexion is not None
+
+    async def suscribir(self, sede_id: int) -> asyncio.Event:
+        aviso = asyncio.Event()
+        self._suscriptores.setdefault(str(sede_id), set()).add(aviso)
+        try:
+            await self.asegurar()
+        except BaseException:
+            self.desuscribir(sede_id, aviso)
+            raise
+        return aviso
+
+    def desuscribir(self, sede_id: int, aviso: asyncio.Event) -> None:
+        avisos = self._suscriptores.get(str(sede_id), set())
+        avisos.discard(aviso)
+        if not avisos:
+            self._suscriptores.pop(str(sede_id), None)
+        if not self._suscriptores:
+            self._cerrar()
+
+    async def asegurar(self) -> None:
+        """Abre (o reabre, si se perdió) la conexión."""
+        async with self._abriendo:
+            if self._conexion is not None or not self._suscriptores:
+                return
+            conexion = await sync_to_async(_conectar, thread_sensitive=False)()
+            if not self._suscriptores:
+                conexion.close()
+                return
+            self._conexion, self._fd = conexion, conexion.fileno()
+            self._loop.add_reader(self._fd, self._leer)
+
+    def _leer(self) -> None:
+        try:
+            self._conexion.poll()
+        except psycopg2.Error:
+            logger.warning("Se perdió la conexión LISTEN de %s; se reabrirá", CANAL_REGISTROS)
+            self._cerrar()
+            for avisos in self._suscriptores.values():
+                for aviso in avisos:
+                    aviso.set()
+            return
+        sedes = {aviso.payload for aviso in self._conexion.notifies}
+        self._conexion.notifies.clear()
+        for sede in sedes:
+            for aviso in self._suscriptores.get(sede, ()):
+                aviso.set()
+
+    def _cerrar(self) -> None:
+        if self._conexion is None:
+            return
+        self._loop.remove_reader(self._fd)
+        try:
+            self._conexion.close()
+        finally:
+            self._conexion, self._fd = None, None
+
+
+_escuchas: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Escucha] = weakref.WeakKeyDictionary()
+
+
+def escucha_actual() -> Escucha:
+    """La Escucha del event loop en curso (una por proceso con un servidor ASGI)."""
+    loop = asyncio.get_running_loop()
+    if loop not in _escuchas:
+        _escuchas[loop] = Escucha(loop)
+    return _escuchas[loop]
+
+
+async def eventos_registros(
+    sede_id: int,
+    cursor: CursorRegistros | None = None,
+    *,
+    latido: float = LATIDO,
+) -> AsyncIterator[str]:
+    """Genera el flujo SSE de la sede desde `cursor` (o desde ahora si es None)."""
+    if cursor is None:
+        cursor = CursorRegistros(await sync_to_async(ultimo_registro_id)(sede_id))
+    escucha = escucha_actual()
+    aviso = await escucha.suscribir(sede_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            # Se limpia antes de leer: un aviso que llegue durante la lectura no se pierde
+            aviso.clear()
+            # Se lee desde la base firme (los id recientes se vuelven a leer y se descartan);
+            # si hay más de un lote pendiente se sigue desde el último leído.
+            desde = cursor.base
+            while True:
+                filas = await sync_to_async(registros_despues_de)(sede_id, desde)
+                for fila in cursor.nuevos(filas):
+                    yield _evento(fila, cursor.token)
+                if len(filas) < LIMITE_LOTE:
+                    break
+                desde = filas[-1]["id"]
+            await escucha.asegurar()
+            # Con ids sin asentar se vuelve a mirar antes, aunque no llegue aviso
+            espera = min(latido, ASENTAMIENTO) if cursor.recientes else latido
+            try:
+                await asyncio.wait_for(aviso.wait(), espera)
+            except asyncio.TimeoutError:
+                yield ": latido\n\n"
+    finally:
+        escucha.desuscribir(sede_id, aviso)
@@ -5,7 +5,13 @@ urlpatterns = [
     # Endpoints de validación y registro de acceso
     path('registros/validar_acceso/', views.validar_acceso, name='validar-acceso'),
     path('registros/registrar_acceso/', views.registrar_acceso, name='registrar-acceso'),
+    path('registros/escanear/', views.escanear_credencial, name='escanear-credencial'),
+    path('registros/eventos/', views.ingestar_eventos, name='ingestar-eventos'),
+    path('registros/<int:pk>/salida/', views.registrar_salida, name='registrar-salida'),
+    path('registros/ocupacion/', views.ocupacion_sedes, name='ocupacion-sedes'),
+    path('registros/stream/', views.stream_registros, name='stream-registros'),
     path('registros/estadisticas/', views.estadisticas_acceso, name='estadisticas-acceso'),
+    path('registros/mapa_calor/', views.mapa_calor_accesos, name='mapa-calor-accesos'),
 
     # CRUD de registros (opcional)
     path('registros/', views.listar_registros, name='listar-registros'),
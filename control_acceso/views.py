@@ -3,18 +3,42 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .permissions import EsAdministradorOCajeroAcceso
-from django.db.models import Q, Count
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
-
-from .models import RegistroAcceso, Credencial
+from datetime import date, datetime, time, timedelta
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from gym.paginacion import KeysetPagination
+from .models import RegistroAcceso, Credencial, EstadisticaAccesoCliente
 from .serializers import (
     RegistroAccesoSerializer,
     ValidarAccesoSerializer,
     RegistrarAccesoSerializer,
+    EscanearCredencialSerializer,
+    IngestarEventosSerializer,
+    RegistrarSalidaSerializer,
+)
+from .services import (
+    acceso_escanear_credencial,
+    acceso_ingestar_eventos,
+    acceso_registrar_entrada,
+    acceso_registrar_salida,
+    acceso_repetido_reciente,
+    accesos_mapa_calor,
+    accesos_por_dia,
+    ocupacion_actual,
 )
+from .stream import CursorRegistros, eventos_registros
 from clientes.models import Cliente
-from membresias.models import SuscripcionMembresia
+from clientes.services import clientes_buscar
+from membresias.models import Membresia
+from membresias.services import elegibilidad_acceso_sede, elegibilidad_cliente
 from instalaciones.models import Sede
 
 
@@ -32,36 +56,11 @@ def validar_acceso(request):
     search_term = serializer.validated_data['search_term']
     sede_id = serializer.validated_data['sede_id']
 
-    # Buscar cliente por ID, nombre, apellido, teléfono o email
-    query = Q(persona__nombre__icontains=search_term) | \
-            Q(persona__apellido_paterno__icontains=search_term) | \
-            Q(persona__apellido_materno__icontains=search_term) | \
-            Q(persona__telefono__icontains=search_term) | \
-            Q(persona__usuario__email__icontains=search_term)
-
-    # Si el término de búsqueda es numérico, buscar también por ID
-    if search_term.strip().isdigit():
-        query |= Q(persona_id=int(search_term.strip()))
-
-    # Búsqueda por nombre completo (si tiene espacios, buscar como nombre completo)
-    if ' ' in search_term.strip():
-        palabras = search_term.strip().split()
-        # Intentar buscar por combinación de nombre y apellidos
-        if len(palabras) >= 2:
-            query |= (
-                Q(persona__nombre__icontains=palabras[0]) &
-                Q(persona__apellido_paterno__icontains=palabras[1])
-            )
-            if len(palabras) >= 3:
-                query |= (
-                    Q(persona__nombre__icontains=palabras[0]) &
-                    Q(persona__apellido_paterno__icontains=palabras[1]) &
-                    Q(persona__apellido_materno__icontains=palabras[2])
-                )
-
-    clientes = Cliente.objects.filter(query).select_related('persona', 'persona__usuario').distinct()
-
-    if not clientes.exists():
+    # Buscar cliente por ID, nombre, apellidos, teléfono o email (ordenado por relevancia)
+    clientes = clientes_buscar(search_term).select_related('persona', 'persona__usuario')
+    encontrados = list(clientes[:11])
+
+    if not encontrados:
         return Response({
             'encontrado': False,
             'mensaje': 'No se encontró ningún cliente con ese criterio de búsqueda',
@@ -69,9 +68,10 @@ def validar_acceso(request):
         }, status=status.HTTP_200_OK)
 
     # Si hay múltiples resultados, devolver lista para que el usuario seleccione
-    if clientes.count() > 1:
+    if len(encontrados) > 1:
+        total = len(encontrados) if len(encontrados) <= 10 else clientes.count()
         resultados = []
-        for cliente in clientes[:10]:  # Limitar a 10 resultados
+        for cliente in encontrados[:10]:  # Limitar a 10 resultados
             persona = cliente.persona
             resultados.append({
                 'cliente_id': cliente.persona_id,
@@ -83,12 +83,12 @@ def validar_acceso(request):
         return Response({
             'encontrado': True,
             'multiple': True,
-            'mensaje': f'Se encontraron {clientes.count()} clientes. Selecciona uno:',
+            'mensaje': f'Se encontraron {total} clientes. Selecciona uno:',
             'clientes': resultados
         })
 
     # Un solo resultado - validar acceso
-    cliente = clientes.first()
+    cliente = encontrados[0]
     return _validar_cliente_acceso(cliente, sede_id)
 
 
@@ -119,35 +119,21 @@ def registrar_acceso(request):
             'error': 'Sede no encontrada'
         }, status=status.HTTP_404_NOT_FOUND)
 
-    # Obtener membresía activa
-    suscripcion_activa = SuscripcionMembresia.objects.filter(
-        cliente=cliente,
-        estado='activa'
-    ).order_by('-fecha_inicio').first()
-
-    # Validar acceso
-    puede_acceder = False
-    motivo_denegado = None
-    membresia_nombre = None
-    membresia_estado = None
-
-    if not suscripcion_activa:
-        motivo_denegado = 'No tiene membresía activa'
-    else:
-        membresia_nombre = suscripcion_activa.membresia.nombre_plan
-        membresia_estado = suscripcion_activa.estado
-
-        # Verificar si la membresía permite acceso a esta sede
-        if suscripcion_activa.membresia.permite_todas_sedes:
-            puede_acceder = True
-        elif suscripcion_activa.sede_suscripcion_id == sede_id:
-            puede_acceder = True
-        else:
-            sede_nombre = suscripcion_activa.sede_suscripcion.nombre if suscripcion_activa.sede_suscripcion else 'sede específica'
-            motivo_denegado = f'La membresía solo permite acceso a {sede_nombre}'
-
-    # Crear registro de acceso
-    registro = RegistroAcceso.objects.create(
+    # Doble clic o reintento dentro de la ventana: se devuelve el registro original
+    repetido = acceso_repetido_reciente(cliente_id=cliente.persona_id, sede_id=sede.pk)
+    if repetido is not None:
+        return _respuesta_registro(repetido, creado=False)
+
+    # Validar acceso con la elegibilidad en caché del cliente
+    suscripciones = elegibilidad_cliente(cliente_id=cliente.persona_id)
+    suscripcion, motivo_denegado = elegibilidad_acceso_sede(suscripciones, sede_id=sede_id)
+    puede_acceder = suscripcion is not None
+    suscripcion = suscripcion or (suscripciones[0] if suscripciones else None)
+    membresia_nombre = suscripcion['membresia_nombre'] if suscripcion else None
+    membresia_estado = 'activa' if suscripcion else None
+
+    # Crear registro de acceso (y sumar a la ocupación de la sede si entra)
+    registro, creado = acceso_registrar_entrada(RegistroAcceso(
         cliente=cliente,
         sede=sede,
         autorizado=puede_acceder,
@@ -156,14 +142,191 @@ def registrar_acceso(request):
         membresia_estado=membresia_estado,
         notas=notas,
         registrado_por=request.user.persona if hasattr(request.user, 'persona') else None
-    )
+    ))
+    return _respuesta_registro(registro, creado=creado)
 
-    serializer_response = RegistroAccesoSerializer(registro)
 
+def _respuesta_registro(registro, *, creado):
+    """201 con el registro nuevo, o 200 con el original si el check-in era repetido."""
     return Response({
-        'mensaje': '✓ Acceso autorizado' if puede_acceder else '✗ Acceso denegado',
-        'registro': serializer_response.data
-    }, status=status.HTTP_201_CREATED)
+        'mensaje': '✓ Acceso autorizado' if registro.autorizado else '✗ Acceso denegado',
+        'registro': RegistroAccesoSerializer(registro).data,
+        'duplicado': not creado,
+    }, status=status.HTTP_201_CREATED if creado else status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([EsAdministradorOCajeroAcceso])
+def escanear_credencial(request):
+    """
+    Endpoint de check-in por credencial (QR/RFID) para torniquetes.
+    POST /api/accesos/registros/escanear/
+    Body: { "identificador": "CRED-000123", "sede_id": 1 }
+
+    Registra el acceso (autorizado o denegado) y devuelve una respuesta mínima para
+    abrir o no el torniquete.
+    """
+    serializer = EscanearCredencialSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    try:
+        resultado = acceso_escanear_credencial(
+            identificador=serializer.validated_data['identificador'],
+            sede_id=serializer.validated_data['sede_id'],
+            registrado_por_id=getattr(request.user, 'persona_id', None),
+        )
+    except Sede.DoesNotExist:
+        return Response({
+            'error': 'Sede no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    if resultado is None:
+        return Response({
+            'error': 'Credencial no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Una relectura dentro de la ventana devuelve el registro original con 200
+    registro, creado = resultado
+    return Response({
+        'autorizado': registro.autorizado,
+        'motivo_denegado': registro.motivo_denegado,
+        'registro_id': registro.id,
+        'cliente_id': registro.cliente_id,
+        'membresia_nombre': registro.membresia_nombre,
+        'duplicado': not creado,
+    }, status=status.HTTP_201_CREATED if creado else status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([EsAdministradorOCajeroAcceso])
+def ingestar_eventos(request):
+    """
+    Endpoint de ingesta en bloque para controladores de torniquetes.
+    POST /api/accesos/registros/eventos/
+    Body: { "eventos": [ { "identificador": "CRED-000123" | "cliente_id": 5,
+                           "sede_id": 1, "fecha_hora": "2026-03-02T06:01:13-06:00",
+                           "direccion": "entrada" | "salida", "evento_id": "..." }, ... ] }
+
+    Hasta 1000 eventos por petición. Reenviar un lote es seguro: los eventos ya
+    registrados se cuentan como duplicados.
+    """
+    serializer = IngestarEventosSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    resultado = acceso_ingestar_eventos(
+        serializer.validated_data['eventos'],
+        registrado_por_id=getattr(request.user, 'persona_id', None),
+    )
+    return Response(resultado, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([EsAdministradorOCajeroAcceso])
+def registrar_salida(request, pk):
+    """
+    Endpoint para registrar la salida (check-out manual) de un acceso.
+    POST /api/accesos/registros/<id>/salida/
+    Body (opcional): { "fecha_hora": "2026-03-02T08:15:00-06:00" }  (por defecto, ahora)
+    """
+    serializer = RegistrarSalidaSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    try:
+        registro = acceso_registrar_salida(
+            registro_id=pk,
+            fecha_hora=serializer.validated_data.get('fecha_hora'),
+        )
+    except RegistroAcceso.DoesNotExist:
+        return Response({
+            'error': 'Registro no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except ValidationError as e:
+        return Response({
+            'error': ' '.join(e.messages)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(RegistroAccesoSerializer(registro).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ocupacion_sedes(request):
+    """
+    Endpoint ligero con las personas dentro de cada sede (lee el contador, no los registros).
+    GET /api/accesos/registros/ocupacion/?[sede=1]
+    """
+    sede_id = request.query_params.get('sede', None)
+    if sede_id is not None and not sede_id.isdigit():
+        return Response({
+            'error': 'El parámetro sede debe ser un ID numérico'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response(ocupacion_actual(sede_id=int(sede_id) if sede_id else None))
+
+
+def _autorizar_stream(request, sede_id):
+    """
+    Autenticación del flujo SSE (fuera de DRF). Acepta el JWT en Authorization o en
+    ?token=, porque EventSource no permite cabeceras. Devuelve None o (status, error).
+    """
+    autenticador = JWTAuthentication()
+    try:
+        resultado = autenticador.authenticate(request)
+        if resultado is None and request.GET.get('token'):
+            token = autenticador.get_validated_token(request.GET['token'])
+            resultado = (autenticador.get_user(token), token)
+    except (InvalidToken, AuthenticationFailed):
+        resultado = None
+    if resultado is None:
+        return 401, 'Credenciales no válidas'
+
+    request.user = resultado[0]
+    permiso = EsAdministradorOCajeroAcceso()
+    if not permiso.has_permission(request, None):
+        return 403, 'No tiene permiso para ver los accesos'
+    if not Sede.objects.filter(pk=sede_id).exists():
+        return 404, 'Sede no encontrada'
+    if not permiso.has_object_permission(request, None, RegistroAcceso(sede_id=sede_id)):
+        return 403, 'Solo puede ver los accesos de su sede'
+    return None
+
+
+async def stream_registros(request):
+    """
+    Flujo SSE con los registros de acceso nuevos de una sede (pantallas de recepción).
+    GET /api/accesos/registros/stream/?sede=1[&token=<jwt>][&desde=<id>]
+
+    Cada evento `acceso` lleva en data el registro y en id un token de reanudación; al
+    reconectar, EventSource lo manda en Last-Event-ID (o se pasa en ?desde=) y el flujo
+    continúa sin huecos. Requiere la aplicación ASGI (gym.asgi); bajo WSGI responde 503.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    sede_id = request.GET.get('sede', '')
+    if not sede_id.isdigit():
+        return JsonResponse({'error': 'El parámetro sede es requerido y debe ser numérico'}, status=400)
+    sede_id = int(sede_id)
+
+    error = await sync_to_async(_autorizar_stream)(request, sede_id)
+    if error:
+        return JsonResponse({'error': error[1]}, status=error[0])
+
+    cursor = None
+    token = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    if token:
+        try:
+            cursor = CursorRegistros.desde_token(token)
+        except ValueError:
+            return JsonResponse({'error': 'Token de reanudación no válido'}, status=400)
+
+    # Bajo WSGI Django consume el iterador asíncrono entero antes de enviar nada, y
+    # este no termina nunca: se dejaría colgado el worker.
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'El flujo de accesos requiere el servidor ASGI'}, status=503)
+
+    response = StreamingHttpResponse(eventos_registros(sede_id, cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule el flujo en su búfer
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['GET'])
@@ -172,45 +335,80 @@ def estadisticas_acceso(request):
     """
     Endpoint para obtener estadísticas de accesos.
     GET /api/accesos/registros/estadisticas/?sede=1
+
+    Los conteos salen del resumen por hora (AccesoHora), no del historial.
     """
     sede_id = request.query_params.get('sede', None)
-    queryset = RegistroAcceso.objects.all()
+    if sede_id is not None and not sede_id.isdigit():
+        return Response({
+            'error': 'El parámetro sede debe ser un ID numérico'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    sede_id = int(sede_id) if sede_id else None
 
+    hoy = timezone.localdate()
+    inicio_mes = hoy.replace(day=1)
+    dias = accesos_por_dia(desde=inicio_mes, hasta=hoy, sede_id=sede_id)
+
+    # Clientes únicos del mes (no se pueden sumar por hora): rango sobre el índice de fecha
+    queryset_mes = RegistroAcceso.objects.filter(
+        fecha_hora_entrada__gte=timezone.make_aware(datetime.combine(inicio_mes, time.min))
+    )
     if sede_id:
-        queryset = queryset.filter(sede_id=sede_id)
+        queryset_mes = queryset_mes.filter(sede_id=sede_id)
+    clientes_unicos_mes = queryset_mes.order_by().values('cliente').distinct().count()
 
-    # Accesos de hoy
-    hoy = timezone.now().date()
-    queryset_hoy = queryset.filter(fecha_hora_entrada__date=hoy)
+    return Response({
+        'accesos_hoy': dias[-1]['total'],
+        'autorizados': dias[-1]['autorizados'],
+        'denegados': dias[-1]['denegados'],
+        'accesos_mes': sum(dia['total'] for dia in dias),
+        'clientes_unicos_mes': clientes_unicos_mes,
+    })
 
-    accesos_hoy = queryset_hoy.count()
-    autorizados = queryset_hoy.filter(autorizado=True).count()
-    denegados = queryset_hoy.filter(autorizado=False).count()
 
-    # Accesos del mes
-    inicio_mes = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    accesos_mes = queryset.filter(fecha_hora_entrada__gte=inicio_mes).count()
+@api_view(['GET'])
+@permission_classes([EsAdministradorOCajeroAcceso])
+def mapa_calor_accesos(request):
+    """
+    Mapa de calor de accesos por día de la semana y hora.
+    GET /api/accesos/registros/mapa_calor/?[sede=1][&dias=28]
 
-    # Clientes únicos del mes
-    clientes_unicos_mes = queryset.filter(
-        fecha_hora_entrada__gte=inicio_mes
-    ).values('cliente').distinct().count()
+    Suma los últimos `dias` días (hasta hoy) del resumen por hora: `matriz` tiene una
+    fila por día (lunes a domingo) y una columna por hora (0 a 23).
+    """
+    sede_id = request.query_params.get('sede', None)
+    dias = request.query_params.get('dias', '28')
+    if (sede_id is not None and not sede_id.isdigit()) or not dias.isdigit() or not 1 <= int(dias) <= 366:
+        return Response({
+            'error': 'sede debe ser un ID numérico y dias un número entre 1 y 366'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
+    hasta = timezone.localdate()
+    desde = hasta - timedelta(days=int(dias) - 1)
+    matriz = accesos_mapa_calor(desde=desde, hasta=hasta, sede_id=int(sede_id) if sede_id else None)
     return Response({
-        'accesos_hoy': accesos_hoy,
-        'autorizados': autorizados,
-        'denegados': denegados,
-        'accesos_mes': accesos_mes,
-        'clientes_unicos_mes': clientes_unicos_mes,
+        'desde': desde,
+        'hasta': hasta,
+        'dias_semana': ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo'],
+        'matriz': matriz,
+        'maximo': max(max(fila) for fila in matriz),
     })
 
 
+class RegistroAccesoPagination(KeysetPagination):
+    ordering = ('-fecha_hora_entrada',)
+    # Se conserva el nombre del parámetro que ya usaba este endpoint
+    page_size_query_param = 'limit'
+
+
 @api_view(['GET'])
 @permission_classes([EsAdministradorOCajeroAcceso])
 def listar_registros(request):
     """
     Endpoint para listar registros de acceso.
-    GET /api/accesos/registros/
+    GET /api/accesos/registros/?[limit=50][&cursor=...][&paginar=false]
+
+    Paginado por cursor; con paginar=false devuelve la lista (hasta `limit` registros).
     """
     queryset = RegistroAcceso.objects.select_related(
         'cliente',
@@ -245,14 +443,26 @@ def listar_registros(request):
         autorizado_bool = autorizado.lower() in ['true', '1', 'yes']
         queryset = queryset.filter(autorizado=autorizado_bool)
 
-    # Filtrar por fecha (opcional) - por defecto solo accesos del día
+    # Filtrar por fecha (opcional) - por defecto solo accesos del día. Se filtra por
+    # rango para que solo se lea la partición del mes (ver control_acceso.particiones)
     fecha = request.query_params.get('fecha', None)
-    if fecha:
-        queryset = queryset.filter(fecha_hora_entrada__date=fecha)
-    else:
-        # Por defecto mostrar solo accesos de hoy
-        hoy = timezone.now().date()
-        queryset = queryset.filter(fecha_hora_entrada__date=hoy)
+    try:
+        fecha = date.fromisoformat(fecha) if fecha else timezone.localdate()
+    except ValueError:
+        return Response({
+            'error': 'El parámetro fecha debe tener formato AAAA-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    queryset = queryset.filter(
+        fecha_hora_entrada__gte=inicio,
+        fecha_hora_entrada__lt=inicio + timedelta(days=1),
+    )
+
+    paginador = RegistroAccesoPagination()
+    pagina = paginador.paginate_queryset(queryset, request)
+    if pagina is not None:
+        serializer = RegistroAccesoSerializer(pagina, many=True)
+        return paginador.get_paginated_response(serializer.data)
 
     # Limitar resultados y ordenar por más recientes
     limit = request.query_params.get('limit', 50)
@@ -268,11 +478,8 @@ def _validar_cliente_acceso(cliente, sede_id):
     """
     persona = cliente.persona
 
-    # Buscar membresía activa
-    suscripcion_activa = SuscripcionMembresia.objects.filter(
-        cliente=cliente,
-        estado='activa'
-    ).select_related('membresia', 'sede_suscripcion').order_by('-fecha_inicio').first()
+    # Membresías vigentes hoy (desde la caché de elegibilidad)
+    suscripciones = elegibilidad_cliente(cliente_id=cliente.persona_id)
 
     # Datos básicos del cliente
     cliente_info = {
@@ -283,18 +490,18 @@ def _validar_cliente_acceso(cliente, sede_id):
         'telefono': persona.telefono,
     }
 
-    # Estadísticas de acceso
-    total_accesos = RegistroAcceso.objects.filter(cliente=cliente).count()
-    ultimo_acceso = RegistroAcceso.objects.filter(
-        cliente=cliente
-    ).order_by('-fecha_hora_entrada').first()
+    # Estadísticas de acceso (acumuladas al registrar cada acceso, sin contar el historial)
+    estadistica = EstadisticaAccesoCliente.objects.filter(cliente_id=cliente.pk).values(
+        'total_accesos', 'ultimo_acceso', 'ultima_sede__nombre'
+    ).first() or {}
 
     cliente_info.update({
-        'total_accesos': total_accesos,
-        'ultimo_acceso': ultimo_acceso.fecha_hora_entrada if ultimo_acceso else None
+        'total_accesos': estadistica.get('total_accesos', 0),
+        'ultimo_acceso': estadistica.get('ultimo_acceso'),
+        'ultima_sede_nombre': estadistica.get('ultima_sede__nombre'),
     })
 
-    if not suscripcion_activa:
+    if not suscripciones:
         # No tiene membresía activa
         cliente_info.update({
             'tiene_membresia_activa': False,
@@ -313,29 +520,22 @@ def _validar_cliente_acceso(cliente, sede_id):
         })
     else:
         # Tiene membresía activa - validar si puede acceder a esta sede
-        puede_acceder = False
-        motivo_denegado = None
-
-        if suscripcion_activa.membresia.permite_todas_sedes:
-            puede_acceder = True
-        elif suscripcion_activa.sede_suscripcion_id == sede_id:
-            puede_acceder = True
-        else:
-            sede_nombre = suscripcion_activa.sede_suscripcion.nombre if suscripcion_activa.sede_suscripcion else 'sede específica'
-            motivo_denegado = f'La membresía solo permite acceso a {sede_nombre}'
+        suscripcion, motivo_denegado = elegibilidad_acceso_sede(suscripciones, sede_id=sede_id)
+        puede_acceder = suscripcion is not None
+        suscripcion = suscripcion or suscripciones[0]
 
         cliente_info.update({
             'tiene_membresia_activa': True,
-            'membresia_id': suscripcion_activa.id,
-            'membresia_nombre': suscripcion_activa.membresia.nombre_plan,
-            'membresia_tipo': suscripcion_activa.membresia.get_tipo_display(),
-            'membresia_estado': suscripcion_activa.estado,
-            'fecha_inicio': suscripcion_activa.fecha_inicio,
-            'fecha_fin': suscripcion_activa.fecha_fin,
-            'dias_restantes': suscripcion_activa.dias_restantes,
-            'permite_todas_sedes': suscripcion_activa.membresia.permite_todas_sedes,
-            'sede_suscripcion_id': suscripcion_activa.sede_suscripcion_id,
-            'sede_suscripcion_nombre': suscripcion_activa.sede_suscripcion.nombre if suscripcion_activa.sede_suscripcion else None,
+            'membresia_id': suscripcion['id'],
+            'membresia_nombre': suscripcion['membresia_nombre'],
+            'membresia_tipo': dict(Membresia.TIPO_CHOICES).get(suscripcion['membresia_tipo']),
+            'membresia_estado': 'activa',
+            'fecha_inicio': suscripcion['fecha_inicio'],
+            'fecha_fin': suscripcion['fecha_fin'],
+            'dias_restantes': (suscripcion['fecha_fin'] - timezone.localdate()).days,
+            'permite_todas_sedes': suscripcion['permite_todas_sedes'],
+            'sede_suscripcion_id': suscripcion['sede_id'],
+            'sede_suscripcion_nombre': suscripcion['sede_nombre'],
             'puede_acceder': puede_acceder,
             'motivo_denegado': motivo_denegado
         })
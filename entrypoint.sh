@@ -7,11 +7,14 @@ python manage.py collectstatic --noinput
 echo "==> Aplicando migraciones..."
 python manage.py migrate --noinput
 
+echo "==> Venciendo suscripciones atrasadas..."
+python manage.py vencer_suscripciones
+
 echo "==> Creando superusuario (si no existe)..."
 if [ "$DJANGO_SUPERUSER_EMAIL" ] && [ "$DJANGO_SUPERUSER_PASSWORD" ]; then
   # Django leerá DJANGO_SUPERUSER_* automáticamente
   python manage.py createsuperuser --noinput || true
 fi
 
-echo "==> Levantando gunicorn..."
-exec gunicorn gym.wsgi:application --bind 0.0.0.0:8000
+echo "==> Levantando gunicorn (workers ASGI)..."
+exec gunicorn gym.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_cliente_clientes_cl_fecha_r_0432db_idx'),
+        ('facturacion', '0004_alter_factura_options_alter_pago_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_emision', 'factura_id'], name='factura_fecha_e_46210d_idx'),
+        ),
+    ]
@@ -46,6 +46,9 @@ class Factura(models.Model):
         verbose_name = 'Factura'
         verbose_name_plural = 'Facturas'
         ordering = ['-fecha_emision']
+        indexes = [
+            models.Index(fields=['fecha_emision', 'factura_id']),
+        ]
 
     def __str__(self):
         if self.cliente and self.cliente.persona:
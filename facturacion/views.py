@@ -7,6 +7,7 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 import io
 
+from gym.paginacion import KeysetPagination
 from .models import Factura, DetalleFactura, Pago
 from .serializers import FacturaSerializer, DetalleFacturaSerializer, PagoSerializer
 from .permissions import EsAdministradorOCajero
@@ -23,6 +24,10 @@ class FacturaFilter(FilterSet):
         fields = ['fecha_emision', 'estado_pago', 'cliente']
 
 
+class FacturaPagination(KeysetPagination):
+    ordering = ('-fecha_emision',)
+
+
 # ====================================================
 # 🔹 FACTURA VIEWSET
 # ====================================================
@@ -37,6 +42,7 @@ class FacturaViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_class = FacturaFilter
     search_fields = ['cliente__persona__nombre', 'cliente__persona__apellido_paterno']
+    pagination_class = FacturaPagination
 
     # 🔒 Generar factura en PDF (requiere login: Administrador o Cajero)
     @action(detail=True, methods=['get'])
@@ -49,7 +49,7 @@ const accesosService = {
   // Obtener registros de acceso con filtros
   getRegistros: async (filtros = {}) => {
     try {
-      const response = await api.get(BASE_URL, { params: filtros });
+      const response = await api.get(BASE_URL, { params: { paginar: false, ...filtros } });
       return response.data;
     } catch (error) {
       console.error('Error al obtener registros:', error);
@@ -60,7 +60,7 @@ const accesosService = {
   // Listar registros de acceso (para monitor)
   listarRegistros: async (params = {}) => {
     try {
-      const response = await api.get(BASE_URL, { params });
+      const response = await api.get(BASE_URL, { params: { paginar: false, ...params } });
       return response;
     } catch (error) {
       console.error('Error al listar registros:', error);
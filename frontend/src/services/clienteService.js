@@ -3,7 +3,7 @@ import api from './api'; // api.js ya usa REACT_APP_API_URL
 class ClienteService {
   // Obtener todos los clientes
   getClientes(params = {}) {
-    return api.get('/clientes/', { params });
+    return api.get('/clientes/', { params: { paginar: false, ...params } });
   }
 
   // Obtener un cliente por ID
@@ -47,7 +47,7 @@ class ClienteService {
     if (searchTerm) params.search = searchTerm;
     if (estado) params.estado = estado;
     if (nivelExperiencia) params.nivel_experiencia = nivelExperiencia;
-    return api.get('/clientes/', { params });
+    return api.get('/clientes/', { params: { paginar: false, ...params } });
   }
 }
 
@@ -59,7 +59,7 @@ class InventarioService {
 
   // Obtener todo el inventario
   getInventario(params = {}) {
-    return api.get('/inventario/inventario/', { params });
+    return api.get('/inventario/inventario/', { params: { paginar: false, ...params } });
   }
 
   // Obtener un registro de inventario por ID
@@ -94,7 +94,7 @@ class InventarioService {
   // Buscar inventario por sede
   getInventarioBySede(sedeId) {
     return api.get('/inventario/inventario/', {
-      params: { sede: sedeId }
+      params: { paginar: false, sede: sedeId }
     });
   }
 
@@ -65,7 +65,7 @@ class MembresiaService {
 
   // Obtener todas las suscripciones
   getSuscripciones(params = {}) {
-    return api.get('/suscripciones/', { params });
+    return api.get('/suscripciones/', { params: { paginar: false, ...params } });
   }
 
   // Obtener una suscripción por ID
@@ -110,7 +110,7 @@ class MembresiaService {
 
   // Buscar suscripciones por cliente
   getSuscripcionesByCliente(clienteId) {
-    return api.get('/suscripciones/', { params: { cliente: clienteId } });
+    return api.get('/suscripciones/', { params: { paginar: false, cliente: clienteId } });
   }
 }
 
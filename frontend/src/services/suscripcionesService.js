@@ -6,7 +6,7 @@ const suscripcionesService = {
   // Obtener todas las suscripciones con filtros opcionales
   getSuscripciones: async (filtros = {}) => {
     try {
-      const response = await api.get(BASE_URL, { params: filtros });
+      const response = await api.get(BASE_URL, { params: { paginar: false, ...filtros } });
       return response.data;
     } catch (error) {
       console.error('Error al obtener suscripciones:', error);
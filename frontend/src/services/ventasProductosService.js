@@ -3,7 +3,7 @@ import api from './api';
 const ventasProductosService = {
   // Obtener todas las ventas
   getVentas: (params = {}) => {
-    return api.get('/ventas/ventas-productos/', { params });
+    return api.get('/ventas/ventas-productos/', { params: { paginar: false, ...params } });
   },
 
   // Obtener una venta específica
@@ -6,7 +6,7 @@ const ventasService = {
   // Obtener todas las ventas con filtros opcionales
   getVentas: async (filtros = {}) => {
     try {
-      const response = await api.get(BASE_URL, { params: filtros });
+      const response = await api.get(BASE_URL, { params: { paginar: false, ...filtros } });
       return response.data;
     } catch (error) {
       console.error('Error al obtener ventas:', error);
@@ -0,0 +1,184 @@
+"""
+Paginación por cursor (keyset) para los listados con mucho volumen.
+
+En lugar de OFFSET, cada página se pide a partir de los valores de ordenación de la
+última fila vista: WHERE (campo, pk) < (valor, pk_valor) ORDER BY campo, pk LIMIT n.
+Con un índice sobre (campo, pk) el costo de una página no depende de cuántas filas
+queden detrás. El cursor es opaco (base64 de esos valores).
+
+Uso en un ViewSet:
+
+    class VentaProductoPagination(KeysetPagination):
+        ordering = ("-fecha_venta",)
+
+    pagination_class = VentaProductoPagination
+
+La clave primaria se añade como desempate (en el sentido del último campo) salvo que
+el ordering ya termine en 'pk' o '-pk'. Los campos de ordenación no deben ser nulos;
+pueden ser anotaciones del queryset. get_ordering permite elegir el orden según el
+queryset (p. ej. por relevancia cuando hay búsqueda). Con ?paginar=false se devuelve la
+lista completa sin paginar.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import and_, or_
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+VALORES_FALSOS = ("false", "0", "no")
+
+
+class KeysetPagination(BasePagination):
+    ordering: tuple[str, ...] = ()
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    desactivar_query_param = "paginar"
+    invalid_cursor_message = "Cursor inválido"
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> list | None:
+        if request.query_params.get(self.desactivar_query_param, "").lower() in VALORES_FALSOS:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = list(self.get_ordering(queryset))
+        if not ordering or ordering[-1].lstrip("-") != "pk":
+            ordering.append("-pk" if ordering and ordering[-1].startswith("-") else "pk")
+        self.campos = [campo.lstrip("-") for campo in ordering]
+        self.descendente = [campo.startswith("-") for campo in ordering]
+
+        posicion, hacia_atras = self.decode_cursor(request)
+        # Hacia atrás se recorre con el orden invertido y luego se da la vuelta a la página.
+        orden = [
+            campo if descendente == hacia_atras else f"-{campo}"
+            for campo, descendente in zip(self.campos, self.descendente)
+        ]
+        queryset = queryset.order_by(*orden)
+        if posicion is not None:
+            try:
+                queryset = queryset.filter(self._despues_de(posicion, hacia_atras))
+            except (ValueError, TypeError, ValidationError):
+                # Cursor de otro orden (p. ej. sin búsqueda) con valores de otro tipo
+                raise NotFound(self.invalid_cursor_message)
+
+        filas = list(queryset[: self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[: self.page_size]
+        if hacia_atras:
+            filas.reverse()
+
+        self.siguiente = self.anterior = None
+        if filas:
+            if hay_mas or hacia_atras:
+                self.siguiente = self._posicion(filas[-1])
+            if (hay_mas and hacia_atras) or (posicion is not None and not hacia_atras):
+                self.anterior = self._posicion(filas[0])
+        elif hacia_atras:
+            # Página vacía al retroceder: la posición del cursor sigue siendo válida hacia delante.
+            self.siguiente = posicion
+        return filas
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(
+            {
+                "next": self._enlace(self.siguiente, hacia_atras=False),
+                "previous": self._enlace(self.anterior, hacia_atras=True),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_ordering(self, queryset: QuerySet) -> tuple[str, ...]:
+        return self.ordering
+
+    def get_page_size(self, request) -> int:
+        valor = request.query_params.get(self.page_size_query_param)
+        if valor is None:
+            return self.page_size
+        try:
+            tamano = int(valor)
+        except ValueError:
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def decode_cursor(self, request) -> tuple[list | None, bool]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            posicion, hacia_atras = datos["p"], bool(datos["r"])
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(posicion, list) or len(posicion) != len(self.campos):
+            raise NotFound(self.invalid_cursor_message)
+        return posicion, hacia_atras
+
+    def encode_cursor(self, posicion: list, hacia_atras: bool) -> str:
+        datos = json.dumps({"p": posicion, "r": int(hacia_atras)}, cls=_CodificadorCursor)
+        return base64.urlsafe_b64encode(datos.encode("ascii")).decode("ascii")
+
+    def _despues_de(self, posicion: list, hacia_atras: bool) -> Q:
+        """(c1, c2, ..., pk) estrictamente después de la posición, según el sentido de cada campo."""
+        alternativas = []
+        for i, (campo, descendente) in enumerate(zip(self.campos, self.descendente)):
+            operador = "lt" if descendente != hacia_atras else "gt"
+            iguales = [Q(**{self.campos[j]: posicion[j]}) for j in range(i)]
+            alternativas.append(reduce(and_, iguales, Q(**{f"{campo}__{operador}": posicion[i]})))
+        # Condición redundante sobre el primer campo para que PostgreSQL use el índice como rango.
+        operador = "lte" if self.descendente[0] != hacia_atras else "gte"
+        return Q(**{f"{self.campos[0]}__{operador}": posicion[0]}) & reduce(or_, alternativas)
+
+    def _posicion(self, fila: Any) -> list:
+        return [_valor_campo(fila, campo) for campo in self.campos]
+
+    def _enlace(self, posicion: list | None, *, hacia_atras: bool) -> str | None:
+        if posicion is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(posicion, hacia_atras),
+        )
+
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder pero conservando los microsegundos (DjangoJSONEncoder los
+    trunca a milisegundos y el cursor dejaría de apuntar a una fila exacta)."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _valor_campo(fila: Any, campo: str) -> Any:
+    """Lee un campo de ordenación, siguiendo relaciones del tipo 'producto__nombre'."""
+    valor = fila
+    for parte in campo.split("__"):
+        valor = getattr(valor, parte)
+    return valor
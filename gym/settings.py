@@ -197,6 +197,29 @@ REST_FRAMEWORK = {
     },
 }
 
+# Caché: con REDIS_URL es compartida por todos los procesos (workers de gunicorn y
+# comandos de manage.py) y lo que invalida uno vale para todos. Sin ella cada proceso
+# tiene su propia LocMemCache; las entradas que dependen de invalidaciones entonces
+# duran poco (ver membresias.services).
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_COMPARTIDA = bool(REDIS_URL)
+if CACHE_COMPARTIDA:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Control de acceso: segundos durante los que un nuevo check-in del mismo cliente en la
+# misma sede se considera repetido (doble clic, relectura del torniquete) y devuelve el
+# registro original sin crear otro. 0 lo desactiva.
+ACCESO_VENTANA_DUPLICADOS = int(os.getenv('ACCESO_VENTANA_DUPLICADOS', '30'))
+
+# Ventas offline: antigüedad máxima (días) de la fecha_venta que el POS puede enviar al
+# sincronizar un lote. Las ventas más antiguas se rechazan en lugar de registrarse hoy.
+VENTAS_OFFLINE_DIAS_MAXIMOS = int(os.getenv('VENTAS_OFFLINE_DIAS_MAXIMOS', '7'))
+
 # CORS: abierto solo en local; en producción usa la lista blanca de abajo
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 
@@ -218,6 +241,14 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
+    'if-none-match',
+]
+
+# Cabeceras de respuesta legibles desde el navegador (catálogo POS versionado)
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'x-catalogo-version',
 ]
 
 CORS_ALLOW_METHODS = [
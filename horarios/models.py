@@ -5,7 +5,8 @@ from empleados.models import Entrenador
 from instalaciones.models import Espacio, Sede
 from clientes.models import Cliente
 from gestion_equipos.models import Activo
-from membresias.models import Membresia, SuscripcionMembresia
+from membresias.models import Membresia
+from membresias.services import elegibilidad_cliente
 from datetime import datetime, time
 
 
@@ -525,15 +526,8 @@ class ReservaClase(models.Model):
     
     def clean(self):
         """Validaciones personalizadas"""
-        # Verificar que el cliente tenga membresía activa - buscar en el modelo correcto (SuscripcionMembresia)
-        tiene_membresia_activa = SuscripcionMembresia.objects.filter(
-            cliente=self.cliente,
-            estado='activa',
-            fecha_inicio__lte=timezone.now().date(),
-            fecha_fin__gte=timezone.now().date()
-        ).exists()
-
-        if not tiene_membresia_activa:
+        # Verificar que el cliente tenga membresía vigente hoy (elegibilidad en caché)
+        if not elegibilidad_cliente(cliente_id=self.cliente_id):
             raise ValidationError("El cliente no tiene una membresía activa")
 
         # Verificar que la sesión no esté llena
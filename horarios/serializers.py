@@ -9,7 +9,7 @@ from empleados.models import Entrenador
 from instalaciones.models import Espacio
 from clientes.models import Cliente
 from gestion_equipos.models import Activo
-from membresias.models import SuscripcionMembresia
+from membresias.services import elegibilidad_cliente
 
 
 class TipoActividadSerializer(serializers.ModelSerializer):
@@ -420,15 +420,8 @@ class ReservaClaseSerializer(serializers.ModelSerializer):
         sesion_clase = data.get('sesion_clase')
 
         if cliente and sesion_clase:
-            # Verificar membresía activa - buscar en el modelo correcto (SuscripcionMembresia)
-            tiene_membresia_activa = SuscripcionMembresia.objects.filter(
-                cliente=cliente,
-                estado='activa',
-                fecha_inicio__lte=timezone.now().date(),
-                fecha_fin__gte=timezone.now().date()
-            ).exists()
-
-            if not tiene_membresia_activa:
+            # Verificar membresía vigente hoy (elegibilidad en caché)
+            if not elegibilidad_cliente(cliente_id=cliente.pk):
                 raise serializers.ValidationError("El cliente no tiene una membresía activa")
 
             # Verificar cupo disponible
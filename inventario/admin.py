@@ -3,6 +3,7 @@ from django import forms
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from .models import CategoriaProducto, Producto, Inventario
+from .services import inventario_guardar
 from instalaciones.models import Sede
 
 
@@ -181,6 +182,10 @@ class InventarioAdmin(admin.ModelAdmin):
         return obj.producto.codigo or "-"
     get_codigo_producto.short_description = 'Código'
 
+    def save_model(self, request, obj, form, change):
+        """Guarda el inventario anotando el cambio de stock en el libro de movimientos."""
+        inventario_guardar(obj, nota=f"Ajuste desde el admin ({request.user})")
+
     def acciones(self, obj):
         return format_html(
             '<a href="{}" title="Editar"><img src="/static/admin/img/icon-changelink.svg"></a>'
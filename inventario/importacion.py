@@ -0,0 +1,383 @@
+"""
+Importación masiva de productos e inventario por sede (CSV o JSONL).
+
+- leer_filas: convierte un archivo CSV (con cabecera) o JSONL en dicts, uno por fila
+- importar_inventario: valida todas las filas en memoria y hace upsert por lotes
+
+Columnas admitidas (todas opcionales salvo lo indicado):
+    codigo, nombre, categoria, precio_unitario, descripcion, activo,
+    sede, cantidad_actual, cantidad_minima, cantidad_maxima, ubicacion_almacen
+
+Cada fila identifica un producto por 'codigo' o, si no lo trae, por 'nombre' (las filas
+sin código con el mismo nombre se refieren al mismo producto nuevo, que recibe un
+código generado). Un producto nuevo necesita nombre, categoria (ID o nombre; las
+categorías que no existen se crean) y precio_unitario. Si la fila trae 'sede', se
+crea o actualiza el inventario de ese producto en esa sede. Las columnas vacías u
+omitidas conservan el valor actual; si un mismo producto o inventario aparece en
+varias filas, cada fila pisa los campos que trae.
+
+Productos e inventarios se escriben con bulk_create(update_conflicts=True) sobre
+Producto.codigo y (producto, sede). Las filas con errores se omiten y se informan;
+el resto se importa en una sola transacción. Los cambios de stock se anotan en el
+libro de movimientos (tipo 'ajuste') y se actualiza la versión del catálogo POS.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from django.db import transaction
+
+from instalaciones.models import Sede
+
+from .models import CategoriaProducto, Inventario, Producto, generar_codigos_producto
+from .services import catalogo_registrar_cambios, movimientos_registrar
+
+CAMPOS_PRODUCTO = ("nombre", "categoria", "precio_unitario", "descripcion", "activo")
+CAMPOS_INVENTARIO = ("cantidad_actual", "cantidad_minima", "cantidad_maxima", "ubicacion_almacen")
+COLUMNAS_IMPORTACION = ("codigo", *CAMPOS_PRODUCTO, "sede", *CAMPOS_INVENTARIO)
+
+FORMATOS_IMPORTACION = ("csv", "jsonl")
+
+VALORES_VERDADEROS = ("true", "1", "si", "sí", "yes")
+VALORES_FALSOS = ("false", "0", "no")
+
+
+def leer_filas(lineas: Iterable[str], formato: str) -> Iterator[dict[str, Any]]:
+    """Genera un dict por fila del archivo.
+
+    Una línea JSONL mal formada genera {"__error__": mensaje} para que se informe en su
+    número de fila sin cortar la importación.
+    """
+    if formato == "csv":
+        for fila in csv.DictReader(lineas):
+            yield {clave.strip(): valor for clave, valor in fila.items() if clave}
+        return
+    for linea in lineas:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield {"__error__": f"JSON inválido: {e}"}
+            continue
+        yield fila if isinstance(fila, dict) else {"__error__": "Cada línea debe ser un objeto JSON"}
+
+
+def importar_inventario(
+    filas: Iterable[dict[str, Any]],
+    *,
+    tamano_lote: int = 1000,
+    simular: bool = False,
+) -> dict[str, Any]:
+    """Valida e importa las filas (productos y/o inventario por sede).
+
+    Args:
+        filas: Dicts con las columnas de COLUMNAS_IMPORTACION (p. ej. de leer_filas).
+        tamano_lote: Filas por INSERT ... ON CONFLICT.
+        simular: Valida y ejecuta todo pero deshace la transacción al final.
+
+    Returns:
+        Dict con el número de filas, productos e inventarios creados y actualizados,
+        y 'errores': lista de {'fila': n, 'errores': {campo: mensaje}} (la fila 1 es la
+        primera después de la cabecera).
+    """
+    validas, errores = [], []
+    total = 0
+    sede_ids = set(Sede.objects.values_list("pk", flat=True))
+    for numero, datos in enumerate(filas, start=1):
+        total += 1
+        limpia, errores_fila = _validar_fila(datos, sede_ids)
+        if errores_fila:
+            errores.append({"fila": numero, "errores": errores_fila})
+        else:
+            validas.append((numero, limpia))
+
+    resultado = {
+        "filas": total,
+        "productos_creados": 0,
+        "productos_actualizados": 0,
+        "inventarios_creados": 0,
+        "inventarios_actualizados": 0,
+        "errores": errores,
+    }
+    with transaction.atomic():
+        productos, modificados, errores_productos = _resolver_productos(validas)
+        if errores_productos:
+            errores.extend(errores_productos)
+            rechazadas = {error["fila"] for error in errores_productos}
+            validas = [(numero, limpia) for numero, limpia in validas if numero not in rechazadas]
+
+        existentes = [producto.pk for producto in modificados if producto.pk is not None]
+        sin_codigo = [producto for producto in modificados if not producto.codigo]
+        for producto, codigo in zip(sin_codigo, generar_codigos_producto(len(sin_codigo))):
+            producto.codigo = codigo
+        Producto.objects.bulk_create(
+            modificados,
+            batch_size=tamano_lote,
+            update_conflicts=True,
+            unique_fields=["codigo"],
+            update_fields=["nombre", "categoria", "precio_unitario", "descripcion", "activo"],
+        )
+        resultado["productos_creados"] = len(modificados) - len(existentes)
+        resultado["productos_actualizados"] = len(existentes)
+
+        creados, actualizados, productos_por_sede = _upsert_inventarios(
+            validas, productos, tamano_lote=tamano_lote
+        )
+        resultado["inventarios_creados"] = creados
+        resultado["inventarios_actualizados"] = actualizados
+
+        # Los productos ya existentes que cambiaron aparecen en el catálogo de todas sus sedes.
+        for sede_id, producto_id in Inventario.objects.filter(producto_id__in=existentes).values_list(
+            "sede_id", "producto_id"
+        ):
+            productos_por_sede[sede_id].add(producto_id)
+        for sede_id in sorted(productos_por_sede):
+            catalogo_registrar_cambios(sede_id=sede_id, producto_ids=productos_por_sede[sede_id])
+
+        if simular:
+            transaction.set_rollback(True)
+
+    errores.sort(key=lambda error: error["fila"])
+    return resultado
+
+
+def _validar_fila(datos: dict[str, Any], sede_ids: set[int]) -> tuple[dict[str, Any], dict[str, str]]:
+    """Convierte los valores de la fila a sus tipos; los vacíos se descartan."""
+    if "__error__" in datos:
+        return {}, {"fila": datos["__error__"]}
+
+    errores: dict[str, str] = {}
+    limpia: dict[str, Any] = {}
+    for campo in COLUMNAS_IMPORTACION:
+        valor = datos.get(campo)
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor is None or valor == "":
+            continue
+        try:
+            limpia[campo] = _CONVERSORES[campo](valor)
+        except ValueError as e:
+            errores[campo] = str(e)
+
+    if "codigo" not in limpia and "nombre" not in limpia and "codigo" not in errores:
+        errores["codigo"] = "Se requiere 'codigo' o 'nombre' para identificar el producto"
+    if "sede" in limpia and limpia["sede"] not in sede_ids:
+        errores["sede"] = f"La sede {limpia['sede']} no existe"
+    if "sede" not in limpia and any(campo in limpia for campo in CAMPOS_INVENTARIO):
+        errores["sede"] = "Se requiere 'sede' para importar cantidades"
+    return limpia, errores
+
+
+def _resolver_productos(
+    validas: list[tuple[int, dict[str, Any]]],
+) -> tuple[dict[Any, Producto], list[Producto], list[dict[str, Any]]]:
+    """Carga o construye el Producto de cada fila y le aplica los campos que trae.
+
+    Returns:
+        (clave de fila -> Producto, productos a escribir, errores de filas cuyo producto
+        no existe y no trae los datos para crearlo).
+    """
+    codigos = {limpia["codigo"] for _, limpia in validas if "codigo" in limpia}
+    productos: dict[Any, Producto] = {
+        producto.codigo: producto for producto in Producto.objects.filter(codigo__in=codigos)
+    }
+    categorias = _resolver_categorias(
+        {limpia["categoria"] for _, limpia in validas if "categoria" in limpia}
+    )
+
+    modificados: dict[Any, Producto] = {}
+    filas_por_clave: dict[Any, list[int]] = defaultdict(list)
+    errores = []
+    for numero, limpia in validas:
+        clave = _clave_producto(limpia)
+        producto = productos.get(clave)
+        if producto is None:
+            producto = productos[clave] = Producto(codigo=limpia.get("codigo"), descripcion="")
+        datos_producto = {campo: limpia[campo] for campo in CAMPOS_PRODUCTO if campo in limpia}
+        if "categoria" in datos_producto:
+            categoria = categorias.get(datos_producto.pop("categoria"))
+            if categoria is None:
+                errores.append({"fila": numero, "errores": {"categoria": "La categoría no existe"}})
+                continue
+            producto.categoria = categoria
+        filas_por_clave[clave].append(numero)
+        for campo, valor in datos_producto.items():
+            setattr(producto, campo, valor)
+        if datos_producto or producto.pk is None:
+            modificados[clave] = producto
+
+    # Un producto nuevo necesita sus datos básicos en alguna de sus filas.
+    for clave, producto in list(productos.items()):
+        if producto.pk is not None:
+            continue
+        faltantes = [
+            campo
+            for campo, valor in (
+                ("nombre", producto.nombre),
+                ("categoria", producto.categoria_id),
+                ("precio_unitario", producto.precio_unitario),
+            )
+            if valor is None or valor == ""
+        ]
+        if faltantes:
+            mensaje = f"El producto no existe y faltan datos para crearlo: {', '.join(faltantes)}"
+            errores.extend(
+                {"fila": numero, "errores": {"producto": mensaje}} for numero in filas_por_clave[clave]
+            )
+            modificados.pop(clave, None)
+            del productos[clave]
+    return productos, list(modificados.values()), errores
+
+
+def _resolver_categorias(valores: set[Any]) -> dict[Any, CategoriaProducto]:
+    """Resuelve categorías por ID o por nombre, creando las que faltan por nombre."""
+    ids = {valor for valor in valores if isinstance(valor, int)}
+    nombres = {valor for valor in valores if isinstance(valor, str)}
+    categorias: dict[Any, CategoriaProducto] = {
+        categoria.pk: categoria for categoria in CategoriaProducto.objects.filter(pk__in=ids)
+    }
+    for categoria in CategoriaProducto.objects.filter(nombre__in=nombres).order_by("-pk"):
+        categorias[categoria.nombre] = categoria
+    nuevas = CategoriaProducto.objects.bulk_create(
+        [CategoriaProducto(nombre=nombre) for nombre in sorted(nombres - categorias.keys())]
+    )
+    categorias.update({categoria.nombre: categoria for categoria in nuevas})
+    return categorias
+
+
+def _upsert_inventarios(
+    validas: list[tuple[int, dict[str, Any]]],
+    productos: dict[Any, Producto],
+    *,
+    tamano_lote: int,
+) -> tuple[int, int, dict[int, set[int]]]:
+    """Crea o actualiza los inventarios de las filas con sede y anota el ajuste de stock.
+
+    Las filas existentes se bloquean sede por sede en orden de producto_id (el mismo
+    orden que el checkout) antes de leer su cantidad anterior.
+
+    Returns:
+        (creados, actualizados, sede_id -> producto_ids importados).
+    """
+    por_sede: dict[int, dict[int, dict[str, Any]]] = defaultdict(dict)
+    for _, limpia in validas:
+        if "sede" not in limpia:
+            continue
+        producto = productos[_clave_producto(limpia)]
+        datos = por_sede[limpia["sede"]].setdefault(producto.pk, {})
+        datos.update({campo: limpia[campo] for campo in CAMPOS_INVENTARIO if campo in limpia})
+
+    inventarios = []
+    deltas: dict[int, dict[int, int]] = defaultdict(dict)
+    creados = 0
+    for sede_id in sorted(por_sede):
+        filas = por_sede[sede_id]
+        existentes = {
+            inventario.producto_id: inventario
+            for inventario in Inventario.objects.select_for_update()
+            .filter(sede_id=sede_id, producto_id__in=filas)
+            .order_by("producto_id")
+        }
+        for producto_id in sorted(filas):
+            inventario = existentes.get(producto_id)
+            if inventario is None:
+                inventario = Inventario(sede_id=sede_id, producto_id=producto_id)
+                creados += 1
+            anterior = inventario.cantidad_actual if inventario.pk else 0
+            for campo, valor in filas[producto_id].items():
+                setattr(inventario, campo, valor)
+            deltas[sede_id][producto_id] = inventario.cantidad_actual - anterior
+            inventarios.append(inventario)
+
+    Inventario.objects.bulk_create(
+        inventarios,
+        batch_size=tamano_lote,
+        update_conflicts=True,
+        unique_fields=["producto", "sede"],
+        update_fields=[*CAMPOS_INVENTARIO, "ultima_actualizacion"],
+    )
+    for sede_id in sorted(deltas):
+        movimientos_registrar(
+            sede_id=sede_id, tipo="ajuste", cantidades=deltas[sede_id], nota="Importación de inventario"
+        )
+
+    productos_por_sede = defaultdict(set, {sede_id: set(filas) for sede_id, filas in por_sede.items()})
+    return creados, len(inventarios) - creados, productos_por_sede
+
+
+def _clave_producto(limpia: dict[str, Any]) -> Any:
+    return limpia["codigo"] if "codigo" in limpia else ("nuevo", limpia["nombre"])
+
+
+def _texto(campo: str, modelo=Producto):
+    longitud = modelo._meta.get_field(campo).max_length
+
+    def convertir(valor: Any) -> str:
+        valor = str(valor)
+        if longitud and len(valor) > longitud:
+            raise ValueError(f"Máximo {longitud} caracteres")
+        return valor
+
+    return convertir
+
+
+def _entero_no_negativo(valor: Any) -> int:
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ValueError("Debe ser un número entero")
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError("Debe ser un número entero")
+    if numero < 0:
+        raise ValueError("No puede ser negativo")
+    return numero
+
+
+def _precio(valor: Any) -> Decimal:
+    campo = Producto._meta.get_field("precio_unitario")
+    try:
+        precio = Decimal(str(valor)).quantize(Decimal(1).scaleb(-campo.decimal_places))
+    except InvalidOperation:
+        raise ValueError("Precio inválido")
+    if precio < 0 or len(precio.as_tuple().digits) > campo.max_digits:
+        raise ValueError("Precio inválido")
+    return precio
+
+
+def _booleano(valor: Any) -> bool:
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).lower()
+    if texto in VALORES_VERDADEROS:
+        return True
+    if texto in VALORES_FALSOS:
+        return False
+    raise ValueError("Debe ser verdadero o falso")
+
+
+def _categoria(valor: Any) -> int | str:
+    """ID numérico o nombre de la categoría."""
+    if isinstance(valor, int) or str(valor).isdigit():
+        return int(valor)
+    return _texto("nombre", CategoriaProducto)(valor)
+
+
+_CONVERSORES = {
+    "codigo": _texto("codigo"),
+    "nombre": _texto("nombre"),
+    "categoria": _categoria,
+    "precio_unitario": _precio,
+    "descripcion": str,
+    "activo": _booleano,
+    "sede": _entero_no_negativo,
+    "cantidad_actual": _entero_no_negativo,
+    "cantidad_minima": _entero_no_negativo,
+    "cantidad_maxima": _entero_no_negativo,
+    "ubicacion_almacen": _texto("ubicacion_almacen", Inventario),
+}
@@ -0,0 +1,62 @@
+"""
+Recalcula la demanda diaria y el punto de reorden de cada inventario a partir del
+resumen diario de ventas (pensado para correr cada noche).
+
+Uso:
+    python manage.py calcular_puntos_reorden
+    python manage.py calcular_puntos_reorden --dias 56 --plazo 10 --factor 2.05
+    python manage.py calcular_puntos_reorden --sede 1 --hasta 2026-03-31
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.services import puntos_reorden_calcular
+
+
+class Command(BaseCommand):
+    help = "Recalcula el punto de reorden de cada inventario según las ventas recientes."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--dias", type=int, default=28, help="Días de ventas a considerar. Default: 28."
+        )
+        parser.add_argument(
+            "--plazo", type=int, default=7, help="Días de entrega del proveedor. Default: 7."
+        )
+        parser.add_argument(
+            "--factor",
+            default="1.65",
+            help="Desviaciones estándar de stock de seguridad. Default: 1.65 (≈95 %% de servicio).",
+        )
+        parser.add_argument("--hasta", help="Último día de ventas incluido (YYYY-MM-DD). Default: ayer.")
+        parser.add_argument(
+            "--sede",
+            type=int,
+            action="append",
+            dest="sedes",
+            help="Sede a recalcular (se puede repetir). Default: todas.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["dias"] < 1 or options["plazo"] < 0:
+            raise CommandError("--dias debe ser al menos 1 y --plazo no puede ser negativo")
+        try:
+            factor = Decimal(options["factor"])
+            hasta = date.fromisoformat(options["hasta"]) if options["hasta"] else None
+        except (InvalidOperation, ValueError) as e:
+            raise CommandError(f"Parámetro inválido: {e}")
+
+        actualizados = puntos_reorden_calcular(
+            dias=options["dias"],
+            plazo_entrega=options["plazo"],
+            factor_seguridad=factor,
+            hasta=hasta,
+            sede_ids=options["sedes"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Puntos de reorden actualizados: {actualizados} inventarios."))
@@ -0,0 +1,80 @@
+"""
+Importa productos y stock por sede desde un archivo CSV o JSONL (ver inventario.importacion).
+
+Uso:
+    python manage.py importar_inventario carga.csv
+    python manage.py importar_inventario conteo.jsonl --simular
+    python manage.py importar_inventario - --formato jsonl < conteo.jsonl
+
+Las filas con errores se omiten y se listan al final; el resto se importa en una
+sola transacción.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.importacion import FORMATOS_IMPORTACION, importar_inventario, leer_filas
+
+
+class Command(BaseCommand):
+    help = "Crea o actualiza productos e inventario por sede desde un archivo CSV o JSONL."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("archivo", help="Ruta del archivo, o - para leer de la entrada estándar.")
+        parser.add_argument(
+            "--formato",
+            choices=FORMATOS_IMPORTACION,
+            help="csv o jsonl. Default: según la extensión del archivo.",
+        )
+        parser.add_argument(
+            "--simular",
+            action="store_true",
+            help="Valida e informa sin guardar nada.",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Filas por INSERT al escribir productos e inventarios. Default: 1000.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        ruta = options["archivo"]
+        formato = options["formato"] or ruta.rsplit(".", 1)[-1].lower()
+        if formato not in FORMATOS_IMPORTACION:
+            raise CommandError("Indica --formato csv o --formato jsonl")
+
+        try:
+            if ruta == "-":
+                resultado = self._importar(sys.stdin, formato, options)
+            else:
+                with open(ruta, encoding="utf-8-sig", newline="") as archivo:
+                    resultado = self._importar(archivo, formato, options)
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        for error in resultado["errores"]:
+            detalle = "; ".join(f"{campo}: {mensaje}" for campo, mensaje in error["errores"].items())
+            self.stdout.write(self.style.WARNING(f"Fila {error['fila']}: {detalle}"))
+
+        prefijo = "Simulación" if options["simular"] else "Importación"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefijo}: {resultado['filas']} filas, {len(resultado['errores'])} con errores. "
+                f"Productos: {resultado['productos_creados']} creados, "
+                f"{resultado['productos_actualizados']} actualizados. "
+                f"Inventarios: {resultado['inventarios_creados']} creados, "
+                f"{resultado['inventarios_actualizados']} actualizados."
+            )
+        )
+
+    def _importar(self, lineas: Any, formato: str, options: dict[str, Any]) -> dict[str, Any]:
+        return importar_inventario(
+            leer_filas(lineas, formato),
+            tamano_lote=options["lote"],
+            simular=options["simular"],
+        )
@@ -0,0 +1,75 @@
+"""
+Toma un snapshot del stock de cada producto por sede (pensado para correr a diario).
+
+Uso:
+    python manage.py snapshot_inventario                  # todas las sedes
+    python manage.py snapshot_inventario --sede 1 --sede 2
+    python manage.py snapshot_inventario --verificar      # además compara libro y contador
+
+Con --verificar, antes de tomar el snapshot se calcula el stock de cada producto a
+partir del libro de movimientos y se informan las diferencias con
+Inventario.cantidad_actual (cambios hechos sin pasar por los servicios, p. ej. un
+UPDATE manual en la base de datos).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventario.models import Inventario
+from inventario.services import snapshot_inventario_crear, stock_en_fecha
+
+
+class Command(BaseCommand):
+    help = "Guarda el stock actual de cada producto por sede como snapshot del libro de inventario."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--sede",
+            type=int,
+            action="append",
+            dest="sedes",
+            help="Sede a fotografiar (se puede repetir). Default: todas.",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Informa las diferencias entre el libro de movimientos y cantidad_actual.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        sede_ids = options["sedes"]
+        if sede_ids is None:
+            sede_ids = list(Inventario.objects.order_by().values_list("sede_id", flat=True).distinct())
+
+        if options["verificar"]:
+            self._verificar(sede_ids)
+
+        creados = snapshot_inventario_crear(sede_ids=sede_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Snapshots creados: {creados} en {len(set(sede_ids))} sede(s).")
+        )
+
+    def _verificar(self, sede_ids: list[int]) -> None:
+        ahora = timezone.now()
+        diferencias = 0
+        for sede_id in sorted(set(sede_ids)):
+            segun_libro = stock_en_fecha(sede_id=sede_id, momento=ahora)
+            actuales = Inventario.objects.filter(sede_id=sede_id).values_list(
+                "producto_id", "cantidad_actual"
+            )
+            for producto_id, cantidad_actual in actuales:
+                cantidad_libro = segun_libro.get(producto_id, 0)
+                if cantidad_libro != cantidad_actual:
+                    diferencias += 1
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"Sede {sede_id}, producto {producto_id}: "
+                            f"libro={cantidad_libro} inventario={cantidad_actual}"
+                        )
+                    )
+        if not diferencias:
+            self.stdout.write("El libro de movimientos coincide con el inventario.")
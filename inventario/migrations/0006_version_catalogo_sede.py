@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instalaciones', '0001_initial'),
+        ('inventario', '0005_alter_inventario_options_alter_producto_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogoSede',
+            fields=[
+                ('sede', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='version_catalogo', serialize=False, to='instalaciones.sede')),
+                ('version', models.BigIntegerField(default=0)),
+                ('version_minima_delta', models.BigIntegerField(default=0, help_text='Versión más antigua desde la que se puede pedir un delta (se sube al borrar inventario)')),
+            ],
+            options={
+                'verbose_name': 'Versión de Catálogo por Sede',
+                'verbose_name_plural': 'Versiones de Catálogo por Sede',
+                'db_table': 'version_catalogo_sede',
+            },
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='version_catalogo',
+            field=models.BigIntegerField(default=0, help_text='Versión del catálogo de la sede en la que cambió este registro por última vez'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sede', 'version_catalogo'], name='inventario_sede_id_19acd6_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+def reasignar_codigos_duplicados(apps, schema_editor):
+    """Antes de crear el índice único, da un código nuevo a los productos con código repetido o vacío."""
+    from inventario.models import generar_codigo_producto
+
+    Producto = apps.get_model('inventario', 'Producto')
+    vistos = set()
+    for producto in Producto.objects.order_by('producto_id').only('producto_id', 'codigo'):
+        if producto.codigo is None:
+            continue
+        if producto.codigo == '' or producto.codigo in vistos:
+            producto.codigo = generar_codigo_producto()
+            producto.save(update_fields=['codigo'])
+        vistos.add(producto.codigo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_version_catalogo_sede'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE IF NOT EXISTS producto_codigo_seq',
+            reverse_sql='DROP SEQUENCE IF EXISTS producto_codigo_seq',
+        ),
+        migrations.RunPython(reasignar_codigos_duplicados, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_producto_codigo_unico'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['nombre', 'producto_id'], name='producto_nombre_b26f5b_idx'),
+        ),
+    ]
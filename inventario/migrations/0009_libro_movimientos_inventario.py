@@ -0,0 +1,73 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def snapshot_inicial(apps, schema_editor):
+    """El libro empieza vacío: el stock actual queda como snapshot de partida."""
+    Inventario = apps.get_model('inventario', 'Inventario')
+    SnapshotInventario = apps.get_model('inventario', 'SnapshotInventario')
+    ahora = django.utils.timezone.now()
+    SnapshotInventario.objects.bulk_create(
+        (
+            SnapshotInventario(
+                sede_id=sede_id, producto_id=producto_id, fecha=ahora, cantidad=cantidad
+            )
+            for sede_id, producto_id, cantidad in Inventario.objects.values_list(
+                'sede_id', 'producto_id', 'cantidad_actual'
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instalaciones', '0001_initial'),
+        ('inventario', '0008_producto_producto_nombre_b26f5b_idx'),
+        ('ventas', '0007_resumenes_venta_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('movimiento_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('venta', 'Venta'), ('cancelacion', 'Cancelación de venta'), ('ajuste', 'Ajuste manual'), ('transferencia', 'Transferencia entre sedes')], max_length=20)),
+                ('cantidad', models.IntegerField(help_text='Delta de stock: negativo si sale, positivo si entra')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nota', models.CharField(blank=True, max_length=255)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='inventario.producto')),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_inventario', to='instalaciones.sede')),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_inventario', to='ventas.ventaproducto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Inventario',
+                'verbose_name_plural': 'Movimientos de Inventario',
+                'db_table': 'movimiento_inventario',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['sede', 'producto', 'fecha'], name='movimiento__sede_id_743cea_idx'), models.Index(fields=['sede', 'fecha'], name='movimiento__sede_id_0ea7a7_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotInventario',
+            fields=[
+                ('snapshot_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField()),
+                ('cantidad', models.IntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots_inventario', to='inventario.producto')),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots_inventario', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Inventario',
+                'verbose_name_plural': 'Snapshots de Inventario',
+                'db_table': 'snapshot_inventario',
+                'indexes': [models.Index(fields=['sede', 'fecha'], name='snapshot_in_sede_id_e55499_idx')],
+                'unique_together': {('sede', 'producto', 'fecha')},
+            },
+        ),
+        migrations.RunPython(snapshot_inicial, migrations.RunPython.noop),
+    ]
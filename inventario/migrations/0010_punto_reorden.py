@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instalaciones', '0001_initial'),
+        ('inventario', '0009_libro_movimientos_inventario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventario',
+            name='demanda_diaria',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='Unidades vendidas por día en la ventana usada para el punto de reorden', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='punto_reorden',
+            field=models.PositiveIntegerField(default=0, help_text='Stock con el que conviene pedir más, según la demanda reciente (calculado)'),
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='punto_reorden_actualizado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(condition=models.Q(('cantidad_actual__lte', models.F('cantidad_minima')), ('cantidad_actual__lte', models.F('punto_reorden')), _connector='OR'), fields=['sede', 'producto'], name='inventario_reabastecer_idx'),
+        ),
+    ]
@@ -1,6 +1,44 @@
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
 from instalaciones.models import Sede
 
+
+# Secuencia de PostgreSQL para los códigos generados (creada en la migración 0007).
+SECUENCIA_CODIGO_PRODUCTO = 'producto_codigo_seq'
+
+# Inventarios que necesitan reabastecerse: stock en o bajo el mínimo fijo o el punto de
+# reorden calculado. Es también la condición del índice parcial de Inventario, así que
+# PostgreSQL mantiene ese conjunto al día con cada cambio de stock.
+REQUIERE_REABASTECIMIENTO = (
+    models.Q(cantidad_actual__lte=models.F('cantidad_minima'))
+    | models.Q(cantidad_actual__lte=models.F('punto_reorden'))
+)
+
+
+def generar_codigo_producto():
+    """
+    Genera un código EAN-13 de uso interno (prefijo 2) a partir de una secuencia.
+    Cada llamada obtiene un número distinto, así que no hace falta comprobar colisiones;
+    los 13 dígitos tampoco coinciden con los códigos aleatorios de 12 dígitos anteriores.
+    """
+    return generar_codigos_producto(1)[0]
+
+
+def generar_codigos_producto(cantidad):
+    """Reserva `cantidad` números de la secuencia en una sola consulta y los devuelve como EAN-13."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [SECUENCIA_CODIGO_PRODUCTO, cantidad],
+        )
+        numeros = [fila[0] for fila in cursor.fetchall()]
+    return [_ean13(f"2{numero:011d}") for numero in numeros]
+
+
+def _ean13(base):
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(base))
+    return base + str((10 - suma % 10) % 10)
+
 class CategoriaProducto(models.Model):
     categoria_producto_id = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=100)
@@ -20,7 +58,7 @@ class Producto(models.Model):
     NO almacena stock - el stock se gestiona en el modelo Inventario por sede.
     """
     producto_id = models.AutoField(primary_key=True)
-    codigo = models.CharField(max_length=50, blank=True, null=True)
+    codigo = models.CharField(max_length=50, blank=True, null=True, unique=True)
     nombre = models.CharField(max_length=100)
     categoria = models.ForeignKey('CategoriaProducto', on_delete=models.CASCADE, related_name='productos')
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
@@ -32,18 +70,16 @@ class Producto(models.Model):
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre', 'producto_id']),
+        ]
 
     def __str__(self):
         return f"{self.codigo} - {self.nombre}" if self.codigo else self.nombre
 
     def save(self, *args, **kwargs):
         if not self.codigo:
-            import random
-            while True:
-                nuevo_codigo = random.randint(100000000000, 999999999999)
-                if not Producto.objects.filter(codigo=nuevo_codigo).exists():
-                    self.codigo = str(nuevo_codigo)
-                    break
+            self.codigo = generar_codigo_producto()
         super().save(*args, **kwargs)
 
     @property
@@ -99,6 +135,21 @@ class Inventario(models.Model):
         help_text="Ubicación física en el almacén (ej: Anaquel A3)"
     )
     ultima_actualizacion = models.DateTimeField(auto_now=True)
+    version_catalogo = models.BigIntegerField(
+        default=0,
+        help_text="Versión del catálogo de la sede en la que cambió este registro por última vez"
+    )
+    punto_reorden = models.PositiveIntegerField(
+        default=0,
+        help_text="Stock con el que conviene pedir más, según la demanda reciente (calculado)"
+    )
+    demanda_diaria = models.DecimalField(
+        max_digits=10,
+        decimal_places=3,
+        default=0,
+        help_text="Unidades vendidas por día en la ventana usada para el punto de reorden"
+    )
+    punto_reorden_actualizado = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'inventario'
@@ -109,6 +160,12 @@ class Inventario(models.Model):
         indexes = [
             models.Index(fields=['sede', 'producto']),
             models.Index(fields=['cantidad_actual']),
+            models.Index(fields=['sede', 'version_catalogo']),
+            models.Index(
+                fields=['sede', 'producto'],
+                condition=REQUIERE_REABASTECIMIENTO,
+                name='inventario_reabastecer_idx',
+            ),
         ]
 
     def __str__(self):
@@ -116,8 +173,8 @@ class Inventario(models.Model):
 
     @property
     def requiere_reabastecimiento(self):
-        """Verifica si el stock está por debajo del mínimo"""
-        return self.cantidad_actual <= self.cantidad_minima
+        """Verifica si el stock está en o por debajo del mínimo o del punto de reorden"""
+        return self.cantidad_actual <= max(self.cantidad_minima, self.punto_reorden)
 
     @property
     def porcentaje_disponibilidad(self):
@@ -138,3 +195,95 @@ class Inventario(models.Model):
         elif self.cantidad_actual >= self.cantidad_maxima:
             return 'excedido'
         return 'normal'
+
+
+class VersionCatalogoSede(models.Model):
+    """
+    Contador de versión del catálogo POS de una sede.
+    Se incrementa cada vez que cambia el stock o los datos de un producto de la sede;
+    los registros de Inventario afectados guardan la versión en version_catalogo.
+    """
+    sede = models.OneToOneField(
+        Sede,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='version_catalogo',
+    )
+    version = models.BigIntegerField(default=0)
+    version_minima_delta = models.BigIntegerField(
+        default=0,
+        help_text="Versión más antigua desde la que se puede pedir un delta (se sube al borrar inventario)"
+    )
+
+    class Meta:
+        db_table = 'version_catalogo_sede'
+        verbose_name = 'Versión de Catálogo por Sede'
+        verbose_name_plural = 'Versiones de Catálogo por Sede'
+
+    def __str__(self):
+        return f"{self.sede} - v{self.version}"
+
+
+class MovimientoInventario(models.Model):
+    """
+    Libro de movimientos de stock (solo inserciones).
+    Cada cambio de Inventario.cantidad_actual registra aquí su delta en la misma transacción.
+    """
+    TIPO_CHOICES = [
+        ('venta', 'Venta'),
+        ('cancelacion', 'Cancelación de venta'),
+        ('ajuste', 'Ajuste manual'),
+        ('transferencia', 'Transferencia entre sedes'),
+    ]
+
+    movimiento_id = models.BigAutoField(primary_key=True)
+    sede = models.ForeignKey(Sede, on_delete=models.CASCADE, related_name='movimientos_inventario')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    cantidad = models.IntegerField(help_text="Delta de stock: negativo si sale, positivo si entra")
+    fecha = models.DateTimeField(default=timezone.now)
+    venta = models.ForeignKey(
+        'ventas.VentaProducto',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='movimientos_inventario',
+    )
+    nota = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        db_table = 'movimiento_inventario'
+        verbose_name = 'Movimiento de Inventario'
+        verbose_name_plural = 'Movimientos de Inventario'
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['sede', 'producto', 'fecha']),
+            models.Index(fields=['sede', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.cantidad:+d} - {self.producto_id} @ {self.sede_id}"
+
+
+class SnapshotInventario(models.Model):
+    """
+    Foto periódica del stock de cada producto en una sede.
+    El stock en un momento dado es el último snapshot anterior más los movimientos posteriores.
+    """
+    snapshot_id = models.BigAutoField(primary_key=True)
+    sede = models.ForeignKey(Sede, on_delete=models.CASCADE, related_name='snapshots_inventario')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='snapshots_inventario')
+    fecha = models.DateTimeField()
+    cantidad = models.IntegerField()
+
+    class Meta:
+        db_table = 'snapshot_inventario'
+        verbose_name = 'Snapshot de Inventario'
+        verbose_name_plural = 'Snapshots de Inventario'
+        unique_together = [['sede', 'producto', 'fecha']]
+        indexes = [
+            models.Index(fields=['sede', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} @ {self.sede_id} = {self.cantidad} ({self.fecha:%Y-%m-%d %H:%M})"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from instalaciones.models import Sede
 from .models import CategoriaProducto, Producto, Inventario
+from .services import catalogo_invalidar_delta, inventario_guardar
 
 class CategoriaProductoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -70,9 +72,14 @@ class InventarioSerializer(serializers.ModelSerializer):
             'inventario_id', 'producto', 'producto_id', 'sede', 'sede_nombre',
             'cantidad_actual', 'cantidad_minima', 'cantidad_maxima',
             'ubicacion_almacen', 'estado_stock', 'requiere_reabastecimiento',
-            'porcentaje_disponibilidad', 'ultima_actualizacion'
+            'porcentaje_disponibilidad', 'punto_reorden', 'demanda_diaria',
+            'ultima_actualizacion'
         ]
-        read_only_fields = ['ultima_actualizacion']
+        read_only_fields = ['punto_reorden', 'demanda_diaria', 'ultima_actualizacion']
+
+    def create(self, validated_data):
+        """Crea el registro de inventario y anota su stock inicial en el libro de movimientos."""
+        return inventario_guardar(Inventario(**validated_data), nota="Alta de inventario")
 
     def update(self, instance, validated_data):
         """
@@ -89,8 +96,54 @@ class InventarioSerializer(serializers.ModelSerializer):
         instance.ubicacion_almacen = validated_data.get('ubicacion_almacen', instance.ubicacion_almacen)
 
         # Si viene sede en validated_data, actualizarla
+        sede_anterior_id = instance.sede_id
         if 'sede' in validated_data:
             instance.sede = validated_data['sede']
 
-        instance.save()
+        inventario_guardar(instance, nota="Edición de inventario")
+        # El registro sale del catálogo de la sede anterior: sus POS deben recargarlo completo
+        if instance.sede_id != sede_anterior_id:
+            catalogo_invalidar_delta(sede_id=sede_anterior_id)
         return instance
+
+
+class ReabastecimientoSerializer(serializers.ModelSerializer):
+    """
+    Fila de la lista de reabastecimiento (inventarios_por_reabastecer).
+    Se usa en GET /api/inventario/inventario/reabastecer/
+    """
+    producto_codigo = serializers.CharField(source='producto.codigo', read_only=True)
+    producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
+    categoria_nombre = serializers.CharField(source='producto.categoria.nombre', read_only=True)
+    sede_nombre = serializers.CharField(source='sede.nombre', read_only=True)
+    cantidad_sugerida = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Inventario
+        fields = [
+            'inventario_id', 'sede', 'sede_nombre', 'producto_id', 'producto_codigo',
+            'producto_nombre', 'categoria_nombre', 'cantidad_actual', 'cantidad_minima',
+            'cantidad_maxima', 'punto_reorden', 'demanda_diaria', 'cantidad_sugerida',
+        ]
+        read_only_fields = fields
+
+
+class ProductoTransferenciaSerializer(serializers.Serializer):
+    producto_id = serializers.IntegerField()
+    cantidad = serializers.IntegerField(min_value=1)
+
+
+class TransferenciaInventarioSerializer(serializers.Serializer):
+    """
+    Datos de una transferencia de stock entre sedes.
+    Se usa en el endpoint POST /api/inventario/inventario/transferir/
+    """
+    sede_origen = serializers.PrimaryKeyRelatedField(queryset=Sede.objects.all())
+    sede_destino = serializers.PrimaryKeyRelatedField(queryset=Sede.objects.all())
+    productos = ProductoTransferenciaSerializer(many=True, allow_empty=False)
+    nota = serializers.CharField(required=False, allow_blank=True, default='', max_length=200)
+
+    def validate(self, data):
+        if data['sede_origen'] == data['sede_destino']:
+            raise serializers.ValidationError({'sede_destino': 'Debe ser distinta de la sede de origen'})
+        return data
@@ -0,0 +1,626 @@
+"""
+Capa de servicios para el módulo de inventario.
+
+Catálogo POS por sede:
+- catalogo_registrar_cambios: sube la versión de la sede y marca los inventarios modificados
+- catalogo_invalidar_delta: sube la versión e impide deltas anteriores (p. ej. tras borrar inventario)
+- catalogo_version: versión actual y versión mínima admitida para deltas de una sede
+- producto_escanear: resuelve un código de barras a su inventario en una sede (con caché LRU)
+
+Cada cambio incrementa VersionCatalogoSede.version y guarda ese número en
+Inventario.version_catalogo de las filas afectadas, de modo que el POS puede pedir
+solo las filas con version_catalogo mayor que la última versión que conoce.
+
+Libro de movimientos de stock:
+- movimientos_registrar: inserta en el libro los deltas de stock de una operación
+- inventario_guardar: guarda un Inventario editado a mano y registra el ajuste
+- snapshot_inventario_crear: toma la foto periódica del stock de una o varias sedes
+- stock_en_fecha: stock de una sede en un momento dado (snapshot + movimientos posteriores)
+
+Transferencias:
+- inventario_transferir: mueve stock de varios productos entre dos sedes en una transacción
+
+Reabastecimiento:
+- puntos_reorden_calcular: recalcula demanda diaria y punto de reorden desde el resumen de ventas
+- inventarios_por_reabastecer: inventarios que requieren reabastecerse, con la cantidad sugerida
+
+Consultas:
+- stock_matriz: stock de productos (filas) por sede (columnas) en una sola consulta agrupada
+
+Inventario.cantidad_actual sigue siendo el contador que se bloquea y valida en cada
+venta; el libro (MovimientoInventario) se escribe en la misma transacción que cada
+cambio de ese contador, así que ambos coinciden y el historial se puede consultar
+sin reproducirlo entero gracias a los snapshots.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Case, F, Max, PositiveIntegerField, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Ceil, Greatest, Least
+from django.utils import timezone
+
+from instalaciones.models import Sede
+from ventas.models import ResumenVentaProductoDiario
+
+from .models import (
+    REQUIERE_REABASTECIMIENTO,
+    Inventario,
+    MovimientoInventario,
+    Producto,
+    SnapshotInventario,
+    VersionCatalogoSede,
+)
+
+
+def catalogo_registrar_cambios(*, sede_id: int, producto_ids: Iterable[int]) -> int:
+    """Incrementa la versión del catálogo de la sede y la asigna a los inventarios indicados.
+
+    Se ejecuta en una sola sentencia (upsert del contador + UPDATE de inventario).
+    El contador queda bloqueado hasta el commit, así que las versiones de una sede
+    se confirman en orden: conviene llamarla al final de la transacción.
+
+    Args:
+        sede_id: Sede cuyo catálogo cambió.
+        producto_ids: Productos cuyo inventario en la sede debe marcarse.
+
+    Returns:
+        La nueva versión del catálogo de la sede.
+    """
+    tabla_version = VersionCatalogoSede._meta.db_table
+    tabla_inventario = Inventario._meta.db_table
+    sql = (
+        f"WITH v AS ("
+        f"INSERT INTO {tabla_version} (sede_id, version, version_minima_delta) VALUES (%s, 1, 0) "
+        f"ON CONFLICT (sede_id) DO UPDATE SET version = {tabla_version}.version + 1 "
+        f"RETURNING version), "
+        f"marcados AS ("
+        f"UPDATE {tabla_inventario} SET version_catalogo = (SELECT version FROM v) "
+        f"WHERE sede_id = %s AND producto_id = ANY(%s)) "
+        f"SELECT version FROM v"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [sede_id, sede_id, sorted(set(producto_ids))])
+        return cursor.fetchone()[0]
+
+
+def catalogo_invalidar_delta(*, sede_id: int) -> int:
+    """Incrementa la versión del catálogo de la sede y descarta los deltas anteriores.
+
+    Se usa cuando desaparece un registro de inventario: no queda fila que marcar, así
+    que los POS con una versión anterior deben volver a descargar el catálogo completo.
+
+    Returns:
+        La nueva versión del catálogo de la sede.
+    """
+    tabla = VersionCatalogoSede._meta.db_table
+    sql = (
+        f"INSERT INTO {tabla} (sede_id, version, version_minima_delta) VALUES (%s, 1, 1) "
+        f"ON CONFLICT (sede_id) DO UPDATE SET version = {tabla}.version + 1, "
+        f"version_minima_delta = {tabla}.version + 1 "
+        f"RETURNING version"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [sede_id])
+        return cursor.fetchone()[0]
+
+
+def catalogo_version(*, sede_id: int) -> tuple[int, int]:
+    """Devuelve (version, version_minima_delta) del catálogo de la sede; (0, 0) si nunca cambió."""
+    fila = (
+        VersionCatalogoSede.objects.filter(sede_id=sede_id)
+        .values_list("version", "version_minima_delta")
+        .first()
+    )
+    return fila or (0, 0)
+
+
+class _CacheLRU:
+    """Caché LRU en memoria del proceso, segura entre hilos."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._datos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def set(self, clave, valor) -> None:
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            if len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+_cache_escaneo = _CacheLRU(capacidad=4096)
+
+
+def producto_escanear(*, codigo: str, sede_id: int) -> Inventario | None:
+    """Busca por código exacto el inventario de un producto en una sede.
+
+    Cada entrada de la caché guarda la versión del catálogo de la sede con la que se
+    leyó; como todo cambio de stock o de producto sube esa versión, un acierto solo
+    se usa si la versión sigue siendo la misma. Así la caché es correcta aunque haya
+    varios procesos: un acierto cuesta una lectura por PK de VersionCatalogoSede y un
+    fallo una consulta sobre el índice único de Producto.codigo.
+
+    Returns:
+        Inventario con producto, categoría y sede cargados, o None si el código no
+        existe o el producto no tiene inventario en la sede.
+    """
+    version, _ = catalogo_version(sede_id=sede_id)
+    clave = (sede_id, codigo)
+    en_cache = _cache_escaneo.get(clave)
+    if en_cache is not None and en_cache[0] == version:
+        return en_cache[1]
+
+    inventario = (
+        Inventario.objects.select_related("producto", "producto__categoria", "sede")
+        .filter(sede_id=sede_id, producto__codigo=codigo)
+        .order_by()
+        .first()
+    )
+    if inventario is not None:
+        _cache_escaneo.set(clave, (version, inventario))
+    return inventario
+
+
+def movimientos_registrar(
+    *,
+    sede_id: int,
+    tipo: str,
+    cantidades: dict[int, int],
+    venta=None,
+    nota: str = "",
+) -> list[MovimientoInventario]:
+    """Inserta en el libro un movimiento por producto con el delta de stock indicado.
+
+    Debe llamarse dentro de la transacción que cambia Inventario.cantidad_actual y
+    después de bloquear esas filas, para que la fecha del movimiento sea posterior a
+    cualquier snapshot ya tomado.
+
+    Args:
+        sede_id: Sede cuyo stock cambió.
+        tipo: 'venta', 'cancelacion', 'ajuste' o 'transferencia'.
+        cantidades: producto_id -> delta (negativo si sale stock). Los ceros se ignoran.
+        venta: VentaProducto que origina el movimiento, si aplica.
+        nota: Texto libre.
+    """
+    ahora = timezone.now()
+    return MovimientoInventario.objects.bulk_create(
+        [
+            MovimientoInventario(
+                sede_id=sede_id,
+                producto_id=producto_id,
+                tipo=tipo,
+                cantidad=cantidad,
+                fecha=ahora,
+                venta=venta,
+                nota=nota,
+            )
+            for producto_id, cantidad in sorted(cantidades.items())
+            if cantidad
+        ]
+    )
+
+
+def inventario_guardar(inventario: Inventario, *, nota: str = "") -> Inventario:
+    """Guarda un Inventario creado o editado a mano y registra el ajuste de stock en el libro.
+
+    Bloquea la fila para leer el stock anterior, de modo que el delta registrado es
+    exacto aunque haya ventas en curso. Si el registro cambia de sede, el stock sale
+    de la sede anterior y entra en la nueva.
+    """
+    with transaction.atomic():
+        sede_anterior_id, cantidad_anterior = None, 0
+        if inventario.pk is not None:
+            sede_anterior_id, cantidad_anterior = (
+                Inventario.objects.select_for_update()
+                .values_list("sede_id", "cantidad_actual")
+                .get(pk=inventario.pk)
+            )
+        inventario.save()
+
+        if sede_anterior_id is not None and sede_anterior_id != inventario.sede_id:
+            movimientos_registrar(
+                sede_id=sede_anterior_id,
+                tipo="ajuste",
+                cantidades={inventario.producto_id: -cantidad_anterior},
+                nota=nota,
+            )
+            cantidad_anterior = 0
+        movimientos_registrar(
+            sede_id=inventario.sede_id,
+            tipo="ajuste",
+            cantidades={inventario.producto_id: inventario.cantidad_actual - cantidad_anterior},
+            nota=nota,
+        )
+    return inventario
+
+
+def snapshot_inventario_crear(*, sede_ids: Iterable[int] | None = None) -> int:
+    """Guarda el stock actual de cada producto como snapshot, sede por sede.
+
+    Las filas de inventario de la sede se bloquean (en el mismo orden que el
+    checkout) mientras se toma la foto: las ventas en curso terminan antes
+    y las nuevas esperan, así que ningún movimiento queda a medias entre el snapshot y
+    el libro. El bloqueo dura lo que tarda un INSERT por sede.
+
+    Returns:
+        Número de snapshots creados.
+    """
+    if sede_ids is None:
+        sede_ids = Inventario.objects.values_list("sede_id", flat=True).distinct()
+    creados = 0
+    for sede_id in sorted(set(sede_ids)):
+        with transaction.atomic():
+            filas = list(
+                Inventario.objects.select_for_update()
+                .filter(sede_id=sede_id)
+                .order_by("producto_id")
+                .values_list("producto_id", "cantidad_actual")
+            )
+            ahora = timezone.now()
+            creados += len(
+                SnapshotInventario.objects.bulk_create(
+                    [
+                        SnapshotInventario(
+                            sede_id=sede_id, producto_id=producto_id, fecha=ahora, cantidad=cantidad
+                        )
+                        for producto_id, cantidad in filas
+                    ]
+                )
+            )
+    return creados
+
+
+def stock_en_fecha(
+    *,
+    sede_id: int,
+    momento: datetime,
+    producto_ids: Iterable[int] | None = None,
+) -> dict[int, int]:
+    """Stock de cada producto de la sede en un momento dado.
+
+    Parte del último snapshot de cada producto anterior o igual al momento y suma solo
+    los movimientos entre ese snapshot y el momento (índice sede, producto, fecha), sin
+    reproducir el historial completo.
+
+    Returns:
+        producto_id -> stock. Incluye los productos con inventario actual en la sede o
+        con snapshot anterior al momento.
+    """
+    tabla_snapshot = SnapshotInventario._meta.db_table
+    tabla_movimiento = MovimientoInventario._meta.db_table
+    tabla_inventario = Inventario._meta.db_table
+    params: list = [sede_id, momento, sede_id, sede_id, momento]
+    filtro_productos = ""
+    if producto_ids is not None:
+        filtro_productos = "WHERE candidatos.producto_id = ANY(%s)"
+        params.append(sorted(set(producto_ids)))
+    sql = (
+        f"WITH base AS ("
+        f"SELECT DISTINCT ON (producto_id) producto_id, fecha, cantidad FROM {tabla_snapshot} "
+        f"WHERE sede_id = %s AND fecha <= %s ORDER BY producto_id, fecha DESC), "
+        f"candidatos AS ("
+        f"SELECT producto_id FROM base "
+        f"UNION SELECT producto_id FROM {tabla_inventario} WHERE sede_id = %s) "
+        f"SELECT candidatos.producto_id, COALESCE(base.cantidad, 0) + COALESCE(delta.total, 0) "
+        f"FROM candidatos LEFT JOIN base ON base.producto_id = candidatos.producto_id "
+        f"LEFT JOIN LATERAL ("
+        f"SELECT SUM(m.cantidad) AS total FROM {tabla_movimiento} m "
+        f"WHERE m.sede_id = %s AND m.producto_id = candidatos.producto_id "
+        f"AND m.fecha > COALESCE(base.fecha, '-infinity') AND m.fecha <= %s"
+        f") delta ON TRUE "
+        f"{filtro_productos}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {producto_id: int(cantidad) for producto_id, cantidad in cursor.fetchall()}
+
+
+def inventario_transferir(
+    *,
+    sede_origen_id: int,
+    sede_destino_id: int,
+    productos: list[dict],
+    nota: str = "",
+) -> dict[int, tuple[int, int]]:
+    """Mueve stock de varios productos de una sede a otra en una sola transacción.
+
+    Si un producto no tiene inventario en la sede destino, se crea (con los mínimos y
+    máximos del origen). Las filas de ambas sedes se bloquean con un único SELECT FOR
+    UPDATE ordenado por (sede_id, producto_id): dos transferencias en sentidos opuestos
+    toman los bloqueos en el mismo orden, y las ventas (que bloquean una sola sede por
+    producto_id) no pueden formar un ciclo con ellas. El stock de ambas sedes se
+    actualiza con un solo UPDATE, así que el número de consultas no depende del número
+    de productos. Cada línea queda en el libro de movimientos como 'transferencia'.
+
+    Args:
+        sede_origen_id: Sede de la que sale el stock.
+        sede_destino_id: Sede a la que entra.
+        productos: Lista de dicts con 'producto_id' y 'cantidad' (> 0); un producto
+            repetido suma sus cantidades.
+        nota: Texto libre que se añade a los movimientos.
+
+    Returns:
+        Dict producto_id -> (stock final en origen, stock final en destino).
+
+    Raises:
+        ValidationError: Si las sedes coinciden, algún producto no tiene inventario en
+            el origen o el stock del origen no alcanza.
+    """
+    if sede_origen_id == sede_destino_id:
+        raise ValidationError("La sede de origen y la de destino deben ser distintas")
+    cantidades: dict[int, int] = {}
+    for item in productos:
+        cantidades[item["producto_id"]] = cantidades.get(item["producto_id"], 0) + item["cantidad"]
+    if not cantidades or any(cantidad <= 0 for cantidad in cantidades.values()):
+        raise ValidationError("Debe transferir al menos una unidad de cada producto")
+
+    with transaction.atomic():
+        origen = {
+            inventario.producto_id: inventario
+            for inventario in Inventario.objects.filter(
+                sede_id=sede_origen_id, producto_id__in=cantidades
+            ).only("producto_id", "cantidad_minima", "cantidad_maxima")
+        }
+        faltantes = sorted(set(cantidades) - set(origen))
+        if faltantes:
+            raise ValidationError(
+                f"Productos sin inventario en la sede de origen: {', '.join(map(str, faltantes))}"
+            )
+        # Las filas destino que falten se insertan antes de bloquear; ON CONFLICT DO NOTHING
+        # respeta las que ya existen (o que otra transacción acaba de crear).
+        Inventario.objects.bulk_create(
+            [
+                Inventario(
+                    sede_id=sede_destino_id,
+                    producto_id=producto_id,
+                    cantidad_actual=0,
+                    cantidad_minima=origen[producto_id].cantidad_minima,
+                    cantidad_maxima=origen[producto_id].cantidad_maxima,
+                )
+                for producto_id in sorted(cantidades)
+            ],
+            ignore_conflicts=True,
+        )
+
+        bloqueados = {
+            (inventario.sede_id, inventario.producto_id): inventario
+            for inventario in Inventario.objects.select_for_update(of=("self",))
+            .filter(sede_id__in=[sede_origen_id, sede_destino_id], producto_id__in=cantidades)
+            .order_by("sede_id", "producto_id")
+        }
+        errores = [
+            f"{producto_id} (disponible: {bloqueados[(sede_origen_id, producto_id)].cantidad_actual}, "
+            f"solicitado: {cantidad})"
+            for producto_id, cantidad in sorted(cantidades.items())
+            if bloqueados[(sede_origen_id, producto_id)].cantidad_actual < cantidad
+        ]
+        if errores:
+            raise ValidationError(f"Stock insuficiente en la sede de origen: {'; '.join(errores)}")
+
+        deltas = {}
+        for producto_id, cantidad in cantidades.items():
+            deltas[bloqueados[(sede_origen_id, producto_id)].pk] = -cantidad
+            deltas[bloqueados[(sede_destino_id, producto_id)].pk] = cantidad
+        Inventario.objects.filter(pk__in=deltas).update(
+            cantidad_actual=Case(
+                *(When(pk=pk, then=F("cantidad_actual") + delta) for pk, delta in deltas.items()),
+                output_field=PositiveIntegerField(),
+            ),
+            ultima_actualizacion=timezone.now(),
+        )
+
+        sufijo = f" - {nota}" if nota else ""
+        movimientos_registrar(
+            sede_id=sede_origen_id,
+            tipo="transferencia",
+            cantidades={producto_id: -cantidad for producto_id, cantidad in cantidades.items()},
+            nota=f"Transferencia a sede {sede_destino_id}{sufijo}",
+        )
+        movimientos_registrar(
+            sede_id=sede_destino_id,
+            tipo="transferencia",
+            cantidades=cantidades,
+            nota=f"Transferencia desde sede {sede_origen_id}{sufijo}",
+        )
+        for sede_id in sorted([sede_origen_id, sede_destino_id]):
+            catalogo_registrar_cambios(sede_id=sede_id, producto_ids=cantidades)
+
+    return {
+        producto_id: (
+            bloqueados[(sede_origen_id, producto_id)].cantidad_actual - cantidad,
+            bloqueados[(sede_destino_id, producto_id)].cantidad_actual + cantidad,
+        )
+        for producto_id, cantidad in cantidades.items()
+    }
+
+
+def puntos_reorden_calcular(
+    *,
+    dias: int = 28,
+    plazo_entrega: int = 7,
+    factor_seguridad: Decimal = Decimal("1.65"),
+    hasta: date | None = None,
+    sede_ids: Iterable[int] | None = None,
+) -> int:
+    """Recalcula demanda_diaria y punto_reorden de cada inventario a partir de las ventas.
+
+    Usa ResumenVentaProductoDiario de los `dias` días que terminan en `hasta` (por
+    defecto ayer). Por sede se calcula en un solo UPDATE, para todos los productos a la
+    vez, la media y la desviación de las unidades diarias (los días sin ventas cuentan
+    como cero) y:
+
+        punto_reorden = ceil(media * plazo_entrega + factor_seguridad * desviación * sqrt(plazo_entrega))
+
+    Las filas de la sede se bloquean antes en orden de producto_id, como en el checkout.
+
+    Args:
+        dias: Días de historial de ventas a considerar.
+        plazo_entrega: Días que tarda en llegar un pedido al proveedor.
+        factor_seguridad: Desviaciones estándar de stock de seguridad (1.65 ≈ 95 % de servicio).
+        hasta: Último día incluido.
+        sede_ids: Sedes a recalcular. Default: todas las que tienen inventario.
+
+    Returns:
+        Número de inventarios actualizados.
+    """
+    hasta = hasta or timezone.localdate() - timedelta(days=1)
+    desde = hasta - timedelta(days=dias - 1)
+    if sede_ids is None:
+        sede_ids = Inventario.objects.order_by().values_list("sede_id", flat=True).distinct()
+
+    tabla_inventario = Inventario._meta.db_table
+    tabla_resumen = ResumenVentaProductoDiario._meta.db_table
+    sql = (
+        f"WITH ventas AS ("
+        f"SELECT producto_id, SUM(unidades)::numeric AS total, "
+        f"SUM(unidades::numeric * unidades) AS cuadrados "
+        f"FROM {tabla_resumen} WHERE sede_id = %(sede)s AND fecha BETWEEN %(desde)s AND %(hasta)s "
+        f"GROUP BY producto_id), "
+        f"estadisticas AS ("
+        f"SELECT i.inventario_id, COALESCE(v.total, 0) / %(dias)s AS media, "
+        f"CASE WHEN %(dias)s > 1 THEN SQRT(GREATEST("
+        f"(COALESCE(v.cuadrados, 0) - COALESCE(v.total, 0) ^ 2 / %(dias)s) / (%(dias)s - 1), 0)) "
+        f"ELSE 0 END AS desviacion "
+        f"FROM {tabla_inventario} i LEFT JOIN ventas v ON v.producto_id = i.producto_id "
+        f"WHERE i.sede_id = %(sede)s) "
+        f"UPDATE {tabla_inventario} SET "
+        f"demanda_diaria = ROUND(e.media, 3), "
+        f"punto_reorden = CEIL(e.media * %(plazo)s + %(factor)s * e.desviacion * SQRT(%(plazo)s::numeric)), "
+        f"punto_reorden_actualizado = %(ahora)s "
+        f"FROM estadisticas e WHERE {tabla_inventario}.inventario_id = e.inventario_id"
+    )
+    actualizados = 0
+    for sede_id in sorted(set(sede_ids)):
+        with transaction.atomic():
+            list(
+                Inventario.objects.select_for_update()
+                .filter(sede_id=sede_id)
+                .order_by("producto_id")
+                .values_list("pk", flat=True)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql,
+                    {
+                        "sede": sede_id,
+                        "desde": desde,
+                        "hasta": hasta,
+                        "dias": Decimal(dias),
+                        "plazo": plazo_entrega,
+                        "factor": Decimal(factor_seguridad),
+                        "ahora": timezone.now(),
+                    },
+                )
+                actualizados += cursor.rowcount
+    return actualizados
+
+
+def inventarios_por_reabastecer(*, sede_id: int | None = None, dias_cobertura: int = 14) -> QuerySet:
+    """Inventarios en o bajo su mínimo o su punto de reorden (usa el índice parcial).
+
+    Cada fila trae anotada cantidad_sugerida: lo que falta para llegar al mayor entre
+    el mínimo y el punto de reorden más la demanda de `dias_cobertura` días, sin pasar
+    de cantidad_maxima.
+    """
+    umbral = Greatest(F("cantidad_minima"), F("punto_reorden"))
+    objetivo = Least(
+        F("cantidad_maxima"),
+        umbral + Ceil(F("demanda_diaria") * Value(dias_cobertura)),
+        output_field=PositiveIntegerField(),
+    )
+    inventarios = (
+        Inventario.objects.filter(REQUIERE_REABASTECIMIENTO)
+        .select_related("producto", "producto__categoria", "sede")
+        .annotate(
+            cantidad_sugerida=Greatest(
+                objetivo - F("cantidad_actual"), Value(0), output_field=PositiveIntegerField()
+            )
+        )
+    )
+    if sede_id is not None:
+        inventarios = inventarios.filter(sede_id=sede_id)
+    return inventarios
+
+
+def stock_matriz(
+    *,
+    categoria_id: int | None = None,
+    buscar: str | None = None,
+    activo: bool | None = None,
+    sede_ids: Iterable[int] | None = None,
+) -> dict:
+    """Stock de cada producto en cada sede, calculado con una sola consulta agrupada.
+
+    Cada sede es una columna MAX(cantidad_actual) FILTER (WHERE sede_id = ...) sobre
+    el LEFT JOIN producto-inventario agrupado por producto, en lugar de una consulta
+    por producto y sede. El resultado es columnar para que el JSON no repita claves:
+
+        {"sedes": {"id": [...], "nombre": [...]},
+         "productos": {"id": [...], "codigo": [...], "nombre": [...], "categoria": [...]},
+         "stock": [[cantidad por sede, ...] por producto],   # None = sin inventario en la sede
+         "total": [stock total por producto]}
+
+    Args:
+        categoria_id: Solo productos de esa categoría.
+        buscar: Texto contenido en el nombre o el código del producto.
+        activo: Solo productos activos (True) o inactivos (False).
+        sede_ids: Sedes a incluir como columnas. Default: todas.
+    """
+    sedes = Sede.objects.order_by("id")
+    if sede_ids is not None:
+        sedes = sedes.filter(id__in=list(sede_ids))
+    sedes = list(sedes.values_list("id", "nombre"))
+
+    productos = Producto.objects.all()
+    if categoria_id is not None:
+        productos = productos.filter(categoria_id=categoria_id)
+    if buscar:
+        productos = productos.filter(Q(nombre__icontains=buscar) | Q(codigo__icontains=buscar))
+    if activo is not None:
+        productos = productos.filter(activo=activo)
+
+    en_sedes = Q(inventarios__sede_id__in=[sede_id for sede_id, _ in sedes])
+    columnas = {
+        f"sede_{sede_id}": Max("inventarios__cantidad_actual", filter=Q(inventarios__sede_id=sede_id))
+        for sede_id, _ in sedes
+    }
+    filas = (
+        productos.order_by("nombre", "producto_id")
+        .values("producto_id", "codigo", "nombre", "categoria__nombre")
+        .annotate(total=Sum("inventarios__cantidad_actual", filter=en_sedes), **columnas)
+    )
+
+    matriz = {
+        "sedes": {"id": [sede_id for sede_id, _ in sedes], "nombre": [nombre for _, nombre in sedes]},
+        "productos": {"id": [], "codigo": [], "nombre": [], "categoria": []},
+        "stock": [],
+        "total": [],
+    }
+    for fila in filas:
+        matriz["productos"]["id"].append(fila["producto_id"])
+        matriz["productos"]["codigo"].append(fila["codigo"])
+        matriz["productos"]["nombre"].append(fila["nombre"])
+        matriz["productos"]["categoria"].append(fila["categoria__nombre"])
+        matriz["stock"].append([fila[columna] for columna in columnas])
+        matriz["total"].append(fila["total"] or 0)
+    return matriz
@@ -0,0 +1,63 @@
+"""
+Señales que mantienen la versión del catálogo POS por sede (ver inventario.services).
+Al borrar directamente un registro de inventario también se anota en el libro de
+movimientos la salida de su stock.
+
+Cubren los cambios hechos a través de save()/delete() (API, admin, serializers).
+Las operaciones en bloque con QuerySet.update() no emiten señales: quien las use
+debe llamar a catalogo_registrar_cambios explícitamente (p. ej. ventas.services).
+"""
+from collections import defaultdict
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from instalaciones.models import Sede
+
+from .models import CategoriaProducto, Inventario, Producto
+from .services import catalogo_invalidar_delta, catalogo_registrar_cambios, movimientos_registrar
+
+
+def _registrar_por_sede(inventarios: QuerySet) -> None:
+    productos_por_sede = defaultdict(list)
+    for sede_id, producto_id in inventarios.values_list("sede_id", "producto_id"):
+        productos_por_sede[sede_id].append(producto_id)
+    for sede_id in sorted(productos_por_sede):
+        catalogo_registrar_cambios(sede_id=sede_id, producto_ids=productos_por_sede[sede_id])
+
+
+@receiver(post_save, sender=Inventario)
+def inventario_guardado(sender, instance, **kwargs):
+    catalogo_registrar_cambios(sede_id=instance.sede_id, producto_ids=[instance.producto_id])
+
+
+@receiver(post_delete, sender=Inventario)
+def inventario_eliminado(sender, instance, origin=None, **kwargs):
+    # Al borrar la sede desaparece también su contador: no hay catálogo que invalidar.
+    modelo_origen = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if modelo_origen is Sede:
+        return
+    catalogo_invalidar_delta(sede_id=instance.sede_id)
+    # Al borrar el producto o la sede sus movimientos se borran en cascada.
+    if modelo_origen is Inventario:
+        movimientos_registrar(
+            sede_id=instance.sede_id,
+            tipo="ajuste",
+            cantidades={instance.producto_id: -instance.cantidad_actual},
+            nota="Registro de inventario eliminado",
+        )
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, created, **kwargs):
+    if created:
+        return
+    _registrar_por_sede(Inventario.objects.filter(producto=instance))
+
+
+@receiver(post_save, sender=CategoriaProducto)
+def categoria_guardada(sender, instance, created, **kwargs):
+    if created:
+        return
+    _registrar_por_sede(Inventario.objects.filter(producto__categoria=instance))
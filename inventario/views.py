@@ -1,12 +1,33 @@
+import csv
+import io
 import logging
 
-from rest_framework import viewsets
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from gym.paginacion import KeysetPagination
 from .models import CategoriaProducto, Producto, Inventario
-from .serializers import CategoriaProductoSerializer, ProductoSerializer, InventarioSerializer
+from .serializers import (
+    CategoriaProductoSerializer,
+    InventarioSerializer,
+    ProductoSerializer,
+    ReabastecimientoSerializer,
+    TransferenciaInventarioSerializer,
+)
+from .importacion import FORMATOS_IMPORTACION, importar_inventario, leer_filas
 from .permissions import EsAdministradorOCajero
+from .services import (
+    inventario_transferir,
+    inventarios_por_reabastecer,
+    stock_en_fecha,
+    stock_matriz,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +89,12 @@ class ProductoViewSet(viewsets.ModelViewSet):
 # -------------------------------
 # INVENTARIO
 # -------------------------------
+class InventarioPagination(KeysetPagination):
+    # Columnas locales del índice (sede, producto): ordenar por producto__nombre obligaba
+    # a recorrer el JOIN con Producto y ordenar en cada página
+    ordering = ('sede_id', 'producto_id')
+
+
 class InventarioViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar inventario.
@@ -76,6 +103,7 @@ class InventarioViewSet(viewsets.ModelViewSet):
     queryset = Inventario.objects.select_related('producto', 'sede').all().order_by('producto__nombre')
     serializer_class = InventarioSerializer
     permission_classes = [EsAdministradorOCajero]
+    pagination_class = InventarioPagination
 
     @action(detail=False, methods=['get'])
     def filtrar(self, request):
@@ -101,3 +129,187 @@ class InventarioViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(inventarios, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importación masiva de productos y stock por sede desde un archivo CSV o JSONL:
+        POST /api/inventario/inventario/importar/  (multipart: archivo, [formato], [simular])
+
+        El formato se toma del parámetro 'formato' o de la extensión del archivo.
+        Con simular=true se valida todo sin guardar. Devuelve los contadores de
+        productos e inventarios creados/actualizados y los errores por fila.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'Se requiere el archivo'}, status=status.HTTP_400_BAD_REQUEST)
+        formato = request.data.get('formato') or archivo.name.rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS_IMPORTACION:
+            return Response(
+                {'error': 'El formato debe ser "csv" o "jsonl"'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        simular = str(request.data.get('simular', '')).lower() in ('true', '1', 'si', 'sí')
+
+        lineas = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importar_inventario(leer_filas(lineas, formato), simular=simular)
+        except UnicodeDecodeError:
+            return Response(
+                {'error': 'El archivo debe estar codificado en UTF-8'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(resultado)
+
+    @action(detail=False, methods=['get'])
+    def matriz(self, request):
+        """
+        Stock por producto (filas) y sede (columnas) en formato columnar:
+        GET /api/inventario/inventario/matriz/?categoria=2&buscar=proteina&activo=true&sede=1&sede=3
+        """
+        try:
+            categoria = request.query_params.get('categoria')
+            sedes = [int(sede) for sede in request.query_params.getlist('sede')] or None
+            categoria = int(categoria) if categoria else None
+        except ValueError:
+            return Response(
+                {'error': 'Los parámetros categoria y sede deben ser enteros'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        activo = request.query_params.get('activo')
+        if activo is not None:
+            activo = activo.lower() not in ('false', '0', 'no')
+
+        return Response(stock_matriz(
+            categoria_id=categoria,
+            buscar=request.query_params.get('buscar') or None,
+            activo=activo,
+            sede_ids=sedes,
+        ))
+
+    @action(detail=False, methods=['get'])
+    def reabastecer(self, request):
+        """
+        Inventarios en o bajo su mínimo o su punto de reorden, con la cantidad sugerida:
+        GET /api/inventario/inventario/reabastecer/?sede=1&cobertura=14  (paginado por cursor)
+        """
+        try:
+            inventarios = _inventarios_por_reabastecer(request)
+        except ValueError:
+            return Response(
+                {'error': 'Los parámetros sede y cobertura deben ser enteros'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pagina = self.paginate_queryset(inventarios)
+        if pagina is not None:
+            return self.get_paginated_response(ReabastecimientoSerializer(pagina, many=True).data)
+        return Response(ReabastecimientoSerializer(inventarios, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='orden-compra')
+    def orden_compra(self, request):
+        """
+        Orden de compra sugerida en CSV (productos con cantidad sugerida mayor que cero):
+        GET /api/inventario/inventario/orden-compra/?sede=1&cobertura=14
+        """
+        try:
+            inventarios = _inventarios_por_reabastecer(request)
+        except ValueError:
+            return Response(
+                {'error': 'Los parámetros sede y cobertura deben ser enteros'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        inventarios = inventarios.filter(cantidad_sugerida__gt=0).order_by(
+            'sede__nombre', 'producto__categoria__nombre', 'producto__nombre'
+        )
+
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="orden_compra.csv"'
+        escritor = csv.writer(response)
+        escritor.writerow([
+            'sede', 'codigo', 'producto', 'categoria', 'cantidad_actual',
+            'umbral_reabastecimiento', 'demanda_diaria', 'cantidad_sugerida',
+        ])
+        for inventario in inventarios.iterator(chunk_size=1000):
+            escritor.writerow([
+                inventario.sede.nombre,
+                inventario.producto.codigo,
+                inventario.producto.nombre,
+                inventario.producto.categoria.nombre,
+                inventario.cantidad_actual,
+                max(inventario.cantidad_minima, inventario.punto_reorden),
+                inventario.demanda_diaria,
+                inventario.cantidad_sugerida,
+            ])
+        return response
+
+    @action(detail=False, methods=['post'])
+    def transferir(self, request):
+        """
+        Transfiere stock de varios productos entre dos sedes en una sola operación:
+        POST /api/inventario/inventario/transferir/
+        {"sede_origen": 1, "sede_destino": 2, "productos": [{"producto_id": 4, "cantidad": 10}], "nota": ""}
+        """
+        serializer = TransferenciaInventarioSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        try:
+            resultado = inventario_transferir(
+                sede_origen_id=datos['sede_origen'].pk,
+                sede_destino_id=datos['sede_destino'].pk,
+                productos=datos['productos'],
+                nota=datos['nota'],
+            )
+        except ValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'sede_origen': datos['sede_origen'].pk,
+            'sede_destino': datos['sede_destino'].pk,
+            'productos': [
+                {'producto_id': producto_id, 'stock_origen': origen, 'stock_destino': destino}
+                for producto_id, (origen, destino) in sorted(resultado.items())
+            ],
+        })
+
+    @action(detail=False, methods=['get'], url_path='stock-en-fecha')
+    def stock_en_fecha(self, request):
+        """
+        Stock de cada producto de una sede en un momento pasado, a partir del último
+        snapshot y el libro de movimientos:
+        /api/inventario/inventario/stock-en-fecha/?sede=1&fecha=2026-03-01T08:00:00&producto=4&producto=7
+        """
+        sede_id = request.query_params.get('sede')
+        fecha = request.query_params.get('fecha')
+        try:
+            sede_id = int(sede_id)
+            momento = parse_datetime(fecha) if fecha else None
+            producto_ids = [int(p) for p in request.query_params.getlist('producto')] or None
+        except (TypeError, ValueError):
+            momento = None
+        if momento is None:
+            return Response(
+                {'error': 'Parámetros requeridos: sede (entero) y fecha (ISO 8601)'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+
+        stock = stock_en_fecha(sede_id=sede_id, momento=momento, producto_ids=producto_ids)
+        return Response({
+            'sede': sede_id,
+            'fecha': momento,
+            'productos': [
+                {'producto_id': producto_id, 'cantidad': cantidad}
+                for producto_id, cantidad in sorted(stock.items())
+            ],
+        })
+
+
+def _inventarios_por_reabastecer(request):
+    """Lee ?sede= y ?cobertura= (días de demanda a cubrir); lanza ValueError si no son enteros."""
+    sede = request.query_params.get('sede')
+    cobertura = int(request.query_params.get('cobertura', 14))
+    return inventarios_por_reabastecer(
+        sede_id=int(sede) if sede else None,
+        dias_cobertura=max(cobertura, 0),
+    )
@@ -0,0 +1,42 @@
+"""
+Marca como vencidas las suscripciones activas cuya fecha_fin ya pasó (pensado para
+correr cada noche, después de la medianoche; es idempotente).
+
+Uso:
+    python manage.py vencer_suscripciones
+    python manage.py vencer_suscripciones --lote 5000
+
+Hace un UPDATE por lote (1000 suscripciones por defecto) e informa el avance tras cada
+uno. Lo corre cada hora el proceso reloj (clock.sh: proceso 'clock' del Procfile y
+servicio 'clock' de docker-compose); entrypoint.sh además lo corre al desplegar,
+después de las migraciones.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from membresias.services import VENCIMIENTO_LOTE, suscripciones_vencer
+
+
+class Command(BaseCommand):
+    help = "Marca como vencidas las suscripciones activas cuya fecha de fin ya pasó."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=VENCIMIENTO_LOTE,
+            help=f"Suscripciones por UPDATE (default: {VENCIMIENTO_LOTE}).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["lote"] <= 0:
+            raise CommandError("--lote debe ser positivo")
+        vencidas = suscripciones_vencer(
+            lote=options["lote"],
+            al_avanzar=lambda total: self.stdout.write(f"  Vencidas hasta ahora: {total}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Suscripciones vencidas: {vencidas}"))
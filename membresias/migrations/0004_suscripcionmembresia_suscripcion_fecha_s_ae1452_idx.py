@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_cliente_clientes_cl_fecha_r_0432db_idx'),
+        ('instalaciones', '0001_initial'),
+        ('membresias', '0003_membresia_espacios_incluidos_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='suscripcionmembresia',
+            index=models.Index(fields=['fecha_suscripcion', 'id'], name='suscripcion_fecha_s_ae1452_idx'),
+        ),
+    ]
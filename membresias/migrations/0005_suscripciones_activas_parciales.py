@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:19
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def vencer_atrasadas(apps, schema_editor):
+    """Pone al día las suscripciones ya vencidas, con la misma fecha (local) que
+    membresias.services.suscripciones_vencer, que se encarga de ahí en adelante."""
+    SuscripcionMembresia = apps.get_model('membresias', 'SuscripcionMembresia')
+    SuscripcionMembresia.objects.filter(
+        estado='activa', fecha_fin__lt=timezone.localdate()
+    ).update(estado='vencida')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membresias', '0004_suscripcionmembresia_suscripcion_fecha_s_ae1452_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='suscripcionmembresia',
+            index=models.Index(condition=models.Q(('estado', 'activa')), fields=['cliente', 'estado'], name='suscripcion_cliente_activa'),
+        ),
+        migrations.AddIndex(
+            model_name='suscripcionmembresia',
+            index=models.Index(condition=models.Q(('estado', 'activa')), fields=['estado', 'fecha_fin'], name='suscripcion_activa_fin'),
+        ),
+        migrations.RunPython(vencer_atrasadas, migrations.RunPython.noop),
+    ]
@@ -135,6 +135,20 @@ class SuscripcionMembresia(models.Model):
         verbose_name = 'Suscripción de Membresía'
         verbose_name_plural = 'Suscripciones de Membresías'
         ordering = ['-fecha_suscripcion']
+        indexes = [
+            models.Index(fields=['fecha_suscripcion', 'id']),
+            # Parciales: solo las activas, que son una fracción del historial
+            models.Index(
+                fields=['cliente', 'estado'],
+                condition=models.Q(estado='activa'),
+                name='suscripcion_cliente_activa',
+            ),
+            models.Index(
+                fields=['estado', 'fecha_fin'],
+                condition=models.Q(estado='activa'),
+                name='suscripcion_activa_fin',
+            ),
+        ]
 
     def __str__(self):
         sede_info = f" - {self.sede_suscripcion.nombre}" if self.sede_suscripcion else ""
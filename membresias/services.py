@@ -0,0 +1,225 @@
+"""
+Capa de servicios de membresías.
+
+- elegibilidad_cliente: suscripciones que dan acceso a un cliente en una fecha (en caché)
+- elegibilidad_clientes: lo mismo para muchos clientes con una lectura de caché y dos consultas
+- elegibilidad_acceso_sede: decide si esas suscripciones permiten entrar a una sede
+- elegibilidad_invalidar: borra de la caché la elegibilidad de uno o varios clientes
+- suscripciones_vencer: marca como vencidas, por lotes, las activas cuya fecha_fin ya pasó
+
+La caché por cliente guarda sus suscripciones activas que aún no terminan, con las sedes
+y espacios que cubren. Las señales de membresias.signals la invalidan al guardar o borrar
+una SuscripcionMembresia o al cambiar una Membresia; las vigencias se comparan con la
+fecha al leer, así que una suscripción deja de contar el día después de su fecha_fin
+aunque nadie la haya guardado. Quien cambie suscripciones con QuerySet.update() (que no
+emite señales) debe llamar a elegibilidad_invalidar.
+
+Las invalidaciones solo alcanzan a otros procesos si la caché es compartida
+(settings.CACHE_COMPARTIDA, con REDIS_URL). Con la LocMemCache de cada proceso las
+entradas duran ELEGIBILIDAD_TTL_LOCAL: un cambio hecho en un worker tarda a lo sumo
+eso en verse en los demás.
+
+El estado 'activa' pasa a 'vencida' con suscripciones_vencer, que el proceso reloj
+(clock.sh) corre cada hora con el comando vencer_suscripciones: una suscripción deja de
+estar 'activa' a más tardar una hora después de la medianoche en que termina, así que
+las consultas pueden filtrar por estado sin comparar también fecha_fin.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Membresia, SuscripcionMembresia
+
+# Con caché compartida las señales la mantienen al día y el TTL solo acota cambios
+# hechos sin ellas; con una caché por proceso el TTL corto acota lo que ven los demás.
+ELEGIBILIDAD_TTL = 60 * 60 * 24
+ELEGIBILIDAD_TTL_LOCAL = 60
+# Suscripciones por UPDATE al vencerlas: transacciones cortas que no bloquean mucho tiempo.
+VENCIMIENTO_LOTE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _clave_elegibilidad(cliente_id: int) -> str:
+    return f"membresias:elegibilidad:{cliente_id}"
+
+
+def _ttl_elegibilidad() -> int:
+    return ELEGIBILIDAD_TTL if settings.CACHE_COMPARTIDA else ELEGIBILIDAD_TTL_LOCAL
+
+
+def elegibilidad_invalidar(cliente_ids: Iterable[int]) -> None:
+    """Descarta la elegibilidad en caché de los clientes indicados."""
+    cache.delete_many([_clave_elegibilidad(cliente_id) for cliente_id in set(cliente_ids)])
+
+
+def _suscripciones_clientes(cliente_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+    suscripciones = list(
+        SuscripcionMembresia.objects.filter(
+            cliente_id__in=cliente_ids,
+            estado="activa",
+            fecha_fin__gte=timezone.localdate(),
+        )
+        .order_by("-fecha_inicio", "-id")
+        .values(
+            "id",
+            "cliente_id",
+            "fecha_inicio",
+            "fecha_fin",
+            "membresia_id",
+            "membresia__nombre_plan",
+            "membresia__tipo",
+            "membresia__permite_todas_sedes",
+            "sede_suscripcion_id",
+            "sede_suscripcion__nombre",
+        )
+    )
+
+    # Espacios incluidos: mismo criterio que SuscripcionMembresia.get_espacios_disponibles
+    por_membresia: dict[int, list[tuple[int, int]]] = {}
+    membresia_ids = {s["membresia_id"] for s in suscripciones if not s["membresia__permite_todas_sedes"]}
+    if membresia_ids:
+        incluidos = Membresia.espacios_incluidos.through.objects.filter(
+            membresia_id__in=membresia_ids
+        ).values_list("membresia_id", "espacio_id", "espacio__sede_id")
+        for membresia_id, espacio_id, sede_id in incluidos:
+            por_membresia.setdefault(membresia_id, []).append((espacio_id, sede_id))
+
+    resultado: dict[int, list[dict[str, Any]]] = {cliente_id: [] for cliente_id in cliente_ids}
+    for s in suscripciones:
+        todas = s["membresia__permite_todas_sedes"]
+        sede_id = s["sede_suscripcion_id"]
+        resultado[s["cliente_id"]].append({
+            "id": s["id"],
+            "fecha_inicio": s["fecha_inicio"],
+            "fecha_fin": s["fecha_fin"],
+            "membresia_id": s["membresia_id"],
+            "membresia_nombre": s["membresia__nombre_plan"],
+            "membresia_tipo": s["membresia__tipo"],
+            "permite_todas_sedes": todas,
+            "sede_id": sede_id,
+            "sede_nombre": s["sede_suscripcion__nombre"],
+            # None = todos los espacios (membresía multi-sede)
+            "espacio_ids": None if todas else sorted(
+                espacio_id
+                for espacio_id, espacio_sede_id in por_membresia.get(s["membresia_id"], [])
+                if sede_id is None or espacio_sede_id == sede_id
+            ),
+        })
+    return resultado
+
+
+def _vigentes(suscripciones: list[dict[str, Any]], fecha: date) -> list[dict[str, Any]]:
+    return [s for s in suscripciones if s["fecha_inicio"] <= fecha <= s["fecha_fin"]]
+
+
+def elegibilidad_cliente(*, cliente_id: int, fecha: date | None = None) -> list[dict[str, Any]]:
+    """Suscripciones activas del cliente vigentes en `fecha` (hoy por defecto).
+
+    Ordenadas de la más reciente a la más antigua. Cada una indica qué sedes y espacios
+    cubre: permite_todas_sedes, sede_id/sede_nombre y espacio_ids (None = todos).
+    Tras la primera llamada se sirve desde la caché sin consultar la base de datos.
+    """
+    clave = _clave_elegibilidad(cliente_id)
+    suscripciones = cache.get(clave)
+    if suscripciones is None:
+        suscripciones = _suscripciones_clientes([cliente_id])[cliente_id]
+        cache.set(clave, suscripciones, _ttl_elegibilidad())
+    return _vigentes(suscripciones, fecha or timezone.localdate())
+
+
+def elegibilidad_clientes(
+    cliente_ids: Iterable[int], *, fecha: date | None = None
+) -> dict[int, list[dict[str, Any]]]:
+    """elegibilidad_cliente para varios clientes: {cliente_id: suscripciones vigentes}.
+
+    Lee la caché con un solo get_many y resuelve todos los que falten con las mismas
+    dos consultas, sin importar cuántos sean.
+    """
+    claves = {cliente_id: _clave_elegibilidad(cliente_id) for cliente_id in set(cliente_ids)}
+    en_cache = cache.get_many(claves.values())
+    por_cliente = {
+        cliente_id: en_cache[clave] for cliente_id, clave in claves.items() if clave in en_cache
+    }
+    faltantes = [cliente_id for cliente_id in claves if cliente_id not in por_cliente]
+    if faltantes:
+        nuevos = _suscripciones_clientes(faltantes)
+        cache.set_many({claves[cliente_id]: nuevos[cliente_id] for cliente_id in faltantes}, _ttl_elegibilidad())
+        por_cliente.update(nuevos)
+
+    fecha = fecha or timezone.localdate()
+    return {cliente_id: _vigentes(suscripciones, fecha) for cliente_id, suscripciones in por_cliente.items()}
+
+
+def elegibilidad_acceso_sede(
+    suscripciones: list[dict[str, Any]], *, sede_id: int
+) -> tuple[dict[str, Any] | None, str | None]:
+    """Devuelve (suscripción que da acceso, motivo_denegado) para entrar a la sede.
+
+    `suscripciones` es el resultado de elegibilidad_cliente. Si ninguna cubre la sede,
+    la suscripción es None y el motivo describe la más reciente.
+    """
+    if not suscripciones:
+        return None, "No tiene membresía activa"
+    for suscripcion in suscripciones:
+        if suscripcion["permite_todas_sedes"] or suscripcion["sede_id"] == sede_id:
+            return suscripcion, None
+    sede_nombre = suscripciones[0]["sede_nombre"] or "sede específica"
+    return None, f"La membresía solo permite acceso a {sede_nombre}"
+
+
+# Usa el índice parcial (estado, fecha_fin) WHERE estado = 'activa'. SKIP LOCKED deja
+# para la siguiente pasada las filas que otra transacción esté editando, y permite que
+# varios procesos barran a la vez sin esperarse.
+_VENCER_SUSCRIPCIONES_SQL = f"""
+    UPDATE {SuscripcionMembresia._meta.db_table} SET estado = 'vencida'
+    WHERE id IN (
+        SELECT id FROM {SuscripcionMembresia._meta.db_table}
+        WHERE estado = 'activa' AND fecha_fin < %s
+        ORDER BY fecha_fin, id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING cliente_id
+"""
+
+
+def suscripciones_vencer(
+    *,
+    fecha: date | None = None,
+    lote: int = VENCIMIENTO_LOTE,
+    al_avanzar: Callable[[int], None] | None = None,
+) -> int:
+    """Marca como 'vencida' toda suscripción activa con fecha_fin anterior a `fecha`
+    (hoy por defecto). Devuelve cuántas venció.
+
+    Trabaja por lotes de `lote` filas, cada uno con un UPDATE en su propia transacción,
+    e invalida la elegibilidad en caché de los clientes afectados. Tras cada lote llama
+    a `al_avanzar(total_hasta_ahora)` y lo anota en el log.
+    """
+    if lote <= 0:
+        raise ValueError("El lote debe ser positivo")
+    fecha = fecha or timezone.localdate()
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(_VENCER_SUSCRIPCIONES_SQL, [fecha, lote])
+            cliente_ids = [fila[0] for fila in cursor.fetchall()]
+            if cliente_ids:
+                # Mismo criterio que membresias.signals: antes y después de confirmar
+                elegibilidad_invalidar(cliente_ids)
+                transaction.on_commit(lambda ids=cliente_ids: elegibilidad_invalidar(ids))
+        total += len(cliente_ids)
+        if cliente_ids:
+            logger.info("Suscripciones vencidas: %s", total)
+            if al_avanzar:
+                al_avanzar(total)
+        if len(cliente_ids) < lote:
+            return total
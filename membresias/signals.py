@@ -0,0 +1,56 @@
+"""
+Señales que mantienen al día la elegibilidad en caché de los clientes (ver
+membresias.services).
+
+Se invalida al momento y otra vez al confirmar la transacción: así una lectura
+concurrente que rellene la caché con datos previos al commit no queda vigente.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Membresia, SuscripcionMembresia
+from .services import elegibilidad_invalidar
+
+
+def _invalidar(cliente_ids: list[int]) -> None:
+    if not cliente_ids:
+        return
+    elegibilidad_invalidar(cliente_ids)
+    transaction.on_commit(lambda: elegibilidad_invalidar(cliente_ids))
+
+
+def _invalidar_membresia(membresia_id: int) -> None:
+    _invalidar(list(
+        SuscripcionMembresia.objects.filter(membresia_id=membresia_id, estado="activa")
+        .values_list("cliente_id", flat=True)
+    ))
+
+
+@receiver(post_save, sender=SuscripcionMembresia)
+@receiver(post_delete, sender=SuscripcionMembresia)
+def suscripcion_cambiada(sender, instance, **kwargs):
+    _invalidar([instance.cliente_id])
+
+
+@receiver(post_save, sender=Membresia)
+def membresia_guardada(sender, instance, created, **kwargs):
+    if created:
+        return
+    _invalidar_membresia(instance.pk)
+
+
+@receiver(m2m_changed, sender=Membresia.espacios_incluidos.through)
+def espacios_membresia_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _invalidar_membresia(instance.pk)
+        return
+    # espacio.membresias.add(...): instance es el Espacio y pk_set las membresías.
+    # En clear() pk_set llega vacío, así que se leen antes de borrar.
+    if action == "pre_clear":
+        pk_set = set(instance.membresias.values_list("pk", flat=True))
+    elif action not in ("post_add", "post_remove"):
+        return
+    for membresia_id in pk_set or ():
+        _invalidar_membresia(membresia_id)
@@ -15,6 +15,7 @@ from .serializers import (
     ClienteConMembresiaSerializer
 )
 from clientes.models import Cliente
+from gym.paginacion import KeysetPagination
 
 
 class MembresiaViewSet(viewsets.ModelViewSet):
@@ -192,6 +193,10 @@ class MembresiaViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+class SuscripcionMembresiaPagination(KeysetPagination):
+    ordering = ('-fecha_suscripcion',)
+
+
 class SuscripcionMembresiaViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar las suscripciones de membresías de los clientes.
@@ -199,6 +204,7 @@ class SuscripcionMembresiaViewSet(viewsets.ModelViewSet):
     """
     queryset = SuscripcionMembresia.objects.all()
     permission_classes = [IsAuthenticated]  # Cambiado: ahora los clientes también pueden crear
+    pagination_class = SuscripcionMembresiaPagination
 
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción"""
@@ -0,0 +1,191 @@
+"""
+Tests de la app clientes.
+
+Cubre:
+1. Columna de búsqueda: se calcula al crear el cliente y se mantiene al editar Persona/User
+2. clientes_buscar: acentos, nombre completo, prefijo de teléfono, email e ID
+3. clientes_buscar: orden por relevancia
+4. Endpoint de clientes con ?search= (también paginado, por relevancia) y validar_acceso
+   usando el índice
+"""
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clientes.models import Cliente
+from clientes.services import clientes_actualizar_busqueda, clientes_buscar, normalizar_busqueda
+from tests.factories import (
+    ClienteFactory,
+    PersonaFactory,
+    SedeFactory,
+    UserFactory,
+    make_admin_user,
+)
+
+
+def _auth_client(user):
+    client = APIClient()
+    refresh = RefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+    return client
+
+
+def _cliente(nombre, apellido_paterno, apellido_materno="", telefono="5550000000", email=None):
+    persona = PersonaFactory(
+        nombre=nombre,
+        apellido_paterno=apellido_paterno,
+        apellido_materno=apellido_materno,
+        telefono=telefono,
+    )
+    if email:
+        UserFactory(persona=persona, email=email)
+    return ClienteFactory(persona=persona)
+
+
+def _ids(termino, **kwargs):
+    return [c.pk for c in clientes_buscar(termino, **kwargs)]
+
+
+# =========================================================
+# 1. Mantenimiento de la columna de búsqueda
+# =========================================================
+
+class TestColumnaBusqueda:
+    def test_normalizar_quita_acentos_y_signos(self):
+        assert normalizar_busqueda("  Núñez-Peña, JOSÉ ") == ["nunez", "pena", "jose"]
+
+    def test_se_calcula_al_crear_el_cliente(self, db):
+        # Arrange / Act
+        cliente = _cliente("José", "Núñez", telefono="5512345678")
+        # Assert
+        cliente.refresh_from_db()
+        assert "'jose':1A" in cliente.busqueda
+        assert "'5512345678'" in cliente.busqueda
+
+    def test_editar_persona_y_email_actualiza_la_busqueda(self, db):
+        # Arrange
+        cliente = _cliente("Ana", "López", email="ana@test.com")
+        persona = cliente.persona
+        # Act
+        persona.apellido_paterno = "Martínez"
+        persona.save()
+        persona.usuario.email = "ana.martinez@gym.mx"
+        persona.usuario.save()
+        # Assert
+        assert _ids("martinez") == [cliente.pk]
+        assert _ids("lopez") == []
+        assert _ids("ana.martinez@gy") == [cliente.pk]
+
+    def test_recalculo_en_bloque(self, db):
+        cliente = _cliente("Luis", "Gómez")
+        Cliente.objects.filter(pk=cliente.pk).update(busqueda=None)
+        assert _ids("luis") == []
+        assert clientes_actualizar_busqueda() >= 1
+        assert _ids("luis") == [cliente.pk]
+
+
+# =========================================================
+# 2. Coincidencias
+# =========================================================
+
+class TestClientesBuscar:
+    def test_ignora_acentos_en_ambos_sentidos(self, db):
+        cliente = _cliente("María", "Peña")
+        assert _ids("maria pena") == [cliente.pk]
+        assert _ids("MARÍA") == [cliente.pk]
+
+    def test_nombre_completo_por_prefijos_en_cualquier_orden(self, db):
+        cliente = _cliente("Carlos", "Méndez", "Ortiz")
+        _cliente("Carla", "Ruiz")
+        assert _ids("carlos mend") == [cliente.pk]
+        assert _ids("ortiz carl") == [cliente.pk]
+
+    def test_prefijo_de_telefono_con_separadores(self, db):
+        cliente = _cliente("Pedro", "Soto", telefono="5598765432")
+        _cliente("Otro", "Soto", telefono="5511111111")
+        assert _ids("559876") == [cliente.pk]
+        assert _ids("55 9876-54") == [cliente.pk]
+
+    def test_telefono_guardado_con_separadores(self, db):
+        cliente = _cliente("Lucía", "Paz", telefono="55-123-456")
+        _cliente("Otra", "Paz", telefono="5511111111")
+        assert _ids("55123456") == [cliente.pk]
+        assert _ids("551234") == [cliente.pk]
+        assert _ids("(55) 123 45") == [cliente.pk]
+
+    def test_busqueda_por_id(self, db):
+        cliente = _cliente("Rosa", "Vega")
+        assert _ids(str(cliente.pk))[0] == cliente.pk
+
+    def test_sin_palabras_no_devuelve_nada(self, db):
+        _cliente("Rosa", "Vega")
+        assert _ids("@@ --") == []
+
+
+# =========================================================
+# 3. Relevancia
+# =========================================================
+
+class TestRelevancia:
+    def test_coincidencia_en_nombre_antes_que_en_email(self, db):
+        # Arrange: "sol" es nombre de uno y solo parte del email del otro
+        por_email = _cliente("Marta", "Díaz", email="sol.diaz@test.com")
+        por_nombre = _cliente("Sol", "Díaz")
+        # Act
+        ids = _ids("sol")
+        # Assert
+        assert ids == [por_nombre.pk, por_email.pk]
+
+
+# =========================================================
+# 4. Endpoints
+# =========================================================
+
+class TestEndpointsBusqueda:
+    def test_listado_de_clientes_filtra_con_search(self, db):
+        # Arrange
+        sede = SedeFactory()
+        cliente = _cliente("Íñigo", "Sánchez")
+        cliente.sede = sede
+        cliente.save()
+        _cliente("Pablo", "Torres")
+        user, _ = make_admin_user(email="busq1@test.com")
+        # Act
+        response = _auth_client(user).get("/api/clientes/", {"search": "inigo", "paginar": "false"})
+        # Assert
+        assert response.status_code == 200
+        assert [c["id"] for c in response.data] == [cliente.pk]
+
+    def test_search_paginado_conserva_el_orden_por_relevancia(self, db):
+        # Arrange: el más relevante es el más antiguo (el último por fecha_registro)
+        por_nombre = _cliente("Sol", "Díaz")
+        por_email = [_cliente("Marta", f"Díaz{i}", email=f"sol.{i}@test.com") for i in range(3)]
+        client = _auth_client(make_admin_user(email="busq3@test.com")[0])
+        esperado = _ids("sol")
+        # Act
+        vistos = []
+        url = "/api/clientes/?search=sol&page_size=1"
+        while url:
+            datos = client.get(url).json()
+            vistos.extend(c["id"] for c in datos["results"])
+            url = datos["next"]
+        # Assert
+        assert vistos[0] == por_nombre.pk
+        assert sorted(vistos[1:]) == sorted(c.pk for c in por_email)
+        assert vistos == esperado
+
+    def test_validar_acceso_encuentra_por_nombre_completo_sin_acentos(self, db):
+        # Arrange
+        sede = SedeFactory()
+        cliente = _cliente("Raúl", "Jiménez", "Cruz")
+        _cliente("Raúl", "Pérez")
+        user, _ = make_admin_user(email="busq2@test.com")
+        # Act
+        response = _auth_client(user).post(
+            "/api/accesos/registros/validar_acceso/",
+            {"search_term": "raul jimenez", "sede_id": sede.id},
+            format="json",
+        )
+        # Assert
+        assert response.status_code == 200
+        assert response.data["multiple"] is False
+        assert response.data["cliente"]["cliente_id"] == cliente.pk
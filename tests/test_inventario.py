@@ -9,18 +9,45 @@ Cubre:
 5. Inventario.porcentaje_disponibilidad
 6. Inventario.estado_stock — los 5 estados posibles
 7. unique_together (producto, sede) — no puede haber duplicados
-8. Producto.save() genera código automáticamente si está vacío
+8. Producto.save() genera código EAN-13 único automáticamente si está vacío
+9. Editar un producto sube la versión del catálogo POS de sus sedes
+10. Libro de movimientos — ventas, cancelaciones y ajustes; stock en una fecha pasada
+11. Importación masiva — upsert de productos e inventario con reporte de errores por fila
+12. Transferencias entre sedes — atómicas, con consultas constantes y libro de movimientos
+13. Punto de reorden — cálculo desde el resumen de ventas, lista de reabastecimiento y orden de compra
+14. Matriz de stock producto × sede — una consulta, formato columnar y filtros
+15. Listado de inventario paginado por cursor sobre (sede, producto)
 """
 import decimal
+from datetime import date, timedelta
+
 import pytest
+from django.core.exceptions import ValidationError
 from django.db import IntegrityError
-
-from inventario.models import Producto, Inventario
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventario.models import Producto, Inventario, MovimientoInventario
+from inventario.importacion import importar_inventario, leer_filas
+from inventario.services import (
+    catalogo_version,
+    inventario_guardar,
+    inventario_transferir,
+    inventarios_por_reabastecer,
+    puntos_reorden_calcular,
+    snapshot_inventario_crear,
+    stock_en_fecha,
+    stock_matriz,
+)
+from ventas.models import ResumenVentaProductoDiario
+from ventas.services import venta_producto_cancelar, venta_producto_crear
 from tests.factories import (
     SedeFactory,
     ProductoFactory,
     InventarioFactory,
     CategoriaProductoFactory,
+    UserFactory,
+    make_admin_user,
 )
 
 
@@ -176,6 +203,28 @@ class TestProductoGeneraCodigo:
         )
         assert producto.codigo.isdigit()
 
+    def test_codigos_generados_son_ean13_distintos(self, db):
+        # Arrange
+        cat = CategoriaProductoFactory()
+        # Act
+        codigos = [
+            Producto.objects.create(
+                nombre=f"Producto {i}", categoria=cat, precio_unitario=decimal.Decimal("1.00")
+            ).codigo
+            for i in range(3)
+        ]
+        # Assert
+        assert len(set(codigos)) == 3
+        for codigo in codigos:
+            assert len(codigo) == 13 and codigo.startswith("2")
+            suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(codigo[:12]))
+            assert int(codigo[12]) == (10 - suma % 10) % 10
+
+    def test_codigo_duplicado_viola_indice_unico(self, db):
+        ProductoFactory(codigo="DUP-001")
+        with pytest.raises(IntegrityError):
+            ProductoFactory(codigo="DUP-001")
+
     def test_codigo_explicito_se_respeta(self, db):
         cat = CategoriaProductoFactory()
         producto = Producto.objects.create(
@@ -185,3 +234,366 @@ class TestProductoGeneraCodigo:
             codigo="PROT-001",
         )
         assert producto.codigo == "PROT-001"
+
+
+# =========================================================
+# 9. Versión del catálogo POS por sede
+# =========================================================
+
+class TestVersionCatalogoSede:
+    def test_editar_producto_marca_su_inventario_en_cada_sede(self, db):
+        # Arrange
+        producto = ProductoFactory()
+        sede_a = SedeFactory()
+        sede_b = SedeFactory()
+        InventarioFactory(producto=producto, sede=sede_a)
+        InventarioFactory(producto=producto, sede=sede_b)
+        version_a, _ = catalogo_version(sede_id=sede_a.id)
+        # Act
+        producto.precio_unitario = decimal.Decimal("999.00")
+        producto.save()
+        # Assert
+        nueva_version_a, _ = catalogo_version(sede_id=sede_a.id)
+        assert nueva_version_a == version_a + 1
+        inventario_a = Inventario.objects.get(producto=producto, sede=sede_a)
+        assert inventario_a.version_catalogo == nueva_version_a
+        assert catalogo_version(sede_id=sede_b.id)[0] > 0
+
+
+# =========================================================
+# 10. Libro de movimientos y snapshots
+# =========================================================
+
+class TestLibroMovimientosInventario:
+    def _vender(self, inventario, cantidad):
+        return venta_producto_crear(
+            empleado=UserFactory(),
+            sede_id=inventario.sede_id,
+            metodo_pago="efectivo",
+            productos=[{"producto_id": inventario.producto_id, "cantidad": cantidad}],
+        )
+
+    def test_venta_y_cancelacion_registran_movimientos(self, db):
+        # Arrange
+        inventario = InventarioFactory(cantidad_actual=20)
+        # Act
+        venta = self._vender(inventario, 3)
+        venta_producto_cancelar(venta=venta)
+        # Assert
+        movimientos = MovimientoInventario.objects.filter(venta=venta).order_by("movimiento_id")
+        assert [(m.tipo, m.cantidad) for m in movimientos] == [("venta", -3), ("cancelacion", 3)]
+        assert movimientos[0].sede_id == inventario.sede_id
+
+    def test_ajuste_manual_registra_el_delta(self, db):
+        inventario = InventarioFactory(cantidad_actual=10)
+        inventario.cantidad_actual = 25
+        inventario_guardar(inventario, nota="Conteo físico")
+        movimiento = MovimientoInventario.objects.get(tipo="ajuste", producto=inventario.producto)
+        assert movimiento.cantidad == 15
+        assert movimiento.nota == "Conteo físico"
+
+    def test_stock_en_fecha_parte_del_snapshot_y_suma_movimientos(self, db):
+        # Arrange
+        inventario = InventarioFactory(cantidad_actual=20)
+        snapshot_inventario_crear(sede_ids=[inventario.sede_id])
+        self._vender(inventario, 5)
+        despues_primera = timezone.now()
+        self._vender(inventario, 4)
+        # Act
+        antes = stock_en_fecha(
+            sede_id=inventario.sede_id, momento=despues_primera - timedelta(days=1)
+        )
+        intermedio = stock_en_fecha(sede_id=inventario.sede_id, momento=despues_primera)
+        actual = stock_en_fecha(sede_id=inventario.sede_id, momento=timezone.now())
+        # Assert
+        assert antes[inventario.producto_id] == 0
+        assert intermedio[inventario.producto_id] == 15
+        assert actual[inventario.producto_id] == 11
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 11
+
+    def test_stock_en_fecha_filtra_productos(self, db):
+        inventario = InventarioFactory(cantidad_actual=8)
+        otro = InventarioFactory(sede=inventario.sede, cantidad_actual=3)
+        snapshot_inventario_crear(sede_ids=[inventario.sede_id])
+        stock = stock_en_fecha(
+            sede_id=inventario.sede_id,
+            momento=timezone.now(),
+            producto_ids=[otro.producto_id],
+        )
+        assert stock == {otro.producto_id: 3}
+
+
+# =========================================================
+# 11. Importación masiva de productos e inventario
+# =========================================================
+
+class TestImportarInventario:
+    def test_crea_productos_e_inventarios_desde_csv(self, db):
+        # Arrange
+        sede_a = SedeFactory()
+        sede_b = SedeFactory()
+        lineas = [
+            "codigo,nombre,categoria,precio_unitario,sede,cantidad_actual\n",
+            f"IMP-1,Barra,Snacks,25.50,{sede_a.id},10\n",
+            f"IMP-1,,,,{sede_b.id},4\n",
+            f",Agua,Bebidas,12,{sede_a.id},30\n",
+        ]
+        # Act
+        resultado = importar_inventario(leer_filas(lineas, "csv"))
+        # Assert
+        assert resultado["errores"] == []
+        assert resultado["productos_creados"] == 2
+        assert resultado["inventarios_creados"] == 3
+        barra = Producto.objects.get(codigo="IMP-1")
+        assert barra.precio_unitario == decimal.Decimal("25.50")
+        assert barra.categoria.nombre == "Snacks"
+        assert barra.get_stock_por_sede(sede_b) == 4
+        agua = Producto.objects.get(nombre="Agua")
+        assert len(agua.codigo) == 13
+
+    def test_actualiza_existentes_conservando_campos_omitidos(self, db):
+        # Arrange
+        inventario = InventarioFactory(cantidad_actual=10, cantidad_minima=7)
+        producto = inventario.producto
+        filas = [{"codigo": producto.codigo, "sede": inventario.sede_id, "cantidad_actual": 25}]
+        # Act
+        resultado = importar_inventario(filas)
+        # Assert
+        assert resultado["inventarios_actualizados"] == 1
+        assert resultado["productos_actualizados"] == 0
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 25
+        assert inventario.cantidad_minima == 7
+        movimiento = MovimientoInventario.objects.get(producto=producto, tipo="ajuste")
+        assert movimiento.cantidad == 15
+
+    def test_reporta_errores_por_fila_e_importa_el_resto(self, db):
+        sede = SedeFactory()
+        filas = [
+            {"codigo": "OK-1", "nombre": "Guantes", "categoria": "Accesorios", "precio_unitario": "80", "sede": sede.id},
+            {"codigo": "MAL-1", "nombre": "Sin precio", "categoria": "Accesorios"},
+            {"codigo": "MAL-2", "nombre": "Negativo", "categoria": "Accesorios", "precio_unitario": "5",
+             "sede": sede.id, "cantidad_actual": -3},
+        ]
+        resultado = importar_inventario(filas)
+        assert [error["fila"] for error in resultado["errores"]] == [2, 3]
+        assert "cantidad_actual" in resultado["errores"][1]["errores"]
+        assert Producto.objects.filter(codigo__in=["OK-1", "MAL-1", "MAL-2"]).count() == 1
+
+    def test_simular_no_guarda_cambios(self, db):
+        sede = SedeFactory()
+        filas = [{"nombre": "Toalla", "categoria": "Accesorios", "precio_unitario": "40", "sede": sede.id}]
+        resultado = importar_inventario(filas, simular=True)
+        assert resultado["productos_creados"] == 1
+        assert not Producto.objects.filter(nombre="Toalla").exists()
+
+
+# =========================================================
+# 12. Transferencias entre sedes
+# =========================================================
+
+class TestTransferirInventario:
+    def test_mueve_stock_y_crea_inventario_en_destino(self, db):
+        # Arrange
+        origen = InventarioFactory(cantidad_actual=20, cantidad_minima=4)
+        sede_destino = SedeFactory()
+        producto = origen.producto
+        # Act
+        resultado = inventario_transferir(
+            sede_origen_id=origen.sede_id,
+            sede_destino_id=sede_destino.id,
+            productos=[{"producto_id": producto.pk, "cantidad": 6}],
+        )
+        # Assert
+        assert resultado == {producto.pk: (14, 6)}
+        destino = Inventario.objects.get(producto=producto, sede=sede_destino)
+        assert destino.cantidad_actual == 6
+        assert destino.cantidad_minima == 4
+        movimientos = MovimientoInventario.objects.filter(tipo="transferencia", producto=producto)
+        assert sorted(m.cantidad for m in movimientos) == [-6, 6]
+
+    def test_stock_insuficiente_no_modifica_nada(self, db):
+        origen = InventarioFactory(cantidad_actual=5)
+        otro = InventarioFactory(sede=origen.sede, cantidad_actual=50)
+        destino = InventarioFactory(producto=origen.producto, cantidad_actual=1)
+        with pytest.raises(ValidationError):
+            inventario_transferir(
+                sede_origen_id=origen.sede_id,
+                sede_destino_id=destino.sede_id,
+                productos=[
+                    {"producto_id": otro.producto_id, "cantidad": 10},
+                    {"producto_id": origen.producto_id, "cantidad": 6},
+                ],
+            )
+        origen.refresh_from_db()
+        otro.refresh_from_db()
+        assert (origen.cantidad_actual, otro.cantidad_actual) == (5, 50)
+        assert not Inventario.objects.filter(producto=otro.producto, sede=destino.sede).exists()
+
+    def test_numero_de_consultas_no_depende_de_las_lineas(self, db, django_assert_max_num_queries):
+        sede_origen = SedeFactory()
+        sede_destino = SedeFactory()
+        inventarios = [InventarioFactory(sede=sede_origen, cantidad_actual=10) for _ in range(30)]
+        with django_assert_max_num_queries(12):
+            inventario_transferir(
+                sede_origen_id=sede_origen.id,
+                sede_destino_id=sede_destino.id,
+                productos=[{"producto_id": inv.producto_id, "cantidad": 2} for inv in inventarios],
+            )
+        assert Inventario.objects.filter(sede=sede_destino, cantidad_actual=2).count() == 30
+
+    def test_endpoint_transferir(self, db):
+        origen = InventarioFactory(cantidad_actual=8)
+        sede_destino = SedeFactory()
+        admin, _ = make_admin_user()
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(
+            "/api/inventario/inventario/transferir/",
+            {
+                "sede_origen": origen.sede_id,
+                "sede_destino": sede_destino.id,
+                "productos": [{"producto_id": origen.producto_id, "cantidad": 9}],
+            },
+            format="json",
+        )
+        assert response.status_code == 400
+        assert "Stock insuficiente" in response.data["error"]
+
+
+# =========================================================
+# 13. Punto de reorden y reabastecimiento
+# =========================================================
+
+class TestPuntoReorden:
+    def _ventas_diarias(self, inventario, unidades_por_dia, hasta):
+        ResumenVentaProductoDiario.objects.bulk_create([
+            ResumenVentaProductoDiario(
+                sede_id=inventario.sede_id,
+                producto_id=inventario.producto_id,
+                fecha=hasta - timedelta(days=i),
+                unidades=unidades,
+            )
+            for i, unidades in enumerate(unidades_por_dia)
+        ])
+
+    def test_calcula_demanda_y_punto_de_reorden(self, db):
+        # Arrange: 4 unidades diarias constantes durante 28 días (desviación cero)
+        hasta = date(2026, 3, 31)
+        inventario = InventarioFactory(cantidad_actual=50, cantidad_minima=5)
+        sin_ventas = InventarioFactory(sede=inventario.sede, cantidad_actual=50, cantidad_minima=5)
+        self._ventas_diarias(inventario, [4] * 28, hasta)
+        # Act
+        actualizados = puntos_reorden_calcular(dias=28, plazo_entrega=7, hasta=hasta)
+        # Assert
+        assert actualizados == 2
+        inventario.refresh_from_db()
+        sin_ventas.refresh_from_db()
+        assert inventario.demanda_diaria == decimal.Decimal("4.000")
+        assert inventario.punto_reorden == 28
+        assert (sin_ventas.demanda_diaria, sin_ventas.punto_reorden) == (0, 0)
+
+    def test_variabilidad_sube_el_stock_de_seguridad(self, db):
+        hasta = date(2026, 3, 31)
+        estable = InventarioFactory()
+        variable = InventarioFactory(sede=estable.sede)
+        self._ventas_diarias(estable, [2] * 14, hasta)
+        self._ventas_diarias(variable, [0, 4] * 7, hasta)
+        puntos_reorden_calcular(dias=14, plazo_entrega=7, hasta=hasta)
+        estable.refresh_from_db()
+        variable.refresh_from_db()
+        assert estable.demanda_diaria == variable.demanda_diaria
+        assert variable.punto_reorden > estable.punto_reorden
+
+    def test_lista_de_reabastecimiento_y_cantidad_sugerida(self, db):
+        sede = SedeFactory()
+        bajo_reorden = InventarioFactory(
+            sede=sede, cantidad_actual=20, cantidad_minima=5, cantidad_maxima=100,
+            punto_reorden=28, demanda_diaria=decimal.Decimal("4"),
+        )
+        InventarioFactory(sede=sede, cantidad_actual=40, cantidad_minima=5, punto_reorden=28)
+        bajo_minimo = InventarioFactory(sede=sede, cantidad_actual=3, cantidad_minima=5)
+        inventarios = {inv.pk: inv for inv in inventarios_por_reabastecer(sede_id=sede.id, dias_cobertura=14)}
+        assert set(inventarios) == {bajo_reorden.pk, bajo_minimo.pk}
+        # min(100, 28 + 4*14) - 20
+        assert inventarios[bajo_reorden.pk].cantidad_sugerida == 64
+        assert inventarios[bajo_minimo.pk].cantidad_sugerida == 2
+        assert bajo_reorden.requiere_reabastecimiento
+
+    def test_endpoint_orden_compra_csv(self, db):
+        inventario = InventarioFactory(cantidad_actual=1, cantidad_minima=5)
+        InventarioFactory(sede=inventario.sede, cantidad_actual=80, cantidad_minima=5)
+        admin, _ = make_admin_user()
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get(
+            "/api/inventario/inventario/orden-compra/", {"sede": inventario.sede_id}
+        )
+        assert response.status_code == 200
+        lineas = response.content.decode().strip().splitlines()
+        assert len(lineas) == 2
+        assert inventario.producto.codigo in lineas[1]
+
+
+# =========================================================
+# 14. Matriz de stock producto × sede
+# =========================================================
+
+class TestStockMatriz:
+    def test_matriz_columnar_con_huecos_sin_inventario(self, db):
+        # Arrange
+        sede_a = SedeFactory()
+        sede_b = SedeFactory()
+        producto_1 = ProductoFactory(nombre="AAA Proteína")
+        producto_2 = ProductoFactory(nombre="BBB Creatina")
+        InventarioFactory(producto=producto_1, sede=sede_a, cantidad_actual=7)
+        InventarioFactory(producto=producto_1, sede=sede_b, cantidad_actual=3)
+        InventarioFactory(producto=producto_2, sede=sede_b, cantidad_actual=9)
+        # Act
+        matriz = stock_matriz(sede_ids=[sede_a.id, sede_b.id])
+        # Assert
+        assert matriz["sedes"]["id"] == sorted([sede_a.id, sede_b.id])
+        assert matriz["productos"]["id"] == [producto_1.pk, producto_2.pk]
+        assert matriz["stock"] == [[7, 3], [None, 9]]
+        assert matriz["total"] == [10, 9]
+
+    def test_filtros_y_una_sola_consulta_agrupada(self, db, django_assert_num_queries):
+        sede = SedeFactory()
+        categoria = CategoriaProductoFactory()
+        buscado = ProductoFactory(nombre="Barra proteica", categoria=categoria)
+        ProductoFactory(nombre="Barra de cereal")
+        for producto in Producto.objects.all():
+            InventarioFactory(producto=producto, sede=sede)
+        with django_assert_num_queries(2):  # sedes + matriz
+            matriz = stock_matriz(categoria_id=categoria.pk, buscar="barra", sede_ids=[sede.id])
+        assert matriz["productos"]["id"] == [buscado.pk]
+
+
+# =========================================================
+# 15. Listado paginado de inventario
+# =========================================================
+
+class TestInventarioPaginado:
+    def test_paginas_recorren_sede_y_producto_sin_repetir(self, db):
+        # Arrange
+        sedes = [SedeFactory(), SedeFactory()]
+        for nombre in ("Zinc", "Avena", "Magnesio"):
+            producto = ProductoFactory(nombre=nombre)
+            for sede in sedes:
+                InventarioFactory(producto=producto, sede=sede)
+        admin, _ = make_admin_user()
+        client = APIClient()
+        client.force_authenticate(admin)
+        # Act
+        vistos = []
+        url = "/api/inventario/inventario/?page_size=4"
+        while url:
+            datos = client.get(url).json()
+            vistos.extend((fila["sede"], fila["producto"]["producto_id"]) for fila in datos["results"])
+            url = datos["next"]
+        # Assert
+        esperados = list(
+            Inventario.objects.order_by("sede_id", "producto_id").values_list("sede_id", "producto_id")
+        )
+        assert vistos == esperados
@@ -11,6 +11,8 @@ Cubre:
 7. Crear suscripción con datos válidos
 8. BUG CONOCIDO: precio_pagado manipulable por el cliente (xfail)
 9. BUG CONOCIDO: procesar_pago es simulación con random (xfail)
+10. Elegibilidad en caché (membresias.services) e invalidación por señales
+11. Barrido de vencimientos: suscripciones_vencer y comando vencer_suscripciones
 """
 import decimal
 import pytest
@@ -457,7 +459,7 @@ def test_procesar_pago_siempre_cobra_precio_correcto(db):
     Este test verifica que después de llamar procesar_pago, existe un registro
     de pago con el monto correcto. Actualmente eso NO ocurre → xfail.
     """
-    from tests.factories import MembresiaFactory, SedeFactory, make_admin_user
+    from tests.factories import MembresiaFactory, SedeFactory
     import decimal
     sede = SedeFactory()
     membresia = MembresiaFactory(sede=sede, precio=decimal.Decimal("500.00"))
@@ -478,3 +480,166 @@ def test_procesar_pago_siempre_cobra_precio_correcto(db):
             "procesar_pago reportó éxito pero no creó ningún registro de Pago en BD. "
             "Es una simulación con random, no un procesamiento real."
         )
+
+
+# =========================================================
+# 10. Elegibilidad en caché e invalidación por señales
+# =========================================================
+
+@pytest.fixture
+def cache_limpia():
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.usefixtures("cache_limpia")
+class TestElegibilidadCliente:
+    def test_devuelve_sedes_y_espacios_de_la_suscripcion_vigente(self, db):
+        from membresias.services import elegibilidad_cliente
+
+        # Arrange
+        sede = SedeFactory()
+        incluido = EspacioFactory(sede=sede)
+        EspacioFactory(sede=sede)  # no incluido
+        membresia = MembresiaFactory(sede=sede)
+        membresia.espacios_incluidos.add(incluido, EspacioFactory())  # el de otra sede no cuenta
+        sus = SuscripcionMembresiaFactory(membresia=membresia, sede_suscripcion=sede)
+        # Act
+        vigentes = elegibilidad_cliente(cliente_id=sus.cliente_id)
+        # Assert
+        assert [v["id"] for v in vigentes] == [sus.id]
+        assert vigentes[0]["sede_id"] == sede.id
+        assert vigentes[0]["espacio_ids"] == [incluido.id]
+
+    def test_segunda_consulta_no_toca_la_base_de_datos(self, db, django_assert_num_queries):
+        from membresias.services import elegibilidad_cliente
+
+        sus = SuscripcionMembresiaFactory(membresia=MembresiaMultiSedeFactory())
+        elegibilidad_cliente(cliente_id=sus.cliente_id)
+        with django_assert_num_queries(0):
+            vigentes = elegibilidad_cliente(cliente_id=sus.cliente_id)
+        assert vigentes[0]["espacio_ids"] is None
+
+    def test_vigencia_se_evalua_al_leer(self, db):
+        from membresias.services import elegibilidad_cliente
+
+        hoy = timezone.now().date()
+        sus = SuscripcionMembresiaFactory(fecha_inicio=hoy, fecha_fin=hoy + timedelta(days=2))
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)
+        # Misma entrada en caché, consultada en fechas fuera de la vigencia
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id, fecha=hoy + timedelta(days=3)) == []
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id, fecha=hoy - timedelta(days=1)) == []
+
+    def test_ttl_corto_sin_cache_compartida(self, settings):
+        from membresias.services import ELEGIBILIDAD_TTL, ELEGIBILIDAD_TTL_LOCAL, _ttl_elegibilidad
+
+        # Con LocMemCache las señales solo limpian el proceso que hizo el cambio
+        settings.CACHE_COMPARTIDA = False
+        assert _ttl_elegibilidad() == ELEGIBILIDAD_TTL_LOCAL
+        settings.CACHE_COMPARTIDA = True
+        assert _ttl_elegibilidad() == ELEGIBILIDAD_TTL
+
+    def test_cancelar_suscripcion_invalida_la_cache(self, db):
+        from membresias.services import elegibilidad_cliente
+
+        sus = SuscripcionMembresiaFactory()
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)
+        # Act
+        sus.estado = "cancelada"
+        sus.save()
+        # Assert
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id) == []
+
+    def test_cambios_en_la_membresia_invalidan_la_cache(self, db):
+        from membresias.services import elegibilidad_cliente
+
+        sede = SedeFactory()
+        membresia = MembresiaFactory(sede=sede)
+        sus = SuscripcionMembresiaFactory(membresia=membresia, sede_suscripcion=sede)
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)[0]["espacio_ids"] == []
+        # Act: se añade un espacio y el plan pasa a multi-sede
+        espacio = EspacioFactory(sede=sede)
+        membresia.espacios_incluidos.add(espacio)
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)[0]["espacio_ids"] == [espacio.id]
+        membresia.permite_todas_sedes = True
+        membresia.save()
+        # Assert
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)[0]["permite_todas_sedes"] is True
+
+
+# =========================================================
+# 11. Barrido de vencimientos
+# =========================================================
+
+def _suscripcion_atrasada(dias, **kwargs):
+    """Activa con fecha_fin pasada, como las deja save() antes de vencer (sin volver a guardarla)."""
+    sus = SuscripcionMembresiaFactory(**kwargs)
+    SuscripcionMembresia.objects.filter(pk=sus.pk).update(
+        fecha_fin=timezone.now().date() - timedelta(days=dias)
+    )
+    return sus
+
+
+@pytest.mark.usefixtures("cache_limpia")
+class TestVencerSuscripciones:
+    def test_vence_solo_las_activas_atrasadas_por_lotes(self, db):
+        from membresias.services import suscripciones_vencer
+
+        # Arrange
+        atrasadas = [_suscripcion_atrasada(dias) for dias in (1, 2, 30, 400, 5)]
+        vigente = SuscripcionMembresiaFactory()
+        termina_hoy = SuscripcionMembresiaFactory(fecha_fin=timezone.now().date())
+        cancelada = _suscripcion_atrasada(3, estado="cancelada")
+        avances = []
+        # Act
+        vencidas = suscripciones_vencer(lote=2, al_avanzar=avances.append)
+        # Assert
+        assert vencidas == 5
+        assert avances == [2, 4, 5]
+        assert set(
+            SuscripcionMembresia.objects.filter(estado="vencida").values_list("pk", flat=True)
+        ) == {s.pk for s in atrasadas}
+        for sus, estado in ((vigente, "activa"), (termina_hoy, "activa"), (cancelada, "cancelada")):
+            sus.refresh_from_db()
+            assert sus.estado == estado
+        assert suscripciones_vencer() == 0
+
+    def test_invalida_la_elegibilidad_en_cache(self, db):
+        from django.core.cache import cache
+        from membresias.services import _clave_elegibilidad, elegibilidad_cliente, suscripciones_vencer
+
+        # Arrange: caché rellenada con la suscripción de un día cualquiera de su vigencia
+        sus = SuscripcionMembresiaFactory()
+        ayer = timezone.now().date() - timedelta(days=1)
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id)
+        # Act: la vigencia termina (sin señales) y se barre
+        SuscripcionMembresia.objects.filter(pk=sus.pk).update(fecha_fin=ayer)
+        suscripciones_vencer()
+        # Assert
+        assert cache.get(_clave_elegibilidad(sus.cliente_id)) is None
+        assert elegibilidad_cliente(cliente_id=sus.cliente_id, fecha=ayer) == []
+
+    def test_lote_invalido(self, db):
+        from membresias.services import suscripciones_vencer
+
+        with pytest.raises(ValueError):
+            suscripciones_vencer(lote=0)
+
+    def test_comando_informa_el_avance(self, db):
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+
+        # Arrange
+        for dias in (1, 2, 3):
+            _suscripcion_atrasada(dias)
+        salida = StringIO()
+        # Act
+        call_command("vencer_suscripciones", "--lote", "2", stdout=salida)
+        # Assert
+        assert "Vencidas hasta ahora: 2" in salida.getvalue()
+        assert "Suscripciones vencidas: 3" in salida.getvalue()
+        assert not SuscripcionMembresia.objects.filter(estado="activa").exists()
+        with pytest.raises(CommandError):
+            call_command("vencer_suscripciones", "--lote", "0")
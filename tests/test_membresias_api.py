@@ -234,5 +234,6 @@ class TestSuscripcionCRUD:
         client = _auth_client(user)
         response = client.get("/api/suscripciones/?estado=activa")
         assert response.status_code == 200
-        for item in response.data:
+        assert response.data["results"]
+        for item in response.data["results"]:
             assert item["estado"] == "activa"
@@ -11,14 +11,26 @@ Cubre:
 7. Cancelar una venta ya cancelada devuelve 400
 8. DetalleVentaProducto.calcular_totales() calcula correctamente con descuento
 9. VentaProducto.calcular_totales() suma detalles y aplica descuento global
+10. Reintentos con Idempotency-Key no duplican la venta ni el descuento de stock
+11. Sincronización de ventas offline devuelve un resultado NDJSON por venta y rechaza
+    fechas de venta futuras o demasiado antiguas
+12. Estadísticas de ventas se leen del resumen diario por sede
+13. Catálogo POS versionado: ETag/304 y delta desde una versión
+14. Escaneo por código de barras exacto, sin servir stock desactualizado desde la caché
+15. Exportación en streaming (CSV y JSONL) con los filtros del listado
+16. Listado paginado por cursor (keyset), con opción de desactivar la paginación
 """
 import decimal
+import json
+from datetime import timedelta
+
 import pytest
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from ventas.models import VentaProducto, DetalleVentaProducto
+from ventas.models import ClaveIdempotencia, VentaProducto, DetalleVentaProducto
 from inventario.models import Inventario
 from tests.factories import (
     SedeFactory,
@@ -252,6 +264,389 @@ class TestCrearVentaAPI:
         assert response.status_code == 201
 
 
+# =========================================================
+# 10. API crear_venta — Idempotency-Key
+# =========================================================
+
+class TestCrearVentaIdempotenciaAPI:
+    URL = "/api/ventas/ventas-productos/crear_venta/"
+
+    def _setup(self, email):
+        sede = SedeFactory()
+        producto = ProductoFactory(precio_unitario=decimal.Decimal("100.00"))
+        inventario = InventarioFactory(producto=producto, sede=sede, cantidad_actual=10)
+        user, _ = make_admin_user(email=email)
+        payload = {
+            "sede_id": sede.id,
+            "metodo_pago": "efectivo",
+            "productos": [{"producto_id": producto.producto_id, "cantidad": 3, "descuento": 0}],
+        }
+        return _auth_client(user), payload, inventario
+
+    def test_reintento_devuelve_la_misma_venta_sin_descontar_stock(self, db):
+        # Arrange
+        client, payload, inventario = self._setup("idem1@test.com")
+        # Act
+        primera = client.post(self.URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="pos-1-0001")
+        reintento = client.post(self.URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="pos-1-0001")
+        # Assert
+        assert primera.status_code == 201
+        assert reintento.status_code == 201
+        assert reintento["Idempotent-Replayed"] == "true"
+        assert reintento.json()["venta"]["venta_id"] == primera.json()["venta"]["venta_id"]
+        assert VentaProducto.objects.count() == 1
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 7  # descontado una sola vez
+
+    def test_clave_reutilizada_con_otro_cuerpo_devuelve_422(self, db):
+        # Arrange
+        client, payload, inventario = self._setup("idem2@test.com")
+        client.post(self.URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="pos-1-0002")
+        payload["productos"][0]["cantidad"] = 1
+        # Act
+        response = client.post(self.URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="pos-1-0002")
+        # Assert
+        assert response.status_code == 422
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 7
+
+    def test_venta_fallida_no_guarda_la_clave(self, db):
+        # Arrange — stock insuficiente en el primer intento
+        client, payload, inventario = self._setup("idem3@test.com")
+        payload["productos"][0]["cantidad"] = 50
+        # Act
+        response = client.post(self.URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="pos-1-0003")
+        # Assert
+        assert response.status_code == 400
+        assert not ClaveIdempotencia.objects.filter(clave="pos-1-0003").exists()
+
+    def test_sin_header_cada_post_crea_una_venta(self, db):
+        # Arrange
+        client, payload, inventario = self._setup("idem4@test.com")
+        # Act
+        client.post(self.URL, payload, format="json")
+        client.post(self.URL, payload, format="json")
+        # Assert
+        assert VentaProducto.objects.count() == 2
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 4
+
+
+# =========================================================
+# 11. API sincronizar — lote de ventas offline
+# =========================================================
+
+class TestSincronizarVentasAPI:
+    URL = "/api/ventas/ventas-productos/sincronizar/"
+
+    def test_devuelve_un_resultado_por_venta_en_ndjson(self, db):
+        # Arrange
+        sede = SedeFactory()
+        producto = ProductoFactory(precio_unitario=decimal.Decimal("100.00"))
+        inventario = InventarioFactory(producto=producto, sede=sede, cantidad_actual=3)
+        user, _ = make_admin_user(email="sync1@test.com")
+        client = _auth_client(user)
+        lote = {
+            "ventas": [
+                {
+                    "clave": f"pos-1-{i}",
+                    "sede_id": sede.id,
+                    "metodo_pago": "efectivo",
+                    "productos": [{"producto_id": producto.producto_id, "cantidad": 2}],
+                }
+                for i in range(2)
+            ]
+        }
+        # Act
+        response = client.post(self.URL, lote, format="json")
+        lineas = b"".join(response.streaming_content).decode().splitlines()
+        # Assert
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        resultados = [json.loads(linea) for linea in lineas]
+        assert [r["estado"] for r in resultados] == ["creada", "error"]
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 1
+
+    def test_lote_vacio_devuelve_400(self, db):
+        user, _ = make_admin_user(email="sync2@test.com")
+        response = _auth_client(user).post(self.URL, {"ventas": []}, format="json")
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("desfase", [timedelta(hours=1), -timedelta(days=30)])
+    def test_fecha_venta_futura_o_demasiado_antigua_devuelve_400(self, db, desfase):
+        # Arrange
+        sede = SedeFactory()
+        producto = ProductoFactory()
+        InventarioFactory(producto=producto, sede=sede, cantidad_actual=3)
+        user, _ = make_admin_user(email="sync3@test.com")
+        venta = {
+            "clave": "pos-1-0",
+            "sede_id": sede.id,
+            "metodo_pago": "efectivo",
+            "fecha_venta": (timezone.now() + desfase).isoformat(),
+            "productos": [{"producto_id": producto.producto_id, "cantidad": 1}],
+        }
+        # Act
+        response = _auth_client(user).post(self.URL, {"ventas": [venta]}, format="json")
+        # Assert
+        assert response.status_code == 400
+        assert "fecha_venta" in response.json()["detalles"]["ventas"][0]
+        assert VentaProducto.objects.count() == 0
+
+
+# =========================================================
+# 12. API estadisticas — resumen diario
+# =========================================================
+
+class TestEstadisticasVentasAPI:
+    URL = "/api/ventas/ventas-productos/estadisticas/"
+
+    def test_estadisticas_reflejan_ventas_creadas_y_canceladas(self, db):
+        # Arrange
+        sede = SedeFactory()
+        producto = ProductoFactory(precio_unitario=decimal.Decimal("100.00"))
+        InventarioFactory(producto=producto, sede=sede, cantidad_actual=10)
+        user, _ = make_admin_user(email="stats1@test.com")
+        client = _auth_client(user)
+        payload = {
+            "sede_id": sede.id,
+            "metodo_pago": "efectivo",
+            "productos": [{"producto_id": producto.producto_id, "cantidad": 1}],
+        }
+        client.post("/api/ventas/ventas-productos/crear_venta/", payload, format="json")
+        venta_id = client.post(
+            "/api/ventas/ventas-productos/crear_venta/",
+            {**payload, "productos": [{"producto_id": producto.producto_id, "cantidad": 3}]},
+            format="json",
+        ).json()["venta"]["venta_id"]
+        client.post("/api/ventas/ventas-productos/crear_venta/", payload, format="json")
+        client.post(f"/api/ventas/ventas-productos/{venta_id}/cancelar/", format="json")
+        # Act
+        response = client.get(self.URL, {"sede": sede.id})
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "total_ventas": 2,
+            "ingresos_totales": 200.0,
+            "ticket_promedio": 100.0,
+        }
+
+    def test_fecha_invalida_devuelve_400(self, db):
+        user, _ = make_admin_user(email="stats2@test.com")
+        response = _auth_client(user).get(self.URL, {"fecha_desde": "ayer"})
+        assert response.status_code == 400
+
+
+# =========================================================
+# 13. API productos-disponibles — catálogo versionado
+# =========================================================
+
+class TestCatalogoPOSAPI:
+    URL = "/api/ventas/ventas-productos/productos-disponibles/"
+
+    def test_if_none_match_con_version_vigente_devuelve_304(self, db):
+        # Arrange
+        sede = SedeFactory()
+        InventarioFactory(sede=sede, cantidad_actual=5)
+        user, _ = make_admin_user(email="cat1@test.com")
+        client = _auth_client(user)
+        etag = client.get(self.URL, {"sede": sede.id})["ETag"]
+        # Act
+        response = client.get(self.URL, {"sede": sede.id}, HTTP_IF_NONE_MATCH=etag)
+        # Assert
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+    def test_delta_devuelve_solo_productos_modificados_por_la_venta(self, db):
+        # Arrange
+        sede = SedeFactory()
+        vendido = InventarioFactory(sede=sede, cantidad_actual=2)
+        InventarioFactory(sede=sede, cantidad_actual=5)
+        user, _ = make_admin_user(email="cat2@test.com")
+        client = _auth_client(user)
+        inicial = client.get(self.URL, {"sede": sede.id})
+        version = int(inicial["X-Catalogo-Version"])
+        client.post(
+            "/api/ventas/ventas-productos/crear_venta/",
+            {
+                "sede_id": sede.id,
+                "metodo_pago": "efectivo",
+                "productos": [{"producto_id": vendido.producto_id, "cantidad": 2}],
+            },
+            format="json",
+        )
+        # Act
+        response = client.get(
+            self.URL,
+            {"sede": sede.id, "desde_version": version},
+            HTTP_IF_NONE_MATCH=inicial["ETag"],
+        )
+        # Assert
+        assert response.status_code == 200
+        data = response.json()
+        assert data["version"] > version
+        assert data["completo"] is False
+        assert [(p["producto_id"], p["stock"], p["disponible"]) for p in data["productos"]] == [
+            (vendido.producto_id, 0, False)
+        ]
+
+    def test_borrar_inventario_obliga_a_recargar_catalogo_completo(self, db):
+        # Arrange
+        sede = SedeFactory()
+        InventarioFactory(sede=sede, cantidad_actual=5)
+        borrado = InventarioFactory(sede=sede, cantidad_actual=5)
+        user, _ = make_admin_user(email="cat3@test.com")
+        client = _auth_client(user)
+        version = int(client.get(self.URL, {"sede": sede.id})["X-Catalogo-Version"])
+        borrado.delete()
+        # Act
+        response = client.get(self.URL, {"sede": sede.id, "desde_version": version})
+        # Assert
+        data = response.json()
+        assert data["completo"] is True
+        assert len(data["productos"]) == 1
+
+
+# =========================================================
+# 14. API escanear — código de barras
+# =========================================================
+
+class TestEscanearProductoAPI:
+    URL = "/api/ventas/ventas-productos/escanear/"
+
+    def test_escaneo_refleja_stock_tras_una_venta(self, db):
+        # Arrange
+        sede = SedeFactory()
+        producto = ProductoFactory(codigo="7501234567890", precio_unitario=decimal.Decimal("45.00"))
+        InventarioFactory(producto=producto, sede=sede, cantidad_actual=4)
+        user, _ = make_admin_user(email="scan1@test.com")
+        client = _auth_client(user)
+        antes = client.get(self.URL, {"codigo": "7501234567890", "sede": sede.id}).json()
+        client.post(
+            "/api/ventas/ventas-productos/crear_venta/",
+            {
+                "sede_id": sede.id,
+                "metodo_pago": "efectivo",
+                "productos": [{"producto_id": producto.producto_id, "cantidad": 1}],
+            },
+            format="json",
+        )
+        # Act
+        despues = client.get(self.URL, {"codigo": "7501234567890", "sede": sede.id}).json()
+        # Assert
+        assert antes["producto_id"] == producto.producto_id
+        assert antes["precio_unitario"] == "45.00"
+        assert antes["stock"] == 4
+        assert despues["stock"] == 3
+
+    def test_codigo_parcial_no_coincide(self, db):
+        sede = SedeFactory()
+        InventarioFactory(producto=ProductoFactory(codigo="7501234567890"), sede=sede)
+        user, _ = make_admin_user(email="scan2@test.com")
+        response = _auth_client(user).get(self.URL, {"codigo": "750123", "sede": sede.id})
+        assert response.status_code == 404
+
+
+# =========================================================
+# 15. API exportar — CSV / JSONL en streaming
+# =========================================================
+
+class TestExportarVentasAPI:
+    URL = "/api/ventas/ventas-productos/exportar/"
+
+    def _crear_ventas(self, sede, cantidad_productos):
+        productos = [ProductoFactory() for _ in range(cantidad_productos)]
+        completada = VentaProductoFactory(sede=sede, estado="completada")
+        for producto in productos:
+            DetalleVentaProductoFactory(venta=completada, producto=producto)
+        cancelada = VentaProductoFactory(sede=sede, estado="cancelada")
+        DetalleVentaProductoFactory(venta=cancelada, producto=productos[0])
+        return completada
+
+    def test_csv_tiene_una_fila_por_detalle_y_respeta_filtros(self, db):
+        # Arrange
+        sede = SedeFactory()
+        completada = self._crear_ventas(sede, cantidad_productos=2)
+        self._crear_ventas(SedeFactory(), cantidad_productos=1)
+        user, _ = make_admin_user(email="exp1@test.com")
+        # Act
+        response = _auth_client(user).get(
+            self.URL, {"formato": "csv", "sede": sede.id, "estado": "completada"}
+        )
+        lineas = b"".join(response.streaming_content).decode().splitlines()
+        # Assert
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/csv")
+        assert lineas[0].startswith("venta_id,fecha_venta,sede_id")
+        assert len(lineas) == 3
+        assert all(linea.startswith(f"{completada.venta_id},") for linea in lineas[1:])
+
+    def test_jsonl_anida_los_detalles_de_cada_venta(self, db):
+        sede = SedeFactory()
+        self._crear_ventas(sede, cantidad_productos=3)
+        user, _ = make_admin_user(email="exp2@test.com")
+        response = _auth_client(user).get(self.URL, {"formato": "jsonl", "sede": sede.id})
+        ventas = [json.loads(linea) for linea in b"".join(response.streaming_content).splitlines()]
+        assert [len(v["detalles"]) for v in ventas] == [3, 1]
+
+    def test_formato_desconocido_devuelve_400(self, db):
+        user, _ = make_admin_user(email="exp3@test.com")
+        response = _auth_client(user).get(self.URL, {"formato": "xlsx"})
+        assert response.status_code == 400
+
+
+# =========================================================
+# 16. Listado de ventas — paginación por cursor
+# =========================================================
+
+class TestListarVentasPaginacionAPI:
+    URL = "/api/ventas/ventas-productos/"
+
+    def test_recorre_todas_las_ventas_sin_repetir_ni_saltar(self, db):
+        # Arrange — 5 ventas con la misma fecha fuerzan el desempate por PK
+        sede = SedeFactory()
+        ventas = [VentaProductoFactory(sede=sede) for _ in range(5)]
+        VentaProducto.objects.filter(sede=sede).update(fecha_venta=ventas[0].fecha_venta)
+        user, _ = make_admin_user(email="pag1@test.com")
+        client = _auth_client(user)
+        # Act
+        vistos = []
+        url = f"{self.URL}?sede={sede.id}&page_size=2"
+        while url:
+            data = client.get(url).json()
+            vistos.extend(v["venta_id"] for v in data["results"])
+            url = data["next"]
+        # Assert
+        assert vistos == sorted((v.venta_id for v in ventas), reverse=True)
+
+    def test_previous_devuelve_la_pagina_anterior(self, db):
+        sede = SedeFactory()
+        for _ in range(4):
+            VentaProductoFactory(sede=sede)
+        user, _ = make_admin_user(email="pag2@test.com")
+        client = _auth_client(user)
+        primera = client.get(self.URL, {"sede": sede.id, "page_size": 2}).json()
+        segunda = client.get(primera["next"]).json()
+        anterior = client.get(segunda["previous"]).json()
+        assert anterior["results"] == primera["results"]
+        assert primera["previous"] is None
+
+    def test_paginar_false_devuelve_lista_completa(self, db):
+        sede = SedeFactory()
+        for _ in range(3):
+            VentaProductoFactory(sede=sede)
+        user, _ = make_admin_user(email="pag3@test.com")
+        response = _auth_client(user).get(self.URL, {"sede": sede.id, "paginar": "false"})
+        assert isinstance(response.json(), list)
+        assert len(response.json()) == 3
+
+    def test_cursor_invalido_devuelve_404(self, db):
+        user, _ = make_admin_user(email="pag4@test.com")
+        response = _auth_client(user).get(self.URL, {"cursor": "no-es-un-cursor"})
+        assert response.status_code == 404
+
+
 # =========================================================
 # 5. Cancelar venta — restaurar stock
 # =========================================================
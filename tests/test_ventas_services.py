@@ -16,23 +16,52 @@ Casos cubiertos:
       - venta anónima (sin cliente_id)
       - descuento global reduce el total correcto
       - aislamiento: otro sede no pierde stock
+      - número de consultas constante sin importar el tamaño del carrito
+      - producto repetido en el carrito se descuenta una sola vez por el total
+
+    venta_producto_sincronizar:
+      - lote de varias sedes descuenta cada inventario una vez por el total
+      - venta sin stock se reporta como error sin afectar al resto del grupo
+      - reenvío del mismo lote no duplica ventas (claves de idempotencia)
+      - la fecha_venta del POS se conserva en la venta, el resumen y el libro
+      - el movimiento de una venta anterior al último snapshot se fecha en el snapshot
+
+    resúmenes diarios:
+      - crear suma unidades, ingresos y tickets; cancelar los resta
+      - resumen_ventas_reconstruir reproduce los acumulados incrementales
 
     venta_producto_cancelar:
       - repone stock tras cancelación
       - múltiples detalles reponen stock individualmente
+      - la versión del catálogo sube una sola vez y marca todos los productos
+      - número de consultas constante sin importar cuántos detalles tenga
       - doble cancelación → ValidationError
       - inventario eliminado entre venta y cancelación → se recrea con defaults
 """
 from __future__ import annotations
 
 import decimal
+from datetime import timedelta
 
 import pytest
 from django.core.exceptions import ValidationError
-
-from inventario.models import Inventario
-from ventas.models import DetalleVentaProducto, VentaProducto
-from ventas.services import venta_producto_cancelar, venta_producto_crear
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventario.models import Inventario, MovimientoInventario, SnapshotInventario
+from ventas.models import (
+    DetalleVentaProducto,
+    ResumenVentaProductoDiario,
+    ResumenVentaSedeDiario,
+    VentaProducto,
+)
+from ventas.services import (
+    resumen_ventas_reconstruir,
+    venta_producto_cancelar,
+    venta_producto_crear,
+    venta_producto_sincronizar,
+)
 
 from tests.factories import (
     ClienteFactory,
@@ -236,6 +265,69 @@ def test_venta_crear_solo_afecta_inventario_de_la_sede_correcta(db, empleado, pr
     assert inv_otra.cantidad_actual == 10  # intacto
 
 
+def test_venta_crear_numero_de_consultas_no_depende_del_carrito(
+    db, empleado, sede, django_assert_num_queries
+):
+    """
+    El checkout bloquea, inserta detalles y descuenta stock en bloque:
+    un carrito de 1 producto y uno de 15 ejecutan las mismas consultas.
+    """
+    # Arrange
+    productos = [ProductoFactory() for _ in range(15)]
+    for prod in productos:
+        InventarioFactory(producto=prod, sede=sede, cantidad_actual=10)
+
+    def _carrito(n):
+        return [
+            {"producto_id": prod.pk, "cantidad": 1, "descuento": decimal.Decimal("0")}
+            for prod in productos[:n]
+        ]
+
+    with CaptureQueriesContext(connection) as consultas_uno:
+        venta_producto_crear(
+            empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo", productos=_carrito(1)
+        )
+
+    # Act & Assert
+    with django_assert_num_queries(len(consultas_uno)):
+        venta = venta_producto_crear(
+            empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo", productos=_carrito(15)
+        )
+
+    assert venta.detalles.count() == 15
+    assert Inventario.objects.get(producto=productos[-1], sede=sede).cantidad_actual == 9
+
+
+def test_venta_crear_producto_repetido_valida_y_descuenta_el_total(db, empleado, producto, sede):
+    """
+    Si el carrito repite un producto en dos líneas, el stock se valida contra la
+    suma de ambas y se descuenta una sola vez por el total.
+    """
+    # Arrange
+    inv = InventarioFactory(producto=producto, sede=sede, cantidad_actual=5)
+    linea = {"producto_id": producto.pk, "cantidad": 3, "descuento": decimal.Decimal("0")}
+
+    # Act & Assert — 3 + 3 > 5
+    with pytest.raises(ValidationError, match="Stock insuficiente"):
+        venta_producto_crear(
+            empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo", productos=[linea, linea]
+        )
+
+    # Act — 2 + 3 == 5
+    venta = venta_producto_crear(
+        empleado=empleado,
+        sede_id=sede.pk,
+        metodo_pago="efectivo",
+        productos=[{**linea, "cantidad": 2}, linea],
+    )
+
+    # Assert
+    inv.refresh_from_db()
+    assert inv.cantidad_actual == 0
+    assert venta.detalles.count() == 2
+    assert venta.total == decimal.Decimal("500.00")
+
+
 # ===========================================================================
 # venta_producto_crear — errores y atomicidad
 # ===========================================================================
@@ -382,6 +474,228 @@ def test_venta_crear_producto_inexistente_deberia_lanzar_validation_error(db, em
         )
 
 
+# ===========================================================================
+# venta_producto_sincronizar — lotes de ventas offline
+# ===========================================================================
+
+
+def _venta_offline(clave, sede, *lineas):
+    return {
+        "clave": clave,
+        "sede_id": sede.pk,
+        "metodo_pago": "efectivo",
+        "descuento_global": decimal.Decimal("0"),
+        "notas": "",
+        "productos": [
+            {"producto_id": prod.pk, "cantidad": cantidad, "descuento": decimal.Decimal("0")}
+            for prod, cantidad in lineas
+        ],
+    }
+
+
+def test_sincronizar_lote_descuenta_stock_de_cada_sede(db, empleado, producto):
+    """
+    Un lote con ventas de dos sedes crea todas las ventas y descuenta cada
+    inventario por la suma de las ventas de su sede.
+    """
+    # Arrange
+    sede_a = SedeFactory()
+    sede_b = SedeFactory()
+    inv_a = InventarioFactory(producto=producto, sede=sede_a, cantidad_actual=10)
+    inv_b = InventarioFactory(producto=producto, sede=sede_b, cantidad_actual=10)
+    lote = [
+        _venta_offline("pos-a-1", sede_a, (producto, 2)),
+        _venta_offline("pos-b-1", sede_b, (producto, 1)),
+        _venta_offline("pos-a-2", sede_a, (producto, 3)),
+    ]
+
+    # Act
+    resultados = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Assert
+    assert [r["estado"] for r in resultados] == ["creada"] * 3
+    assert sorted(r["indice"] for r in resultados) == [0, 1, 2]
+    inv_a.refresh_from_db()
+    inv_b.refresh_from_db()
+    assert inv_a.cantidad_actual == 5
+    assert inv_b.cantidad_actual == 9
+    venta = VentaProducto.objects.get(pk=resultados[0]["venta_id"])
+    assert venta.total == decimal.Decimal("200.00")
+    assert venta.detalles.count() == 1
+
+
+def test_sincronizar_venta_sin_stock_no_afecta_al_resto_del_grupo(db, empleado, producto, sede):
+    """
+    Las ventas se aplican en orden: la que ya no tiene stock se reporta como
+    error y las demás del mismo grupo se registran.
+    """
+    # Arrange
+    inv = InventarioFactory(producto=producto, sede=sede, cantidad_actual=5)
+    lote = [
+        _venta_offline("pos-1", sede, (producto, 4)),
+        _venta_offline("pos-2", sede, (producto, 4)),
+        _venta_offline("pos-3", sede, (producto, 1)),
+    ]
+
+    # Act
+    resultados = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Assert
+    assert [r["estado"] for r in resultados] == ["creada", "error", "creada"]
+    assert "Stock insuficiente" in resultados[1]["error"]
+    inv.refresh_from_db()
+    assert inv.cantidad_actual == 0
+    assert VentaProducto.objects.count() == 2
+
+
+def test_sincronizar_reenvio_del_lote_no_duplica_ventas(db, empleado, producto, sede):
+    """
+    Si el POS reenvía el mismo lote, las ventas ya registradas se devuelven
+    como duplicadas con su venta_id original y el stock no se vuelve a descontar.
+    """
+    # Arrange
+    inv = InventarioFactory(producto=producto, sede=sede, cantidad_actual=10)
+    lote = [_venta_offline("pos-1", sede, (producto, 2))]
+    primera = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Act
+    reenvio = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Assert
+    assert reenvio[0]["estado"] == "duplicada"
+    assert reenvio[0]["venta_id"] == primera[0]["venta_id"]
+    inv.refresh_from_db()
+    assert inv.cantidad_actual == 8
+    assert VentaProducto.objects.count() == 1
+
+
+def test_sincronizar_conserva_la_fecha_de_venta_del_pos(db, empleado, producto, sede, inventario):
+    """
+    Una venta hecha ayer sin conexión cuenta en el resumen de ayer y su
+    movimiento de inventario queda a la hora en que se vendió.
+    """
+    # Arrange
+    fecha_venta = timezone.now() - timedelta(days=1)
+    lote = [{**_venta_offline("pos-1", sede, (producto, 2)), "fecha_venta": fecha_venta}]
+
+    # Act
+    resultados = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Assert
+    venta = VentaProducto.objects.get(pk=resultados[0]["venta_id"])
+    assert venta.fecha_venta == fecha_venta
+    resumen = ResumenVentaSedeDiario.objects.get(sede=sede)
+    assert resumen.fecha == timezone.localdate(fecha_venta)
+    movimiento = MovimientoInventario.objects.get(venta=venta)
+    assert (movimiento.fecha, movimiento.cantidad) == (fecha_venta, -2)
+
+
+def test_sincronizar_no_fecha_movimientos_antes_del_ultimo_snapshot(
+    db, empleado, producto, sede, inventario
+):
+    """
+    El snapshot tomado mientras la caja estaba sin conexión no incluye la venta:
+    su movimiento se fecha en el snapshot para que stock_en_fecha la cuente.
+    """
+    # Arrange
+    fecha_venta = timezone.now() - timedelta(hours=3)
+    snapshot = SnapshotInventario.objects.create(
+        sede=sede, producto=producto, fecha=timezone.now() - timedelta(hours=1),
+        cantidad=inventario.cantidad_actual,
+    )
+    lote = [{**_venta_offline("pos-1", sede, (producto, 2)), "fecha_venta": fecha_venta}]
+
+    # Act
+    resultados = list(venta_producto_sincronizar(empleado=empleado, ventas=lote))
+
+    # Assert
+    venta = VentaProducto.objects.get(pk=resultados[0]["venta_id"])
+    assert venta.fecha_venta == fecha_venta
+    assert MovimientoInventario.objects.get(venta=venta).fecha == snapshot.fecha
+
+
+# ===========================================================================
+# Resúmenes diarios de ventas
+# ===========================================================================
+
+
+def _resumenes():
+    por_producto = sorted(
+        ResumenVentaProductoDiario.objects.values_list(
+            "sede_id", "fecha", "producto_id", "unidades", "ingresos", "tickets"
+        )
+    )
+    por_sede = sorted(
+        ResumenVentaSedeDiario.objects.values_list("sede_id", "fecha", "ventas", "ingresos")
+    )
+    return por_producto, por_sede
+
+
+def test_resumen_diario_se_actualiza_al_crear_y_cancelar(db, empleado, producto, sede, inventario):
+    """
+    Dos ventas del mismo producto suman unidades, ingresos y tickets;
+    cancelar una resta exactamente su contribución.
+    """
+    # Act
+    linea = {"producto_id": producto.pk, "cantidad": 2, "descuento": decimal.Decimal("0")}
+    venta_1 = venta_producto_crear(
+        empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo",
+        productos=[linea, linea], descuento_global=decimal.Decimal("50"),
+    )
+    venta_producto_crear(
+        empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo", productos=[linea],
+    )
+
+    # Assert — 6 unidades en 2 tickets; ingresos de sede con descuento global aplicado
+    resumen = ResumenVentaProductoDiario.objects.get(sede=sede, producto=producto)
+    assert (resumen.unidades, resumen.ingresos, resumen.tickets) == (6, decimal.Decimal("600.00"), 2)
+    resumen_sede = ResumenVentaSedeDiario.objects.get(sede=sede)
+    assert (resumen_sede.ventas, resumen_sede.ingresos) == (2, decimal.Decimal("550.00"))
+
+    # Act — cancelar la primera venta
+    venta_producto_cancelar(venta=venta_1)
+
+    # Assert
+    resumen.refresh_from_db()
+    resumen_sede.refresh_from_db()
+    assert (resumen.unidades, resumen.ingresos, resumen.tickets) == (2, decimal.Decimal("200.00"), 1)
+    assert (resumen_sede.ventas, resumen_sede.ingresos) == (1, decimal.Decimal("200.00"))
+
+
+def test_resumen_reconstruir_coincide_con_acumulado_incremental(db, empleado, sede):
+    """
+    Reconstruir desde cero (backfill) produce los mismos acumulados que el
+    mantenimiento incremental de crear/sincronizar/cancelar.
+    """
+    # Arrange
+    prod_a = ProductoFactory(precio_unitario=decimal.Decimal("50.00"))
+    prod_b = ProductoFactory(precio_unitario=decimal.Decimal("30.00"))
+    InventarioFactory(producto=prod_a, sede=sede, cantidad_actual=100)
+    InventarioFactory(producto=prod_b, sede=sede, cantidad_actual=100)
+    venta = venta_producto_crear(
+        empleado=empleado, sede_id=sede.pk, metodo_pago="efectivo",
+        productos=[
+            {"producto_id": prod_a.pk, "cantidad": 2, "descuento": decimal.Decimal("5")},
+            {"producto_id": prod_b.pk, "cantidad": 1, "descuento": decimal.Decimal("0")},
+        ],
+    )
+    list(venta_producto_sincronizar(
+        empleado=empleado,
+        ventas=[_venta_offline("pos-1", sede, (prod_a, 3)), _venta_offline("pos-2", sede, (prod_b, 4))],
+    ))
+    venta_producto_cancelar(venta=venta)
+    incremental = _resumenes()
+
+    # Act
+    ResumenVentaProductoDiario.objects.all().delete()
+    ResumenVentaSedeDiario.objects.all().delete()
+    filas = resumen_ventas_reconstruir()
+
+    # Assert
+    assert filas == {"resumen_producto": 2, "resumen_sede": 1}
+    assert _resumenes() == incremental
+
+
 # ===========================================================================
 # venta_producto_cancelar — camino feliz
 # ===========================================================================
@@ -434,6 +748,60 @@ def test_venta_cancelar_repone_stock_multiples_detalles(db, sede):
     assert inv_b.cantidad_actual == 12  # 8 + 4
 
 
+def test_venta_cancelar_sube_la_version_del_catalogo_una_vez(db, sede):
+    """
+    La cancelación no pasa por Inventario.save() (cuya señal bloquearía el contador
+    del catálogo antes que el resto del inventario): sube la versión una sola vez,
+    al final, para todos los productos.
+    """
+    from inventario.models import VersionCatalogoSede
+
+    # Arrange
+    productos = [ProductoFactory() for _ in range(3)]
+    for prod in productos:
+        InventarioFactory(producto=prod, sede=sede, cantidad_actual=5)
+    venta = VentaProductoFactory(sede=sede, estado="completada")
+    for prod in productos:
+        DetalleVentaProductoFactory(venta=venta, producto=prod, cantidad=1)
+    version_antes = VersionCatalogoSede.objects.get(sede=sede).version
+
+    # Act
+    venta_producto_cancelar(venta=venta)
+
+    # Assert
+    version = VersionCatalogoSede.objects.get(sede=sede).version
+    assert version == version_antes + 1
+    assert set(
+        Inventario.objects.filter(sede=sede).values_list("version_catalogo", flat=True)
+    ) == {version}
+
+
+def test_venta_cancelar_consultas_constantes(db, sede, django_assert_num_queries):
+    """
+    Cancelar una venta de 12 productos hace las mismas consultas que una de 1.
+    """
+    # Arrange
+    def _venta(n):
+        venta = VentaProductoFactory(sede=sede, estado="completada")
+        for _ in range(n):
+            prod = ProductoFactory()
+            InventarioFactory(producto=prod, sede=sede, cantidad_actual=5)
+            DetalleVentaProductoFactory(venta=venta, producto=prod, cantidad=2)
+        return venta
+
+    chica, grande = _venta(1), _venta(12)
+    with CaptureQueriesContext(connection) as consultas_uno:
+        venta_producto_cancelar(venta=chica)
+
+    # Act & Assert
+    with django_assert_num_queries(len(consultas_uno)):
+        venta_producto_cancelar(venta=grande)
+    assert set(
+        Inventario.objects.filter(producto__detalleventaproducto__venta=grande)
+        .values_list("cantidad_actual", flat=True)
+    ) == {7}
+
+
 # ===========================================================================
 # venta_producto_cancelar — errores y casos borde
 # ===========================================================================
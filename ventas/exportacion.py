@@ -0,0 +1,147 @@
+"""
+Exportación de ventas en streaming (CSV o JSONL).
+
+- filtrar_ventas: filtros de sede, estado, cliente y fechas compartidos con el listado
+- exportar_ventas_csv: una fila por detalle de venta, con los datos de la venta repetidos
+- exportar_ventas_jsonl: una línea JSON por venta con sus detalles anidados
+
+Las ventas se leen con QuerySet.iterator(chunk_size=...), que en PostgreSQL usa un
+cursor del lado del servidor y precarga los detalles por bloques, así que la memoria
+usada no depende del rango de fechas exportado.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import Iterator
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, QuerySet
+
+from .models import DetalleVentaProducto, VentaProducto
+
+# Mismo orden que _datos_venta seguido de _datos_detalle.
+COLUMNAS_CSV = [
+    "venta_id",
+    "fecha_venta",
+    "sede_id",
+    "sede",
+    "estado",
+    "metodo_pago",
+    "cliente_id",
+    "cliente",
+    "empleado",
+    "venta_subtotal",
+    "descuento_global",
+    "venta_total",
+    "detalle_id",
+    "producto_id",
+    "producto_codigo",
+    "producto",
+    "cantidad",
+    "precio_unitario",
+    "descuento",
+    "subtotal",
+    "total",
+]
+
+
+def filtrar_ventas(
+    queryset: QuerySet[VentaProducto],
+    *,
+    sede_id: Any = None,
+    estado: str | None = None,
+    cliente_id: Any = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+) -> QuerySet[VentaProducto]:
+    """Aplica los filtros opcionales del listado de ventas (los valores vacíos se ignoran)."""
+    if sede_id:
+        queryset = queryset.filter(sede_id=sede_id)
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    if cliente_id:
+        queryset = queryset.filter(cliente_id=cliente_id)
+    if fecha_desde:
+        queryset = queryset.filter(fecha_venta__gte=fecha_desde)
+    if fecha_hasta:
+        queryset = queryset.filter(fecha_venta__lte=fecha_hasta)
+    return queryset
+
+
+def exportar_ventas_csv(ventas: QuerySet[VentaProducto], *, tamano_lote: int = 1000) -> Iterator[str]:
+    """Genera el CSV (cabecera incluida) línea a línea."""
+    buffer = _Eco()
+    escritor = csv.writer(buffer)
+    yield escritor.writerow(COLUMNAS_CSV)
+    for venta in _ventas_con_detalles(ventas, tamano_lote):
+        columnas_venta = list(_datos_venta(venta).values())
+        for detalle in venta.detalles.all():
+            yield escritor.writerow(columnas_venta + list(_datos_detalle(detalle).values()))
+
+
+def exportar_ventas_jsonl(ventas: QuerySet[VentaProducto], *, tamano_lote: int = 1000) -> Iterator[str]:
+    """Genera una línea JSON por venta, con sus detalles en la clave "detalles"."""
+    for venta in _ventas_con_detalles(ventas, tamano_lote):
+        registro = _datos_venta(venta)
+        registro["detalles"] = [_datos_detalle(detalle) for detalle in venta.detalles.all()]
+        yield json.dumps(registro, cls=DjangoJSONEncoder) + "\n"
+
+
+# formato -> (generador, content type)
+FORMATOS_EXPORTACION = {
+    "csv": (exportar_ventas_csv, "text/csv; charset=utf-8"),
+    "jsonl": (exportar_ventas_jsonl, "application/x-ndjson"),
+}
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def _ventas_con_detalles(ventas: QuerySet[VentaProducto], tamano_lote: int) -> Iterator[VentaProducto]:
+    detalles = DetalleVentaProducto.objects.select_related("producto").order_by("detalle_id")
+    return (
+        ventas.select_related("sede", "cliente__persona", "empleado")
+        .prefetch_related(None)
+        .prefetch_related(Prefetch("detalles", queryset=detalles))
+        .order_by("fecha_venta", "venta_id")
+        .iterator(chunk_size=tamano_lote)
+    )
+
+
+def _datos_venta(venta: VentaProducto) -> dict[str, Any]:
+    """Campos de la venta, en el orden de las primeras columnas de COLUMNAS_CSV."""
+    persona = venta.cliente.persona if venta.cliente else None
+    return {
+        "venta_id": venta.venta_id,
+        "fecha_venta": venta.fecha_venta.isoformat(),
+        "sede_id": venta.sede_id,
+        "sede": venta.sede.nombre,
+        "estado": venta.estado,
+        "metodo_pago": venta.metodo_pago,
+        "cliente_id": venta.cliente_id,
+        "cliente": str(persona) if persona else "",
+        "empleado": venta.empleado.email if venta.empleado else "",
+        "subtotal": venta.subtotal,
+        "descuento_global": venta.descuento_global,
+        "total": venta.total,
+    }
+
+
+def _datos_detalle(detalle: DetalleVentaProducto) -> dict[str, Any]:
+    return {
+        "detalle_id": detalle.detalle_id,
+        "producto_id": detalle.producto_id,
+        "producto_codigo": detalle.producto.codigo or "",
+        "producto": detalle.producto.nombre,
+        "cantidad": detalle.cantidad,
+        "precio_unitario": detalle.precio_unitario,
+        "descuento": detalle.descuento,
+        "subtotal": detalle.subtotal,
+        "total": detalle.total,
+    }
@@ -0,0 +1,418 @@
+"""
+Benchmark de contención del checkout: varias cajas venden a la vez los mismos productos.
+
+Crea sus propios datos (sedes, productos "calientes" con stock de sobra y un cajero),
+lanza un pool de hilos —cada hilo es una caja con su propia conexión— y mide cada
+estrategia de checkout por separado. Al terminar borra los datos creados.
+
+Uso:
+    python manage.py benchmark_checkout
+    python manage.py benchmark_checkout --cajas 20 --sedes 4 --ventas-por-caja 50 \\
+        --estrategias servicio por_linea --salida bench_checkout.json
+
+Métricas por estrategia (se escriben en JSON con --salida):
+- ventas_por_segundo: ventas confirmadas / duración total
+- latencia_ms: p50, p95, p99 y máximo de cada checkout (incluye fallidos)
+- espera_bloqueo_ms: tiempo dentro de las sentencias que toman bloqueos de fila
+  (SELECT ... FOR UPDATE, UPDATE, INSERT ... ON CONFLICT); cota superior de la espera
+- deadlocks / fallos_serializacion / otros_errores: checkouts abortados por código SQLSTATE
+
+Usa la base de datos configurada: no debe ejecutarse contra producción.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import random
+import statistics
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+
+from instalaciones.models import Sede
+from inventario.models import CategoriaProducto, Inventario, Producto
+from ventas.models import DetalleVentaProducto, VentaProducto
+from ventas.services import venta_producto_crear
+
+User = get_user_model()
+
+SQLSTATE_DEADLOCK = "40P01"
+SQLSTATE_SERIALIZACION = "40001"
+SENTENCIAS_DE_BLOQUEO = ("FOR UPDATE", "UPDATE ", "ON CONFLICT")
+
+
+# ----------------------------------------------------------------------
+# ESTRATEGIAS DE CHECKOUT
+# ----------------------------------------------------------------------
+
+def _checkout_servicio(*, empleado, sede_id: int, productos: list[dict[str, Any]]) -> None:
+    """El checkout real: ventas.services.venta_producto_crear."""
+    venta_producto_crear(
+        empleado=empleado, sede_id=sede_id, metodo_pago="efectivo", productos=productos
+    )
+
+
+def _checkout_por_linea(*, empleado, sede_id: int, productos: list[dict[str, Any]]) -> None:
+    """Línea base: bloquea y descuenta producto por producto, en el orden del carrito.
+
+    Es el patrón propenso a deadlocks (dos cajas con los mismos productos en distinto
+    orden). No actualiza resúmenes ni versión de catálogo.
+    """
+    with transaction.atomic():
+        venta = VentaProducto.objects.create(
+            empleado=empleado,
+            sede_id=sede_id,
+            metodo_pago="efectivo",
+            subtotal=Decimal("0"),
+            total=Decimal("0"),
+        )
+        for item in productos:
+            inventario = Inventario.objects.select_for_update().select_related("producto").get(
+                sede_id=sede_id, producto_id=item["producto_id"]
+            )
+            if inventario.cantidad_actual < item["cantidad"]:
+                raise ValidationError("Stock insuficiente")
+            inventario.cantidad_actual -= item["cantidad"]
+            inventario.save(update_fields=["cantidad_actual", "ultima_actualizacion"])
+            detalle = DetalleVentaProducto(
+                venta=venta,
+                producto=inventario.producto,
+                cantidad=item["cantidad"],
+                precio_unitario=inventario.producto.precio_unitario,
+            )
+            detalle.calcular_totales()
+            detalle.save()
+        venta.calcular_totales()
+        venta.save(update_fields=["subtotal", "iva", "total"])
+
+
+def _checkout_update_condicional(*, empleado, sede_id: int, productos: list[dict[str, Any]]) -> None:
+    """Sin SELECT FOR UPDATE: un único UPDATE ... CASE descuenta el stock de todo el carrito.
+
+    Si algún stock quedara negativo, la restricción CHECK de cantidad_actual aborta la
+    venta (IntegrityError). El UPDATE bloquea las filas en el orden en que las recorre
+    PostgreSQL, no en un orden fijo, así que mide cuánto cuesta prescindir del bloqueo
+    ordenado.
+    """
+    cantidades: dict[int, int] = {}
+    for item in productos:
+        cantidades[item["producto_id"]] = cantidades.get(item["producto_id"], 0) + item["cantidad"]
+    with transaction.atomic():
+        actualizadas = Inventario.objects.filter(
+            sede_id=sede_id, producto_id__in=cantidades
+        ).update(
+            cantidad_actual=Case(
+                *[
+                    When(producto_id=producto_id, then=F("cantidad_actual") - cantidad)
+                    for producto_id, cantidad in cantidades.items()
+                ],
+                output_field=PositiveIntegerField(),
+            )
+        )
+        if actualizadas != len(cantidades):
+            raise ValidationError("Producto sin inventario en la sede")
+        precios = dict(
+            Producto.objects.filter(pk__in=cantidades).values_list("producto_id", "precio_unitario")
+        )
+        venta = VentaProducto.objects.create(
+            empleado=empleado,
+            sede_id=sede_id,
+            metodo_pago="efectivo",
+            subtotal=Decimal("0"),
+            total=Decimal("0"),
+        )
+        detalles = [
+            DetalleVentaProducto(
+                venta=venta,
+                producto_id=producto_id,
+                cantidad=cantidad,
+                precio_unitario=precios[producto_id],
+            )
+            for producto_id, cantidad in cantidades.items()
+        ]
+        for detalle in detalles:
+            detalle.calcular_totales()
+        DetalleVentaProducto.objects.bulk_create(detalles)
+        venta.calcular_totales(detalles)
+        venta.save(update_fields=["subtotal", "iva", "total"])
+
+
+ESTRATEGIAS: dict[str, Callable[..., None]] = {
+    "servicio": _checkout_servicio,
+    "por_linea": _checkout_por_linea,
+    "update_condicional": _checkout_update_condicional,
+}
+
+
+# ----------------------------------------------------------------------
+# COMANDO
+# ----------------------------------------------------------------------
+
+class Command(BaseCommand):
+    help = "Mide throughput, latencias y contención de bloqueos del checkout con cajas concurrentes."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--cajas", type=int, default=20, help="Cajas (hilos) concurrentes. Default: 20.")
+        parser.add_argument("--sedes", type=int, default=4, help="Sedes entre las que se reparten las cajas. Default: 4.")
+        parser.add_argument(
+            "--ventas-por-caja", type=int, default=50, help="Checkouts por caja y estrategia. Default: 50."
+        )
+        parser.add_argument(
+            "--productos-calientes", type=int, default=5, help="Productos que se venden en todas las cajas. Default: 5."
+        )
+        parser.add_argument(
+            "--lineas-por-venta", type=int, default=3, help="Productos distintos por carrito. Default: 3."
+        )
+        parser.add_argument(
+            "--estrategias",
+            nargs="+",
+            choices=sorted(ESTRATEGIAS),
+            default=sorted(ESTRATEGIAS),
+            help="Estrategias a comparar. Default: todas.",
+        )
+        parser.add_argument("--semilla", type=int, default=1, help="Semilla de los carritos. Default: 1.")
+        parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument(
+            "--conservar", action="store_true", help="No borra los datos creados al terminar."
+        )
+        parser.add_argument(
+            "--forzar", action="store_true", help="Permite ejecutarlo con DEBUG=False."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not settings.DEBUG and not options["forzar"]:
+            raise CommandError(
+                "El benchmark escribe ventas en la base de datos configurada. "
+                "Usa --forzar si de verdad no es producción."
+            )
+        if options["lineas_por_venta"] > options["productos_calientes"]:
+            raise CommandError("--lineas-por-venta no puede ser mayor que --productos-calientes.")
+
+        datos = _crear_datos(
+            sedes=options["sedes"],
+            productos=options["productos_calientes"],
+            stock=options["cajas"] * options["ventas_por_caja"] * options["lineas_por_venta"] * 10,
+        )
+        try:
+            resultados = []
+            for nombre in options["estrategias"]:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Estrategia: {nombre}"))
+                resultado = _ejecutar(
+                    estrategia=ESTRATEGIAS[nombre],
+                    datos=datos,
+                    cajas=options["cajas"],
+                    ventas_por_caja=options["ventas_por_caja"],
+                    lineas_por_venta=options["lineas_por_venta"],
+                    semilla=options["semilla"],
+                )
+                resultado = {"estrategia": nombre, **resultado}
+                resultados.append(resultado)
+                self.stdout.write(_resumen(resultado))
+        finally:
+            connection.close()
+            if not options["conservar"]:
+                _borrar_datos(datos)
+
+        informe = {
+            "fecha": datetime.now(dt_timezone.utc).isoformat(),
+            "entorno": {
+                "python": platform.python_version(),
+                "postgresql": _version_postgres(),
+            },
+            "parametros": {
+                clave: options[clave]
+                for clave in (
+                    "cajas", "sedes", "ventas_por_caja", "productos_calientes",
+                    "lineas_por_venta", "semilla",
+                )
+            },
+            "resultados": resultados,
+        }
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                json.dump(informe, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+
+# ----------------------------------------------------------------------
+# EJECUCIÓN Y MÉTRICAS
+# ----------------------------------------------------------------------
+
+def _ejecutar(
+    *,
+    estrategia: Callable[..., None],
+    datos: dict[str, Any],
+    cajas: int,
+    ventas_por_caja: int,
+    lineas_por_venta: int,
+    semilla: int,
+) -> dict[str, Any]:
+    barrera = threading.Barrier(cajas)
+
+    def caja(numero: int) -> list[dict[str, Any]]:
+        rng = random.Random(semilla * 1000 + numero)
+        sede_id = datos["sede_ids"][numero % len(datos["sede_ids"])]
+        espera = [0.0]
+
+        def medir_bloqueo(execute, sql, params, many, context):
+            if not any(marca in sql for marca in SENTENCIAS_DE_BLOQUEO):
+                return execute(sql, params, many, context)
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                espera[0] += time.perf_counter() - inicio
+
+        muestras = []
+        try:
+            with connection.execute_wrapper(medir_bloqueo):
+                barrera.wait()
+                for _ in range(ventas_por_caja):
+                    # Mismos productos en distinto orden en cada carrito: el peor caso de bloqueos
+                    carrito = [
+                        {"producto_id": producto_id, "cantidad": rng.randint(1, 2), "descuento": 0}
+                        for producto_id in rng.sample(datos["producto_ids"], lineas_por_venta)
+                    ]
+                    espera[0] = 0.0
+                    inicio = time.perf_counter()
+                    resultado = "ok"
+                    try:
+                        estrategia(empleado=datos["empleado"], sede_id=sede_id, productos=carrito)
+                    except (ValidationError, IntegrityError):
+                        resultado = "sin_stock"
+                    except DatabaseError as e:
+                        resultado = _clasificar_error(e)
+                    muestras.append(
+                        {
+                            "resultado": resultado,
+                            "latencia": time.perf_counter() - inicio,
+                            "espera_bloqueo": espera[0],
+                        }
+                    )
+        finally:
+            connection.close()
+        return muestras
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=cajas) as pool:
+        muestras = [m for lote in pool.map(caja, range(cajas)) for m in lote]
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(m["latencia"] * 1000 for m in muestras)
+    esperas = sorted(m["espera_bloqueo"] * 1000 for m in muestras)
+    conteo = {
+        clave: sum(1 for m in muestras if m["resultado"] == clave)
+        for clave in ("ok", "sin_stock", "deadlock", "serializacion", "otro")
+    }
+    return {
+        "checkouts": len(muestras),
+        "confirmados": conteo["ok"],
+        "duracion_s": round(duracion, 3),
+        "ventas_por_segundo": round(conteo["ok"] / duracion, 2) if duracion else 0,
+        "latencia_ms": _percentiles(latencias),
+        "espera_bloqueo_ms": {**_percentiles(esperas), "total": round(sum(esperas), 2)},
+        "deadlocks": conteo["deadlock"],
+        "fallos_serializacion": conteo["serializacion"],
+        "sin_stock": conteo["sin_stock"],
+        "otros_errores": conteo["otro"],
+    }
+
+
+def _percentiles(valores: list[float]) -> dict[str, float]:
+    if not valores:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    if len(valores) == 1:
+        cortes = valores * 99
+    else:
+        cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return {
+        "p50": round(cortes[49], 2),
+        "p95": round(cortes[94], 2),
+        "p99": round(cortes[98], 2),
+        "max": round(valores[-1], 2),
+    }
+
+
+def _clasificar_error(error: DatabaseError) -> str:
+    causa = error.__cause__
+    codigo = getattr(causa, "sqlstate", None) or getattr(causa, "pgcode", None)
+    if codigo == SQLSTATE_DEADLOCK:
+        return "deadlock"
+    if codigo == SQLSTATE_SERIALIZACION:
+        return "serializacion"
+    return "otro"
+
+
+def _resumen(resultado: dict[str, Any]) -> str:
+    latencia = resultado["latencia_ms"]
+    return (
+        f"  {resultado['confirmados']}/{resultado['checkouts']} ventas en {resultado['duracion_s']} s "
+        f"({resultado['ventas_por_segundo']} ventas/s) | "
+        f"p50 {latencia['p50']} ms, p95 {latencia['p95']} ms, p99 {latencia['p99']} ms | "
+        f"espera bloqueo p95 {resultado['espera_bloqueo_ms']['p95']} ms | "
+        f"deadlocks {resultado['deadlocks']}, serialización {resultado['fallos_serializacion']}, "
+        f"otros {resultado['otros_errores']}"
+    )
+
+
+def _version_postgres() -> str:
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        return cursor.fetchone()[0]
+
+
+# ----------------------------------------------------------------------
+# DATOS DEL BENCHMARK
+# ----------------------------------------------------------------------
+
+def _crear_datos(*, sedes: int, productos: int, stock: int) -> dict[str, Any]:
+    marca = f"bench-{int(time.time())}"
+    with transaction.atomic():
+        sede_objs = [
+            Sede.objects.create(nombre=f"{marca} sede {i}", direccion="Benchmark")
+            for i in range(sedes)
+        ]
+        categoria = CategoriaProducto.objects.create(nombre=marca)
+        producto_objs = [
+            Producto.objects.create(
+                nombre=f"{marca} producto {i}",
+                categoria=categoria,
+                precio_unitario=Decimal("25.00"),
+            )
+            for i in range(productos)
+        ]
+        Inventario.objects.bulk_create(
+            [
+                Inventario(producto=producto, sede=sede, cantidad_actual=stock, cantidad_maxima=stock)
+                for sede in sede_objs
+                for producto in producto_objs
+            ]
+        )
+        empleado = User.objects.create_user(email=f"{marca}@benchmark.local", password=None)
+    return {
+        "sede_ids": [sede.pk for sede in sede_objs],
+        "producto_ids": [producto.pk for producto in producto_objs],
+        "categoria_id": categoria.pk,
+        "empleado": empleado,
+    }
+
+
+def _borrar_datos(datos: dict[str, Any]) -> None:
+    with transaction.atomic():
+        # Borrar las sedes elimina en cascada ventas, detalles, inventario y resúmenes
+        Sede.objects.filter(pk__in=datos["sede_ids"]).delete()
+        Producto.objects.filter(pk__in=datos["producto_ids"]).delete()
+        CategoriaProducto.objects.filter(pk=datos["categoria_id"]).delete()
+        datos["empleado"].delete()
@@ -0,0 +1,66 @@
+"""
+Exporta ventas y sus detalles en CSV o JSONL sin cargarlas todas en memoria.
+
+Uso:
+    python manage.py exportar_ventas --desde 2026-01-01 --hasta 2026-03-31 --salida ventas.csv
+    python manage.py exportar_ventas --formato jsonl --sede 2 --estado completada > ventas.jsonl
+
+Acepta los mismos filtros que GET /api/ventas-productos/ (sede, estado, cliente y fechas).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from ventas.exportacion import FORMATOS_EXPORTACION, filtrar_ventas
+from ventas.models import VentaProducto
+
+
+class Command(BaseCommand):
+    help = "Exporta ventas y sus detalles en CSV o JSONL (streaming)."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--formato", choices=sorted(FORMATOS_EXPORTACION), default="csv")
+        parser.add_argument("--sede", type=int, help="ID de la sede.")
+        parser.add_argument("--estado", choices=["completada", "cancelada"])
+        parser.add_argument("--cliente", type=int, help="ID del cliente.")
+        parser.add_argument("--desde", help="Fecha/hora mínima de la venta (ISO 8601).")
+        parser.add_argument("--hasta", help="Fecha/hora máxima de la venta (ISO 8601).")
+        parser.add_argument("--salida", help="Archivo de salida. Default: salida estándar.")
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Ventas leídas por bloque del cursor. Default: 1000.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        ventas = filtrar_ventas(
+            VentaProducto.objects.all(),
+            sede_id=options["sede"],
+            estado=options["estado"],
+            cliente_id=options["cliente"],
+            fecha_desde=options["desde"],
+            fecha_hasta=options["hasta"],
+        )
+        exportador, _ = FORMATOS_EXPORTACION[options["formato"]]
+        lineas = exportador(ventas, tamano_lote=options["lote"])
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8", newline="") as archivo:
+                total = _escribir(archivo, lineas)
+        else:
+            # Cada línea ya termina en salto de línea, así que OutputWrapper no añade otro.
+            total = _escribir(self.stdout, lineas)
+        self.stderr.write(f"Líneas exportadas: {total}")
+
+
+def _escribir(destino: Any, lineas: Iterator[str]) -> int:
+    total = 0
+    for linea in lineas:
+        destino.write(linea)
+        total += 1
+    return total
@@ -0,0 +1,34 @@
+"""
+Elimina las claves de idempotencia de ventas más antiguas que la ventana de reintentos.
+
+Uso:
+    python manage.py purgar_claves_idempotencia            # conserva las últimas 48 horas
+    python manage.py purgar_claves_idempotencia --horas 24
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ventas.models import ClaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = "Elimina claves de idempotencia de ventas más antiguas que la ventana indicada."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--horas",
+            type=int,
+            default=48,
+            help="Antigüedad mínima (en horas) de las claves a eliminar. Default: 48.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        limite = timezone.now() - timedelta(hours=options["horas"])
+        eliminadas, _ = ClaveIdempotencia.objects.filter(fecha_creacion__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(f"Claves de idempotencia eliminadas: {eliminadas}"))
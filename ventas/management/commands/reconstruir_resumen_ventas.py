@@ -0,0 +1,51 @@
+"""
+Recalcula (o rellena por primera vez) los resúmenes diarios de ventas por sede y producto.
+
+Uso:
+    python manage.py reconstruir_resumen_ventas                          # todo el historial
+    python manage.py reconstruir_resumen_ventas --desde 2026-01-01
+    python manage.py reconstruir_resumen_ventas --desde 2026-01-01 --hasta 2026-01-31
+
+Mientras corre, las ventas nuevas esperan a que termine (las tablas de resumen
+quedan bloqueadas en modo EXCLUSIVE dentro de la transacción).
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ventas.services import resumen_ventas_reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula los resúmenes diarios de ventas a partir de las ventas registradas."
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--desde", help="Primer día a reconstruir (YYYY-MM-DD).")
+        parser.add_argument("--hasta", help="Último día a reconstruir (YYYY-MM-DD).")
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Filas por INSERT al escribir los resúmenes. Default: 1000.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            desde = date.fromisoformat(options["desde"]) if options["desde"] else None
+            hasta = date.fromisoformat(options["hasta"]) if options["hasta"] else None
+        except ValueError as e:
+            raise CommandError(f"Fecha inválida: {e}")
+
+        filas = resumen_ventas_reconstruir(
+            fecha_desde=desde, fecha_hasta=hasta, tamano_lote=options["lote"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Resúmenes reconstruidos: {filas['resumen_producto']} filas por producto, "
+                f"{filas['resumen_sede']} filas por sede."
+            )
+        )
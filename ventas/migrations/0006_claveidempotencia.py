@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:38
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_remove_detallepasarela_pasarela_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Valor del header Idempotency-Key enviado por el POS', max_length=255, unique=True)),
+                ('hash_peticion', models.CharField(help_text='SHA-256 del cuerpo de la petición original', max_length=64)),
+                ('codigo_estado', models.PositiveSmallIntegerField(default=201)),
+                ('respuesta', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Cuerpo de la respuesta original, devuelto tal cual en los reintentos')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('venta', models.ForeignKey(blank=True, help_text='Venta creada por la petición original', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='claves_idempotencia', to='ventas.ventaproducto')),
+            ],
+            options={
+                'verbose_name': 'Clave de Idempotencia',
+                'verbose_name_plural': 'Claves de Idempotencia',
+                'db_table': 'clave_idempotencia',
+                'indexes': [models.Index(fields=['fecha_creacion'], name='clave_idemp_fecha_c_5788cf_idx')],
+            },
+        ),
+    ]
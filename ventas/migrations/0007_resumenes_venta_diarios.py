@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instalaciones', '0001_initial'),
+        ('inventario', '0005_alter_inventario_options_alter_producto_options_and_more'),
+        ('ventas', '0006_claveidempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaProductoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día de la venta (zona horaria del proyecto)')),
+                ('unidades', models.IntegerField(default=0, help_text='Unidades vendidas')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, help_text='Suma del total de las líneas (antes del descuento global)', max_digits=12)),
+                ('tickets', models.IntegerField(default=0, help_text='Ventas que incluyen el producto')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_venta', to='inventario.producto')),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_venta_producto', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Venta por Producto',
+                'verbose_name_plural': 'Resúmenes Diarios de Venta por Producto',
+                'db_table': 'resumen_venta_producto_diario',
+                'indexes': [models.Index(fields=['fecha', 'sede'], name='resumen_ven_fecha_edf216_idx')],
+                'unique_together': {('sede', 'fecha', 'producto')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenVentaSedeDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día de la venta (zona horaria del proyecto)')),
+                ('ventas', models.IntegerField(default=0, help_text='Número de ventas completadas')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, help_text='Suma de VentaProducto.total', max_digits=12)),
+                ('sede', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_venta', to='instalaciones.sede')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas por Sede',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas por Sede',
+                'db_table': 'resumen_venta_sede_diario',
+                'indexes': [models.Index(fields=['fecha'], name='resumen_ven_fecha_aeda51_idx')],
+                'unique_together': {('sede', 'fecha')},
+            },
+        ),
+    ]
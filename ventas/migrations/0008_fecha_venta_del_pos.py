@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0007_resumenes_venta_diarios'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ventaproducto',
+            name='fecha_venta',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Fecha y hora de la venta'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from inventario.models import Producto
 
 
@@ -75,8 +77,10 @@ class VentaProducto(models.Model):
     )
 
     # Control y metadata
+    # No es auto_now_add: las ventas capturadas sin conexión conservan la hora del POS
     fecha_venta = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         help_text="Fecha y hora de la venta"
     )
     estado = models.CharField(
@@ -107,12 +111,15 @@ class VentaProducto(models.Model):
         cliente_str = f"{self.cliente.persona.nombre}" if self.cliente else "Cliente Anónimo"
         return f"Venta #{self.venta_id} - {cliente_str} - ${self.total}"
 
-    def calcular_totales(self):
+    def calcular_totales(self, detalles=None):
         """
         Calcula subtotal, IVA y total basándose en los detalles.
-        Este método debe llamarse después de crear los detalles.
+        Este método debe llamarse después de crear los detalles, o recibir la
+        lista de detalles ya construidos para evitar volver a consultarlos.
         """
-        self.subtotal = sum(detalle.total for detalle in self.detalles.all())
+        if detalles is None:
+            detalles = self.detalles.all()
+        self.subtotal = sum(detalle.total for detalle in detalles)
 
         # Aplicar descuento global
         subtotal_con_descuento = self.subtotal - self.descuento_global
@@ -200,3 +207,120 @@ class DetalleVentaProducto(models.Model):
         """Override save para calcular totales automáticamente"""
         self.calcular_totales()
         super().save(*args, **kwargs)
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta almacenada de un POST de venta identificado por el header Idempotency-Key.
+    Permite que el POS reintente una venta sin duplicar el cobro ni el descuento de stock.
+    """
+    clave = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Valor del header Idempotency-Key enviado por el POS"
+    )
+    hash_peticion = models.CharField(
+        max_length=64,
+        help_text="SHA-256 del cuerpo de la petición original"
+    )
+    venta = models.ForeignKey(
+        VentaProducto,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='claves_idempotencia',
+        help_text="Venta creada por la petición original"
+    )
+    codigo_estado = models.PositiveSmallIntegerField(default=201)
+    respuesta = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=dict,
+        help_text="Cuerpo de la respuesta original, devuelto tal cual en los reintentos"
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clave_idempotencia'
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
+        indexes = [
+            models.Index(fields=['fecha_creacion']),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} → Venta #{self.venta_id}"
+
+
+# =====================================================
+# RESÚMENES DIARIOS (mantenidos por ventas/services.py)
+# =====================================================
+
+class ResumenVentaProductoDiario(models.Model):
+    """
+    Acumulado diario de ventas completadas por sede y producto.
+    Se actualiza en la misma transacción que crea o cancela cada venta, de modo que
+    los reportes recorren días × productos en lugar de todas las líneas de venta.
+    """
+    sede = models.ForeignKey(
+        'instalaciones.Sede',
+        on_delete=models.CASCADE,
+        related_name='resumenes_venta_producto'
+    )
+    fecha = models.DateField(help_text="Día de la venta (zona horaria del proyecto)")
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='resumenes_venta'
+    )
+    unidades = models.IntegerField(default=0, help_text="Unidades vendidas")
+    ingresos = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Suma del total de las líneas (antes del descuento global)"
+    )
+    tickets = models.IntegerField(default=0, help_text="Ventas que incluyen el producto")
+
+    class Meta:
+        db_table = 'resumen_venta_producto_diario'
+        verbose_name = 'Resumen Diario de Venta por Producto'
+        verbose_name_plural = 'Resúmenes Diarios de Venta por Producto'
+        unique_together = [['sede', 'fecha', 'producto']]
+        indexes = [
+            models.Index(fields=['fecha', 'sede']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - Sede {self.sede_id} - Producto {self.producto_id}: {self.unidades}"
+
+
+class ResumenVentaSedeDiario(models.Model):
+    """
+    Acumulado diario de ventas completadas por sede (número de tickets e ingresos
+    con el descuento global ya aplicado).
+    """
+    sede = models.ForeignKey(
+        'instalaciones.Sede',
+        on_delete=models.CASCADE,
+        related_name='resumenes_venta'
+    )
+    fecha = models.DateField(help_text="Día de la venta (zona horaria del proyecto)")
+    ventas = models.IntegerField(default=0, help_text="Número de ventas completadas")
+    ingresos = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de VentaProducto.total"
+    )
+
+    class Meta:
+        db_table = 'resumen_venta_sede_diario'
+        verbose_name = 'Resumen Diario de Ventas por Sede'
+        verbose_name_plural = 'Resúmenes Diarios de Ventas por Sede'
+        unique_together = [['sede', 'fecha']]
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - Sede {self.sede_id}: {self.ventas} ventas"
@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import VentaProducto, DetalleVentaProducto
 from inventario.models import Producto
@@ -123,3 +127,43 @@ class CrearVentaProductoSerializer(serializers.Serializer):
             raise serializers.ValidationError({'productos': errores_stock})
 
         return data
+
+
+class VentaOfflineSerializer(CrearVentaProductoSerializer):
+    """
+    Venta capturada por el POS sin conexión, dentro de un lote de sincronización.
+    El stock se valida en el servicio con las filas de inventario ya bloqueadas,
+    por lo que aquí se omiten las consultas por producto de CrearVentaProductoSerializer.
+    """
+    # Margen para relojes de caja ligeramente adelantados
+    TOLERANCIA_RELOJ = timedelta(minutes=5)
+
+    clave = serializers.CharField(
+        max_length=255,
+        help_text="Identificador único de la venta generado por el POS (idempotencia)"
+    )
+    fecha_venta = serializers.DateTimeField(
+        required=False,
+        help_text="Fecha y hora en que el POS registró la venta (por defecto, la de sincronización)"
+    )
+
+    def validate_fecha_venta(self, value):
+        ahora = timezone.now()
+        if value > ahora + self.TOLERANCIA_RELOJ:
+            raise serializers.ValidationError("La fecha de la venta no puede estar en el futuro")
+        if value < ahora - timedelta(days=settings.VENTAS_OFFLINE_DIAS_MAXIMOS):
+            raise serializers.ValidationError(
+                f"La venta tiene más de {settings.VENTAS_OFFLINE_DIAS_MAXIMOS} días; "
+                "regístrala manualmente"
+            )
+        return min(value, ahora)
+
+    def validate(self, data):
+        return data
+
+
+class SincronizarVentasSerializer(serializers.Serializer):
+    """
+    Serializer para el endpoint POST /api/ventas-productos/sincronizar/
+    """
+    ventas = VentaOfflineSerializer(many=True, allow_empty=False, max_length=500)
@@ -3,19 +3,41 @@ Capa de servicios para el módulo de ventas.
 
 Contiene toda la lógica de negocio de escritura:
 - venta_producto_crear: crea una venta con carrito de productos
+- venta_producto_sincronizar: registra un lote de ventas capturadas sin conexión
 - venta_producto_cancelar: cancela una venta y restaura el stock
+- resumen_ventas_reconstruir: recalcula los resúmenes diarios de ventas
+
+Crear y cancelar ventas actualizan los resúmenes diarios (ResumenVentaProductoDiario,
+ResumenVentaSedeDiario), el libro de movimientos de inventario y la versión del
+catálogo POS de la sede dentro de la misma transacción.
 """
 from __future__ import annotations
 
+import hashlib
+import json
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime
 from decimal import Decimal
+from itertools import islice
 from typing import Any
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, Max, PositiveIntegerField, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 
-from inventario.models import Inventario, Producto
-from .models import DetalleVentaProducto, VentaProducto
+from inventario.models import Inventario, MovimientoInventario, Producto, SnapshotInventario
+from inventario.services import catalogo_registrar_cambios
+from .models import (
+    ClaveIdempotencia,
+    DetalleVentaProducto,
+    ResumenVentaProductoDiario,
+    ResumenVentaSedeDiario,
+    VentaProducto,
+)
 
 User = get_user_model()
 
@@ -32,8 +54,12 @@ def venta_producto_crear(
 ) -> VentaProducto:
     """Crea una venta con carrito de productos, descontando stock del inventario de la sede.
 
-    Ejecuta todo dentro de una transacción atómica con SELECT FOR UPDATE para
-    evitar condiciones de carrera en el stock.
+    Ejecuta todo dentro de una transacción atómica. Las filas de Inventario y
+    Producto del carrito se bloquean con un único SELECT FOR UPDATE ordenado por
+    producto_id, de modo que dos cajas que venden los mismos productos en distinto
+    orden no pueden bloquearse mutuamente (deadlock). Los detalles se insertan con
+    bulk_create y el stock se descuenta con un solo UPDATE, así que el número de
+    consultas no depende del tamaño del carrito.
 
     Args:
         empleado: Usuario cajero que realiza la venta.
@@ -51,7 +77,12 @@ def venta_producto_crear(
         ValidationError: Si algún producto no existe, no tiene inventario en la sede
             o no tiene stock suficiente.
     """
+    cantidades = _cantidades_por_producto(productos)
+
     with transaction.atomic():
+        inventarios = _bloquear_inventarios(sede_id=sede_id, producto_ids=cantidades)
+        _validar_stock(inventarios=inventarios, cantidades=cantidades)
+
         venta = VentaProducto.objects.create(
             cliente_id=cliente_id,
             empleado=empleado,
@@ -64,52 +95,288 @@ def venta_producto_crear(
             total=Decimal("0"),
         )
 
-        for item in productos:
-            try:
-                producto = (
-                    Producto.objects.select_for_update()
-                    .get(pk=item["producto_id"])
-                )
-            except Producto.DoesNotExist:
-                raise ValidationError(
-                    f"El producto con id {item['producto_id']} no existe"
-                )
+        detalles = _construir_detalles(venta=venta, productos=productos, inventarios=inventarios)
+        DetalleVentaProducto.objects.bulk_create(detalles)
+
+        _descontar_stock(inventarios=inventarios, cantidades=cantidades)
+
+        venta.calcular_totales(detalles)
+        venta.save(update_fields=["subtotal", "iva", "total"])
+
+        _acumular_resumen(ventas=[(venta, detalles)])
+        _registrar_movimientos(ventas=[(venta, detalles)], tipo="venta")
+        catalogo_registrar_cambios(sede_id=sede_id, producto_ids=cantidades)
+
+    return venta
+
+
+def venta_producto_sincronizar(
+    *,
+    empleado: User,
+    ventas: list[dict[str, Any]],
+) -> Iterator[dict[str, Any]]:
+    """Registra un lote de ventas capturadas sin conexión por el POS.
+
+    Las ventas se agrupan por sede y cada grupo se procesa en una sola transacción:
+    las filas de inventario de todos los productos del grupo se bloquean una sola vez
+    (con el mismo orden que venta_producto_crear), las ventas y sus detalles se
+    insertan con bulk_create y el stock se descuenta con un único UPDATE.
+
+    Cada venta del lote trae una 'clave' única generada por el POS. Las claves ya
+    registradas (p. ej. porque el POS reenvía el lote tras un corte) no se vuelven
+    a procesar; se devuelve la venta creada originalmente.
+
+    Una venta que no pasa la validación de stock no invalida al resto del grupo:
+    se reporta como error y las demás ventas se registran normalmente.
+
+    La venta conserva la 'fecha_venta' del POS (validada por VentaOfflineSerializer),
+    de modo que cuenta en el resumen del día en que se hizo y su movimiento de
+    inventario queda en esa fecha, salvo que sea anterior al último snapshot de la
+    sede: entonces se fecha en el snapshot, que no incluía la venta.
+
+    Args:
+        empleado: Usuario cajero que sincroniza el lote.
+        ventas: Lista de dicts con las claves de CrearVentaProductoSerializer más 'clave'
+            y, opcionalmente, 'fecha_venta'.
+
+    Yields:
+        Un dict por venta con 'indice', 'clave', 'estado' ('creada', 'duplicada'
+        o 'error') y 'venta_id' o 'error'. Los resultados de cada sede se emiten
+        en cuanto su transacción se confirma.
+    """
+    grupos: dict[int, list[tuple[int, dict[str, Any]]]] = {}
+    for indice, item in enumerate(ventas):
+        grupos.setdefault(item["sede_id"], []).append((indice, item))
+
+    for sede_id, items in grupos.items():
+        try:
+            resultados = _sincronizar_grupo(empleado=empleado, sede_id=sede_id, items=items)
+        except Exception as e:
+            resultados = [
+                {
+                    "indice": indice,
+                    "clave": item["clave"],
+                    "estado": "error",
+                    "error": f"Error al sincronizar la venta: {str(e)}",
+                }
+                for indice, item in items
+            ]
+        yield from resultados
+
+
+def _sincronizar_grupo(
+    *,
+    empleado: User,
+    sede_id: int,
+    items: list[tuple[int, dict[str, Any]]],
+) -> list[dict[str, Any]]:
+    """Procesa en una transacción todas las ventas del lote que pertenecen a una sede."""
+    resultados = []
+    aceptadas = []
+    duplicadas = []
+    nuevas: dict[str, ClaveIdempotencia] = {}
+    total_descontado: dict[int, int] = {}
+
+    with transaction.atomic():
+        producto_ids = {
+            producto["producto_id"] for _, item in items for producto in item["productos"]
+        }
+        inventarios = _bloquear_inventarios(sede_id=sede_id, producto_ids=producto_ids)
 
+        # Se consulta después de tomar los bloqueos: un reenvío concurrente del mismo
+        # lote espera aquí y ve las claves que la otra transacción acaba de confirmar.
+        registradas = {
+            registro.clave: registro
+            for registro in ClaveIdempotencia.objects.filter(
+                clave__in=[item["clave"] for _, item in items]
+            )
+        }
+
+        for indice, item in items:
+            resultado = {"indice": indice, "clave": item["clave"]}
+            resultados.append(resultado)
+            hash_venta = hash_contenido({"empleado": empleado.pk, "data": item})
+
+            previa = registradas.get(item["clave"]) or nuevas.get(item["clave"])
+            if previa is not None:
+                if previa.hash_peticion != hash_venta:
+                    resultado.update(
+                        estado="error",
+                        error="La clave de idempotencia ya se usó con una venta distinta",
+                    )
+                else:
+                    resultado["estado"] = "duplicada"
+                    duplicadas.append((resultado, previa))
+                continue
+
+            cantidades = _cantidades_por_producto(item["productos"])
             try:
-                inventario = Inventario.objects.select_for_update().get(
-                    producto=producto,
-                    sede_id=sede_id,
-                )
-            except Inventario.DoesNotExist:
-                raise ValidationError(
-                    f"El producto '{producto.nombre}' no está disponible en esta sede"
-                )
+                _validar_stock(inventarios=inventarios, cantidades=cantidades)
+            except ValidationError as e:
+                resultado.update(estado="error", error=" ".join(e.messages))
+                continue
 
-            if inventario.cantidad_actual < item["cantidad"]:
-                raise ValidationError(
-                    f"Stock insuficiente de '{producto.nombre}' en esta sede. "
-                    f"Disponible: {inventario.cantidad_actual}, "
-                    f"Solicitado: {item['cantidad']}"
-                )
+            for producto_id, cantidad in cantidades.items():
+                inventarios[producto_id].cantidad_actual -= cantidad
+                total_descontado[producto_id] = total_descontado.get(producto_id, 0) + cantidad
 
-            DetalleVentaProducto.objects.create(
-                venta=venta,
-                producto=producto,
-                cantidad=item["cantidad"],
-                precio_unitario=producto.precio_unitario,
-                descuento=item.get("descuento", Decimal("0")),
+            venta = VentaProducto(
+                cliente_id=item.get("cliente_id"),
+                empleado=empleado,
+                sede_id=sede_id,
+                metodo_pago=item["metodo_pago"],
+                descuento_global=item.get("descuento_global", Decimal("0")),
+                notas=item.get("notas", ""),
+                fecha_venta=item.get("fecha_venta") or timezone.now(),
             )
+            detalles = _construir_detalles(
+                venta=venta, productos=item["productos"], inventarios=inventarios
+            )
+            venta.calcular_totales(detalles)
+            nuevas[item["clave"]] = ClaveIdempotencia(
+                clave=item["clave"], hash_peticion=hash_venta, venta=venta
+            )
+            aceptadas.append((resultado, venta, detalles))
+
+        if aceptadas:
+            VentaProducto.objects.bulk_create([venta for _, venta, _ in aceptadas])
+            DetalleVentaProducto.objects.bulk_create(
+                [detalle for _, _, detalles in aceptadas for detalle in detalles]
+            )
+            _descontar_stock(inventarios=inventarios, cantidades=total_descontado)
+            for registro in nuevas.values():
+                registro.respuesta = {
+                    "venta_id": registro.venta.venta_id,
+                    "total": registro.venta.total,
+                }
+            ClaveIdempotencia.objects.bulk_create(nuevas.values())
+            _acumular_resumen(ventas=[(venta, detalles) for _, venta, detalles in aceptadas])
+            # Con las filas de inventario bloqueadas ningún snapshot de la sede puede
+            # tomarse hasta el COMMIT: el último visible es el que no incluye estas ventas
+            ultimo_snapshot = SnapshotInventario.objects.filter(sede_id=sede_id).aggregate(
+                fecha=Max("fecha")
+            )["fecha"]
+            _registrar_movimientos(
+                ventas=[(venta, detalles) for _, venta, detalles in aceptadas],
+                tipo="venta",
+                no_antes_de=ultimo_snapshot,
+            )
+            catalogo_registrar_cambios(sede_id=sede_id, producto_ids=total_descontado)
 
-            inventario.cantidad_actual -= item["cantidad"]
-            inventario.save(update_fields=["cantidad_actual", "ultima_actualizacion"])
+    for resultado, venta, _ in aceptadas:
+        resultado.update(estado="creada", venta_id=venta.venta_id, total=str(venta.total))
+    for resultado, registro in duplicadas:
+        resultado["venta_id"] = registro.venta_id
+    return resultados
 
-        totales = venta.calcular_totales()
-        venta.subtotal = totales["subtotal"]
-        venta.iva = totales["iva"]
-        venta.total = totales["total"]
-        venta.save(update_fields=["subtotal", "iva", "total"])
 
-    return venta
+def hash_contenido(contenido: dict[str, Any]) -> str:
+    """SHA-256 de un dict serializado de forma canónica (claves ordenadas)."""
+    serializado = json.dumps(contenido, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(serializado.encode()).hexdigest()
+
+
+def _cantidades_por_producto(productos: list[dict[str, Any]]) -> dict[int, int]:
+    """Suma las cantidades solicitadas por producto (un carrito puede repetir productos)."""
+    cantidades: dict[int, int] = {}
+    for item in productos:
+        cantidades[item["producto_id"]] = cantidades.get(item["producto_id"], 0) + item["cantidad"]
+    return cantidades
+
+
+def _bloquear_inventarios(*, sede_id: int, producto_ids: Iterable[int]) -> dict[int, Inventario]:
+    """Bloquea en una sola consulta las filas de Inventario/Producto de la sede.
+
+    El ORDER BY producto_id fija el orden de adquisición de los bloqueos, lo que
+    evita deadlocks entre transacciones concurrentes sobre los mismos productos.
+
+    Returns:
+        Dict producto_id -> Inventario bloqueado (con su producto cargado). Los
+        productos sin inventario en la sede no aparecen.
+    """
+    return {
+        inventario.producto_id: inventario
+        for inventario in (
+            Inventario.objects.select_for_update()
+            .select_related("producto")
+            .filter(sede_id=sede_id, producto_id__in=list(producto_ids))
+            .order_by("producto_id")
+        )
+    }
+
+
+def _validar_stock(*, inventarios: dict[int, Inventario], cantidades: dict[int, int]) -> None:
+    """Valida que cada producto tenga inventario bloqueado y stock suficiente.
+
+    Raises:
+        ValidationError: Si algún producto no existe, no tiene inventario en la sede
+            o no tiene stock suficiente.
+    """
+    faltantes = [producto_id for producto_id in cantidades if producto_id not in inventarios]
+    if faltantes:
+        # Solo en el camino de error: distinguir producto inexistente de producto sin inventario
+        nombres = dict(
+            Producto.objects.filter(pk__in=faltantes).values_list("producto_id", "nombre")
+        )
+        for producto_id in faltantes:
+            if producto_id not in nombres:
+                raise ValidationError(f"El producto con id {producto_id} no existe")
+        raise ValidationError(
+            f"El producto '{nombres[faltantes[0]]}' no está disponible en esta sede"
+        )
+
+    for producto_id, cantidad in cantidades.items():
+        inventario = inventarios[producto_id]
+        if inventario.cantidad_actual < cantidad:
+            raise ValidationError(
+                f"Stock insuficiente de '{inventario.producto.nombre}' en esta sede. "
+                f"Disponible: {inventario.cantidad_actual}, "
+                f"Solicitado: {cantidad}"
+            )
+
+
+def _construir_detalles(
+    *,
+    venta: VentaProducto,
+    productos: list[dict[str, Any]],
+    inventarios: dict[int, Inventario],
+) -> list[DetalleVentaProducto]:
+    """Construye (sin guardar) los detalles de la venta al precio vigente del producto."""
+    detalles = []
+    for item in productos:
+        producto = inventarios[item["producto_id"]].producto
+        detalle = DetalleVentaProducto(
+            venta=venta,
+            producto=producto,
+            cantidad=item["cantidad"],
+            precio_unitario=producto.precio_unitario,
+            descuento=item.get("descuento", Decimal("0")),
+        )
+        # bulk_create no llama a save(), así que los totales se calculan aquí
+        detalle.calcular_totales()
+        detalles.append(detalle)
+    return detalles
+
+
+def _descontar_stock(
+    *, inventarios: dict[int, Inventario], cantidades: dict[int, int], signo: int = 1
+) -> None:
+    """Descuenta el stock de todos los inventarios bloqueados con un único UPDATE ... CASE.
+
+    Con signo=-1 lo devuelve (cancelaciones).
+    """
+    Inventario.objects.filter(
+        pk__in=[inventarios[producto_id].pk for producto_id in cantidades]
+    ).update(
+        cantidad_actual=Case(
+            *[
+                When(pk=inventarios[producto_id].pk, then=F("cantidad_actual") - signo * cantidad)
+                for producto_id, cantidad in cantidades.items()
+            ],
+            output_field=PositiveIntegerField(),
+        ),
+        ultima_actualizacion=timezone.now(),
+    )
 
 
 def venta_producto_cancelar(*, venta: VentaProducto) -> VentaProducto:
@@ -118,6 +385,9 @@ def venta_producto_cancelar(*, venta: VentaProducto) -> VentaProducto:
     Si el registro de inventario fue eliminado entre la venta y la cancelación,
     lo recrea con la cantidad restaurada y umbrales mínimos por defecto.
 
+    Bloquea los inventarios en el mismo orden que venta_producto_crear y repone todo
+    el stock con un solo UPDATE; la versión del catálogo sube una vez, al final.
+
     Args:
         venta: Instancia de VentaProducto en estado 'completada'.
 
@@ -131,24 +401,237 @@ def venta_producto_cancelar(*, venta: VentaProducto) -> VentaProducto:
         raise ValidationError("Esta venta ya está cancelada")
 
     with transaction.atomic():
-        for detalle in venta.detalles.select_for_update().select_related("producto"):
-            try:
-                inventario = Inventario.objects.select_for_update().get(
-                    producto=detalle.producto,
-                    sede=venta.sede,
-                )
-                inventario.cantidad_actual += detalle.cantidad
-                inventario.save(update_fields=["cantidad_actual", "ultima_actualizacion"])
-            except Inventario.DoesNotExist:
-                Inventario.objects.create(
-                    producto=detalle.producto,
-                    sede=venta.sede,
-                    cantidad_actual=detalle.cantidad,
-                    cantidad_minima=5,
-                    cantidad_maxima=1000,
-                )
+        detalles = list(venta.detalles.select_for_update().select_related("producto"))
+        cantidades: dict[int, int] = {}
+        for detalle in detalles:
+            cantidades[detalle.producto_id] = cantidades.get(detalle.producto_id, 0) + detalle.cantidad
+
+        # Mismo orden de bloqueos que venta_producto_crear: primero todo el inventario
+        # (por producto_id) y el contador del catálogo al final, sin pasar por save()
+        inventarios = _bloquear_inventarios(sede_id=venta.sede_id, producto_ids=cantidades)
+        existentes = {
+            producto_id: cantidad
+            for producto_id, cantidad in cantidades.items()
+            if producto_id in inventarios
+        }
+        if existentes:
+            _descontar_stock(inventarios=inventarios, cantidades=existentes, signo=-1)
+        Inventario.objects.bulk_create([
+            Inventario(
+                producto_id=producto_id,
+                sede_id=venta.sede_id,
+                cantidad_actual=cantidad,
+                cantidad_minima=5,
+                cantidad_maxima=1000,
+            )
+            for producto_id, cantidad in sorted(cantidades.items())
+            if producto_id not in inventarios
+        ])
 
         venta.estado = "cancelada"
         venta.save(update_fields=["estado"])
 
+        _acumular_resumen(ventas=[(venta, detalles)], signo=-1)
+        _registrar_movimientos(ventas=[(venta, detalles)], tipo="cancelacion")
+        if cantidades:
+            catalogo_registrar_cambios(sede_id=venta.sede_id, producto_ids=cantidades)
+
     return venta
+
+
+def _registrar_movimientos(
+    *,
+    ventas: list[tuple[VentaProducto, list[DetalleVentaProducto]]],
+    tipo: str,
+    no_antes_de: datetime | None = None,
+) -> None:
+    """Inserta en el libro de inventario un movimiento por producto de cada venta.
+
+    Las ventas ('venta') restan stock en su fecha_venta, acotada por no_antes_de;
+    las cancelaciones ('cancelacion') lo devuelven en el momento actual. Todo el lote
+    se inserta con un solo bulk_create.
+    """
+    signo = 1 if tipo == "cancelacion" else -1
+    ahora = timezone.now()
+    movimientos = []
+    for venta, detalles in ventas:
+        fecha = ahora
+        if tipo == "venta":
+            fecha = max(venta.fecha_venta, no_antes_de) if no_antes_de else venta.fecha_venta
+        cantidades: dict[int, int] = {}
+        for detalle in detalles:
+            cantidades[detalle.producto_id] = cantidades.get(detalle.producto_id, 0) + detalle.cantidad
+        movimientos.extend(
+            MovimientoInventario(
+                sede_id=venta.sede_id,
+                producto_id=producto_id,
+                tipo=tipo,
+                cantidad=signo * cantidad,
+                fecha=fecha,
+                venta=venta,
+            )
+            for producto_id, cantidad in sorted(cantidades.items())
+        )
+    MovimientoInventario.objects.bulk_create(movimientos)
+
+
+
+def resumen_ventas_reconstruir(
+    *,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    tamano_lote: int = 1000,
+) -> dict[str, int]:
+    """Recalcula los resúmenes diarios de ventas a partir de VentaProducto/DetalleVentaProducto.
+
+    Borra los resúmenes del rango y los vuelve a generar con dos consultas agregadas
+    que se recorren con un cursor. Las tablas de resumen se bloquean en modo
+    EXCLUSIVE durante la reconstrucción: las ventas concurrentes esperan a que
+    termine en lugar de sumar sobre filas a medio reconstruir.
+
+    Args:
+        fecha_desde: Primer día a reconstruir (inclusive). None = sin límite.
+        fecha_hasta: Último día a reconstruir (inclusive). None = sin límite.
+        tamano_lote: Filas por INSERT al escribir los resúmenes.
+
+    Returns:
+        Dict con el número de filas generadas por tabla.
+    """
+    filtro_fecha: dict[str, date] = {}
+    if fecha_desde:
+        filtro_fecha["fecha__gte"] = fecha_desde
+    if fecha_hasta:
+        filtro_fecha["fecha__lte"] = fecha_hasta
+
+    por_producto = (
+        DetalleVentaProducto.objects.filter(venta__estado="completada")
+        .annotate(fecha=TruncDate("venta__fecha_venta"))
+        .filter(**filtro_fecha)
+        .values("venta__sede_id", "fecha", "producto_id")
+        .annotate(
+            total_unidades=Sum("cantidad"),
+            total_ingresos=Sum("total"),
+            total_tickets=Count("venta", distinct=True),
+        )
+        .order_by()
+    )
+    por_sede = (
+        VentaProducto.objects.filter(estado="completada")
+        .annotate(fecha=TruncDate("fecha_venta"))
+        .filter(**filtro_fecha)
+        .values("sede_id", "fecha")
+        .annotate(total_ventas=Count("venta_id"), total_ingresos=Sum("total"))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {ResumenVentaProductoDiario._meta.db_table}, "
+                f"{ResumenVentaSedeDiario._meta.db_table} IN EXCLUSIVE MODE"
+            )
+        ResumenVentaProductoDiario.objects.filter(**filtro_fecha).delete()
+        ResumenVentaSedeDiario.objects.filter(**filtro_fecha).delete()
+
+        filas_producto = _insertar_en_lotes(
+            ResumenVentaProductoDiario,
+            (
+                ResumenVentaProductoDiario(
+                    sede_id=fila["venta__sede_id"],
+                    fecha=fila["fecha"],
+                    producto_id=fila["producto_id"],
+                    unidades=fila["total_unidades"],
+                    ingresos=fila["total_ingresos"],
+                    tickets=fila["total_tickets"],
+                )
+                for fila in por_producto.iterator(chunk_size=tamano_lote)
+            ),
+            tamano_lote,
+        )
+        filas_sede = _insertar_en_lotes(
+            ResumenVentaSedeDiario,
+            (
+                ResumenVentaSedeDiario(
+                    sede_id=fila["sede_id"],
+                    fecha=fila["fecha"],
+                    ventas=fila["total_ventas"],
+                    ingresos=fila["total_ingresos"],
+                )
+                for fila in por_sede.iterator(chunk_size=tamano_lote)
+            ),
+            tamano_lote,
+        )
+
+    return {"resumen_producto": filas_producto, "resumen_sede": filas_sede}
+
+
+def _insertar_en_lotes(modelo, objetos: Iterable[Any], tamano_lote: int) -> int:
+    """bulk_create de un iterable sin materializarlo completo en memoria."""
+    total = 0
+    for lote in iter(lambda: list(islice(objetos, tamano_lote)), []):
+        modelo.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+
+def _acumular_resumen(
+    *,
+    ventas: list[tuple[VentaProducto, list[DetalleVentaProducto]]],
+    signo: int = 1,
+) -> None:
+    """Suma (signo=1) o resta (signo=-1) ventas a los resúmenes diarios con dos upserts.
+
+    Las contribuciones se agregan en Python por (sede, día, producto) y por (sede, día)
+    y se aplican con INSERT ... ON CONFLICT DO UPDATE, ordenadas por clave para que
+    dos transacciones concurrentes tomen los bloqueos de fila en el mismo orden.
+    """
+    por_producto: dict[tuple[int, date, int], list[Any]] = {}
+    por_sede: dict[tuple[int, date], list[Any]] = {}
+    for venta, detalles in ventas:
+        fecha = timezone.localdate(venta.fecha_venta)
+        productos_en_ticket = set()
+        for detalle in detalles:
+            acumulado = por_producto.setdefault(
+                (venta.sede_id, fecha, detalle.producto_id), [0, Decimal("0"), 0]
+            )
+            acumulado[0] += signo * detalle.cantidad
+            acumulado[1] += signo * detalle.total
+            if detalle.producto_id not in productos_en_ticket:
+                productos_en_ticket.add(detalle.producto_id)
+                acumulado[2] += signo
+        acumulado = por_sede.setdefault((venta.sede_id, fecha), [0, Decimal("0")])
+        acumulado[0] += signo
+        acumulado[1] += signo * venta.total
+
+    _upsert_sumando(
+        ResumenVentaProductoDiario,
+        claves=["sede_id", "fecha", "producto_id"],
+        valores=["unidades", "ingresos", "tickets"],
+        filas=[clave + tuple(valores) for clave, valores in sorted(por_producto.items())],
+    )
+    _upsert_sumando(
+        ResumenVentaSedeDiario,
+        claves=["sede_id", "fecha"],
+        valores=["ventas", "ingresos"],
+        filas=[clave + tuple(valores) for clave, valores in sorted(por_sede.items())],
+    )
+
+
+def _upsert_sumando(modelo, *, claves: list[str], valores: list[str], filas: list[tuple]) -> None:
+    """INSERT ... ON CONFLICT (claves) DO UPDATE SET valor = valor + EXCLUDED.valor (PostgreSQL).
+
+    El ORM no permite expresiones en bulk_create(update_conflicts=True), por eso
+    el incremento se escribe en SQL.
+    """
+    if not filas:
+        return
+    tabla = modelo._meta.db_table
+    columnas = claves + valores
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columnas)) + ")"] * len(filas))
+    asignaciones = ", ".join(f"{col} = {tabla}.{col} + EXCLUDED.{col}" for col in valores)
+    sql = (
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES {placeholders} "
+        f"ON CONFLICT ({', '.join(claves)}) DO UPDATE SET {asignaciones}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [valor for fila in filas for valor in fila])
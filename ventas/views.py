@@ -1,17 +1,36 @@
+import json
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.db import IntegrityError, transaction
 from django.db import models as django_models
-from django.db.models import Avg, Count, Sum
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from gym.paginacion import KeysetPagination
 from inventario.models import Inventario
-from .models import VentaProducto
+from inventario.services import catalogo_version, producto_escanear
+from .exportacion import FORMATOS_EXPORTACION, filtrar_ventas
+from .models import ClaveIdempotencia, ResumenVentaSedeDiario, VentaProducto
 from .serializers import (
     VentaProductoSerializer,
     CrearVentaProductoSerializer,
+    SincronizarVentasSerializer,
 )
 from .permissions import EsAdministradorOCajero
-from .services import venta_producto_cancelar, venta_producto_crear
+from .services import (
+    hash_contenido,
+    venta_producto_cancelar,
+    venta_producto_crear,
+    venta_producto_sincronizar,
+)
+
+
+class VentaProductoPagination(KeysetPagination):
+    ordering = ("-fecha_venta",)
 
 
 class VentaProductoViewSet(viewsets.ModelViewSet):
@@ -23,9 +42,12 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
     - GET  /api/ventas-productos/                    - Listar ventas
     - GET  /api/ventas-productos/{id}/               - Detalle de venta
     - POST /api/ventas-productos/crear_venta/        - Crear venta con carrito
+    - POST /api/ventas-productos/sincronizar/        - Registrar lote de ventas offline
     - POST /api/ventas-productos/{id}/cancelar/      - Cancelar venta
     - GET  /api/ventas-productos/productos-disponibles/ - Productos con stock
+    - GET  /api/ventas-productos/escanear/           - Producto por código de barras
     - GET  /api/ventas-productos/estadisticas/       - Estadísticas agregadas
+    - GET  /api/ventas-productos/exportar/           - Exportar ventas (CSV o JSONL)
     """
 
     queryset = (
@@ -35,6 +57,7 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
     )
     serializer_class = VentaProductoSerializer
     permission_classes = [EsAdministradorOCajero]
+    pagination_class = VentaProductoPagination
 
     def get_queryset(self):
         """Filtra ventas por rol, sede, estado, cliente y rango de fechas.
@@ -50,6 +73,8 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
             persona=user.persona
         ).values_list("rol__nombre", flat=True)
 
+        params = self.request.query_params
+        sede_id = None
         if "Cajero" in roles:
             try:
                 cajero_sede = getattr(user.persona.empleado.cajero, "sede", None)
@@ -61,33 +86,35 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
                 queryset = queryset.none()
 
         elif "Administrador" in roles:
-            sede_id = self.request.query_params.get("sede")
-            if sede_id:
-                queryset = queryset.filter(sede_id=sede_id)
-
-        estado = self.request.query_params.get("estado")
-        if estado:
-            queryset = queryset.filter(estado=estado)
-
-        cliente_id = self.request.query_params.get("cliente")
-        if cliente_id:
-            queryset = queryset.filter(cliente_id=cliente_id)
-
-        fecha_desde = self.request.query_params.get("fecha_desde")
-        fecha_hasta = self.request.query_params.get("fecha_hasta")
-        if fecha_desde:
-            queryset = queryset.filter(fecha_venta__gte=fecha_desde)
-        if fecha_hasta:
-            queryset = queryset.filter(fecha_venta__lte=fecha_hasta)
+            sede_id = params.get("sede")
 
-        return queryset.order_by("-fecha_venta")
+        return filtrar_ventas(
+            queryset,
+            sede_id=sede_id,
+            estado=params.get("estado"),
+            cliente_id=params.get("cliente"),
+            fecha_desde=params.get("fecha_desde"),
+            fecha_hasta=params.get("fecha_hasta"),
+        ).order_by("-fecha_venta")
 
     @action(detail=False, methods=["post"])
     def crear_venta(self, request):
         """Crea una venta con múltiples productos (carrito). Todo o nada.
 
         POST /api/ventas-productos/crear_venta/
+
+        Si la petición trae el header ``Idempotency-Key``, la respuesta exitosa se
+        guarda junto con la venta en la misma transacción. Un reintento con la misma
+        clave devuelve la respuesta guardada sin volver a cobrar ni descontar stock;
+        si la clave se reutiliza con un cuerpo distinto se responde 422.
         """
+        clave = request.headers.get("Idempotency-Key", "").strip()
+        hash_peticion = _hash_peticion(request)
+        if clave:
+            respuesta_previa = _respuesta_idempotente(clave, hash_peticion)
+            if respuesta_previa is not None:
+                return respuesta_previa
+
         serializer = CrearVentaProductoSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(
@@ -97,14 +124,37 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
 
         data = serializer.validated_data
         try:
-            venta = venta_producto_crear(
-                empleado=request.user,
-                sede_id=data["sede_id"],
-                metodo_pago=data["metodo_pago"],
-                productos=data["productos"],
-                cliente_id=data.get("cliente_id"),
-                descuento_global=data.get("descuento_global", 0),
-                notas=data.get("notas", ""),
+            with transaction.atomic():
+                if clave:
+                    registro = ClaveIdempotencia.objects.create(
+                        clave=clave, hash_peticion=hash_peticion
+                    )
+                venta = venta_producto_crear(
+                    empleado=request.user,
+                    sede_id=data["sede_id"],
+                    metodo_pago=data["metodo_pago"],
+                    productos=data["productos"],
+                    cliente_id=data.get("cliente_id"),
+                    descuento_global=data.get("descuento_global", 0),
+                    notas=data.get("notas", ""),
+                )
+                respuesta = {
+                    "message": "Venta creada exitosamente",
+                    "venta": VentaProductoSerializer(venta).data,
+                }
+                if clave:
+                    registro.venta = venta
+                    registro.respuesta = respuesta
+                    registro.codigo_estado = status.HTTP_201_CREATED
+                    registro.save(update_fields=["venta", "respuesta", "codigo_estado"])
+        except IntegrityError as e:
+            # Otra petición con la misma clave se confirmó mientras procesábamos esta
+            respuesta_previa = _respuesta_idempotente(clave, hash_peticion) if clave else None
+            if respuesta_previa is not None:
+                return respuesta_previa
+            return Response(
+                {"error": f"Error al crear la venta: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -114,9 +164,33 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        return Response(
-            {"message": "Venta creada exitosamente", "venta": VentaProductoSerializer(venta).data},
-            status=status.HTTP_201_CREATED,
+        return Response(respuesta, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"])
+    def sincronizar(self, request):
+        """Registra un lote de ventas capturadas por el POS durante un corte de conexión.
+
+        POST /api/ventas-productos/sincronizar/
+        Body: { "ventas": [ { "clave": "...", "sede_id": 1, "metodo_pago": "...",
+                              "productos": [...], ... }, ... ] }
+
+        La respuesta es un stream NDJSON (una línea JSON por venta) que se va
+        enviando conforme se confirma la transacción de cada sede.
+        """
+        serializer = SincronizarVentasSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": "Datos inválidos", "detalles": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        resultados = venta_producto_sincronizar(
+            empleado=request.user,
+            ventas=serializer.validated_data["ventas"],
+        )
+        return StreamingHttpResponse(
+            (json.dumps(resultado, cls=DjangoJSONEncoder) + "\n" for resultado in resultados),
+            content_type="application/x-ndjson",
         )
 
     @action(detail=True, methods=["post"])
@@ -146,6 +220,14 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
         """Lista productos con stock disponible en una sede para el POS.
 
         GET /api/ventas-productos/productos-disponibles/?sede=<id>[&search=...][&categoria=<id>]
+            [&desde_version=<n>]
+
+        La respuesta lleva ETag y X-Catalogo-Version con la versión del catálogo de la
+        sede; si coincide con If-None-Match se devuelve 304 sin consultar inventario.
+        Con desde_version se devuelve {"version", "completo", "productos"} con solo las
+        filas que cambiaron después de esa versión (incluidas las que se quedaron sin
+        stock, con "disponible": false). Si el delta ya no es válido (se borró inventario)
+        se devuelve el catálogo completo con "completo": true.
         """
         sede_id = request.query_params.get("sede")
         if not sede_id:
@@ -153,10 +235,26 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
                 {"error": 'Parámetro "sede" es requerido'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            sede_id = int(sede_id)
+            desde_version = request.query_params.get("desde_version")
+            desde_version = int(desde_version) if desde_version is not None else None
+        except ValueError:
+            return Response(
+                {"error": 'Los parámetros "sede" y "desde_version" deben ser enteros'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # La versión se lee antes que el inventario: si entre medias se confirma otro
+        # cambio, el POS lo recibirá (de nuevo) en el siguiente delta, nunca lo pierde.
+        version, version_minima_delta = catalogo_version(sede_id=sede_id)
+        etag = f'"catalogo-{sede_id}-{version}"'
+        cabeceras = {"ETag": etag, "X-Catalogo-Version": str(version)}
+        if _etag_coincide(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
 
-        inventarios = (
-            Inventario.objects.filter(sede_id=sede_id, cantidad_actual__gt=0)
-            .select_related("producto", "producto__categoria", "sede")
+        inventarios = Inventario.objects.filter(sede_id=sede_id).select_related(
+            "producto", "producto__categoria", "sede"
         )
 
         search = request.query_params.get("search")
@@ -170,53 +268,170 @@ class VentaProductoViewSet(viewsets.ModelViewSet):
         if categoria_id:
             inventarios = inventarios.filter(producto__categoria_id=categoria_id)
 
-        data = []
-        for inv in inventarios:
-            prod = inv.producto
-            data.append(
-                {
-                    "producto_id": prod.producto_id,
-                    "codigo": prod.codigo or "",
-                    "nombre": prod.nombre or "Sin nombre",
-                    "categoria": prod.categoria.nombre if prod.categoria else "Sin categoría",
-                    "precio_unitario": str(prod.precio_unitario) if prod.precio_unitario else "0.00",
-                    "stock": inv.cantidad_actual,
-                    "sede_nombre": inv.sede.nombre,
-                    "estado_stock": inv.estado_stock,
-                }
+        if desde_version is None:
+            data = [_fila_catalogo(inv) for inv in inventarios.filter(cantidad_actual__gt=0)]
+            return Response(data, headers=cabeceras)
+
+        completo = desde_version < version_minima_delta or desde_version > version
+        if completo:
+            inventarios = inventarios.filter(cantidad_actual__gt=0)
+        else:
+            inventarios = inventarios.filter(version_catalogo__gt=desde_version)
+        data = {
+            "version": version,
+            "completo": completo,
+            "productos": [_fila_catalogo(inv) for inv in inventarios],
+        }
+        return Response(data, headers=cabeceras)
+
+    @action(detail=False, methods=["get"])
+    def escanear(self, request):
+        """Resuelve un código de barras (coincidencia exacta) a producto, precio y stock en la sede.
+
+        GET /api/ventas-productos/escanear/?codigo=<codigo>&sede=<id>
+        """
+        codigo = request.query_params.get("codigo", "").strip()
+        sede_id = request.query_params.get("sede")
+        if not codigo or not sede_id:
+            return Response(
+                {"error": 'Los parámetros "codigo" y "sede" son requeridos'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            sede_id = int(sede_id)
+        except ValueError:
+            return Response(
+                {"error": 'El parámetro "sede" debe ser un entero'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        return Response(data)
+        inventario = producto_escanear(codigo=codigo, sede_id=sede_id)
+        if inventario is None:
+            return Response(
+                {"error": f"No hay ningún producto con código '{codigo}' en esta sede"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(_fila_catalogo(inventario))
 
     @action(detail=False, methods=["get"])
     def estadisticas(self, request):
         """Devuelve estadísticas agregadas de ventas completadas.
 
         GET /api/ventas-productos/estadisticas/?[sede=<id>][&fecha_desde=...][&fecha_hasta=...]
+
+        Se calcula sobre ResumenVentaSedeDiario (una fila por sede y día), por lo que
+        los filtros de fecha tienen granularidad de día y son inclusivos.
         """
-        queryset = VentaProducto.objects.filter(estado="completada")
+        queryset = ResumenVentaSedeDiario.objects.all()
 
         sede_id = request.query_params.get("sede")
         if sede_id:
             queryset = queryset.filter(sede_id=sede_id)
 
-        fecha_desde = request.query_params.get("fecha_desde")
-        fecha_hasta = request.query_params.get("fecha_hasta")
+        try:
+            fecha_desde = _parse_fecha(request.query_params.get("fecha_desde"))
+            fecha_hasta = _parse_fecha(request.query_params.get("fecha_hasta"))
+        except ValueError:
+            return Response(
+                {"error": "Formato de fecha inválido, usa YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         if fecha_desde:
-            queryset = queryset.filter(fecha_venta__gte=fecha_desde)
+            queryset = queryset.filter(fecha__gte=fecha_desde)
         if fecha_hasta:
-            queryset = queryset.filter(fecha_venta__lte=fecha_hasta)
+            queryset = queryset.filter(fecha__lte=fecha_hasta)
 
         stats = queryset.aggregate(
-            total_ventas=Count("venta_id"),
-            ingresos_totales=Sum("total"),
-            ticket_promedio=Avg("total"),
+            total_ventas=Sum("ventas"),
+            ingresos_totales=Sum("ingresos"),
         )
+        total_ventas = stats["total_ventas"] or 0
+        ingresos_totales = float(stats["ingresos_totales"] or 0)
 
         return Response(
             {
-                "total_ventas": stats["total_ventas"] or 0,
-                "ingresos_totales": float(stats["ingresos_totales"] or 0),
-                "ticket_promedio": float(stats["ticket_promedio"] or 0),
+                "total_ventas": total_ventas,
+                "ingresos_totales": ingresos_totales,
+                "ticket_promedio": ingresos_totales / total_ventas if total_ventas else 0,
             }
         )
+
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """Exporta en streaming las ventas filtradas y sus detalles.
+
+        GET /api/ventas-productos/exportar/?formato=csv|jsonl[&sede=<id>][&estado=...]
+            [&cliente=<id>][&fecha_desde=...][&fecha_hasta=...]
+
+        Acepta los mismos filtros que el listado. CSV: una fila por detalle de venta;
+        JSONL: una línea por venta con sus detalles anidados.
+        """
+        formato = request.query_params.get("formato", "csv")
+        if formato not in FORMATOS_EXPORTACION:
+            return Response(
+                {"error": 'El parámetro "formato" debe ser "csv" o "jsonl"'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        exportador, content_type = FORMATOS_EXPORTACION[formato]
+        response = StreamingHttpResponse(
+            exportador(self.get_queryset()), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="ventas.{formato}"'
+        return response
+
+
+def _hash_peticion(request):
+    """SHA-256 del cuerpo de la petición y del usuario que la envía."""
+    return hash_contenido({"empleado": request.user.pk, "data": request.data})
+
+
+def _respuesta_idempotente(clave, hash_peticion):
+    """Devuelve la respuesta guardada para la clave, o None si la clave es nueva."""
+    registro = ClaveIdempotencia.objects.filter(clave=clave).first()
+    if registro is None:
+        return None
+    if registro.hash_peticion != hash_peticion:
+        return Response(
+            {"error": "La clave de idempotencia ya se usó con una petición distinta"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(
+        registro.respuesta,
+        status=registro.codigo_estado,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _fila_catalogo(inv):
+    """Fila del catálogo POS para un registro de Inventario con producto, categoría y sede."""
+    prod = inv.producto
+    return {
+        "producto_id": prod.producto_id,
+        "codigo": prod.codigo or "",
+        "nombre": prod.nombre or "Sin nombre",
+        "categoria": prod.categoria.nombre if prod.categoria else "Sin categoría",
+        "precio_unitario": str(prod.precio_unitario) if prod.precio_unitario else "0.00",
+        "stock": inv.cantidad_actual,
+        "sede_nombre": inv.sede.nombre,
+        "estado_stock": inv.estado_stock,
+        "disponible": inv.cantidad_actual > 0,
+    }
+
+
+def _etag_coincide(request, etag):
+    """True si la cabecera If-None-Match incluye el ETag indicado (o es '*')."""
+    cabecera = request.headers.get("If-None-Match")
+    if not cabecera:
+        return False
+    etiquetas = [valor.strip().removeprefix("W/") for valor in cabecera.split(",")]
+    return "*" in etiquetas or etag in etiquetas
+
+
+def _parse_fecha(valor):
+    """Convierte 'YYYY-MM-DD' (o un datetime ISO) en date. None si no viene el parámetro."""
+    if not valor:
+        return None
+    fecha = parse_date(valor[:10])
+    if fecha is None:
+        raise ValueError(valor)
+    return fecha